@@ -1,8 +1,4 @@
-"""afconfig
-
-TODO: create ConfigDict class with method 'merge' (which, as the name
-  implies, merges another config dict in place)
-"""
+"""afconfig"""
 
 __author__ = "Joel Dubowy"
 
@@ -10,44 +6,66 @@ __version_info__ = (1,1,3)
 __version__ = '.'.join([str(n) for n in __version_info__])
 
 
-import argparse
-import configparser
-import json
-import os
-import re
+from collections.abc import Mapping, MutableMapping
 
 __all__ = [
     'config_parser_to_dict',
+    'LazyConfigParserDict',
     'get_config_value',
+    'compile_path',
+    'get_config_values',
     'set_config_value',
     'merge_configs',
+    'merge_configs_many',
+    'ConfigDict',
     'ImmutableConfigDict',
+    'ConfigOverrides',
     'ConfigurationError'
 ]
 
+# Names exported from submodules that are only imported on first access
+# (PEP 562), so that importing afconfig stays cheap for short-lived
+# scripts that don't need them
+_LAZY_EXPORTS = {
+    'config_parser_to_dict': 'parsers',
+    'LazyConfigParserDict': 'parsers',
+    'ConfigOverrides': 'overrides'
+}
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    module = __import__(__name__ + '.' + module, fromlist=[name])
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 class ConfigurationError(ValueError):
     pass
 
-##
-## Converting from ConfigParser objects
-##
-
-def config_parser_to_dict(config):
-    d = {}
-    if config:
-        return {s:{k:v for k,v in config.items(s)} for s in config.sections()}
-    return d
-
 ##
 ## Utility mehtods
 ##
 
+# ConfigAccessProfile recording get_config_value and ConfigDict.get_value
+# calls, if any; see afconfig.profiling
+_access_profile = None
+
 GET_CONFIG_VALUE_ERR_MSG_NO_KEYS = "No config key(s) specified"
 GET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG = "Invalid config"
 GET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS = "Key {} not in config"
 def get_config_value(config, *keys, **kwargs):
     """Returns value from arbitrary nesting in config dict
 
+    Config views that aren't dicts, such as
+    afconfig.layered.LayeredConfig, are supported as well; any
+    collections.abc.Mapping is treated like a dict.
+
     Recognized kwargs:
      - default -- if not specified, None is used as the default
      - fail_on_missing_key -- raise exception if key isn't in config
@@ -59,6 +77,10 @@ def get_config_value(config, *keys, **kwargs):
      - should we raise exception if config is None or empty but keys are defined
        and fail_on_missing_key is true ?
     """
+    if _access_profile is not None:
+        # see afconfig.profiling
+        return _access_profile._get_value(config, keys, kwargs)
+
     if not keys:
         # This will never happen on recursive call
         raise ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_NO_KEYS)
@@ -69,7 +91,7 @@ def get_config_value(config, *keys, **kwargs):
         if kwargs.get('fail_on_missing_key'):
             raise KeyError("Missing config key {}".format(keys[0]))
 
-    elif not isinstance(config, dict):
+    elif not isinstance(config, (dict, Mapping)):
         if kwargs.get('fail_on_invalid_config'):
             raise ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
         elif kwargs.get('fail_on_missing_key'):
@@ -87,11 +109,167 @@ def get_config_value(config, *keys, **kwargs):
 
     return default
 
+def _get_config_value(config, keys, default, fail_on_missing_key,
+        fail_on_invalid_config):
+    """Iterative equivalent of get_config_value, for pre-validated keys
+
+    Takes the keys as a tuple and the options as positional args so that
+    hot-path callers don't have to repack them on every call.
+    """
+    for key in keys:
+        if config is None:
+            if fail_on_missing_key:
+                raise KeyError("Missing config key {}".format(key))
+            return default
+
+        elif not isinstance(config, (dict, Mapping)):
+            if fail_on_invalid_config:
+                raise ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+            elif fail_on_missing_key:
+                raise KeyError("Missing config key {}".format(key))
+            return default
+
+        elif key in config:
+            config = config[key]
+
+        elif fail_on_missing_key:
+            raise KeyError(GET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS.format(key))
+
+        else:
+            return default
+
+    return config
+
+def compile_path(*keys, **kwargs):
+    """Returns a callable that looks up a fixed key path in a config dict
+
+    compile_path(*keys, **kwargs)(config) is equivalent to
+    get_config_value(config, *keys, **kwargs), but the keys and kwargs
+    are processed once, up front, and the nested lookup is done
+    iteratively. Use it for key paths that are looked up repeatedly,
+    e.g. once per record inside a processing loop:
+
+        get_ecoregion = compile_path('fuelbeds', 'consumption',
+            'ecoregion', default='western')
+        for r in records:
+            ecoregion = get_ecoregion(r['config'])
+
+    Recognizes the same kwargs as get_config_value.
+    """
+    if not keys:
+        raise ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_NO_KEYS)
+
+    default = kwargs.get('default', None)
+    fail_on_missing_key = bool(kwargs.get('fail_on_missing_key'))
+    fail_on_invalid_config = bool(kwargs.get('fail_on_invalid_config'))
+
+    def accessor(config):
+        return _get_config_value(config, keys, default,
+            fail_on_missing_key, fail_on_invalid_config)
+
+    accessor.keys = keys
+    return accessor
+
+def _build_path_trie(paths):
+    """Returns prefix trie of the given key paths
+
+    Each node is a (children, indices) pair, where children maps
+    key -> child node and indices lists the positions in paths of
+    the paths ending at that node.
+    """
+    root = ({}, [])
+    for i, path in enumerate(paths):
+        node = root
+        for key in path:
+            child = node[0].get(key)
+            if child is None:
+                child = node[0][key] = ({}, [])
+            node = child
+        node[1].append(i)
+    return root
+
+def _trie_indices(node):
+    """Returns the indices of all paths ending at or below node"""
+    indices = []
+    stack = [node]
+    while stack:
+        children, node_indices = stack.pop()
+        indices.extend(node_indices)
+        stack.extend(children.values())
+    return indices
+
+def get_config_values(config, paths, **kwargs):
+    """Returns values for many key paths, walking shared prefixes once
+
+    The paths are merged into a prefix trie, so that, for example,
+    ('a', 'b', 'c') and ('a', 'b', 'd') only look up 'a' and 'b' once.
+    Each value (or error) is the same as what
+    get_config_value(config, *path, **kwargs) would return (or raise);
+    if more than one path fails, the error for the first of them, in
+    the order given, is raised.
+
+    Recognized kwargs are those of get_config_value, plus:
+     - as_dict -- return dict keyed by path tuple rather than list of
+          values in the same order as paths
+    """
+    paths = [tuple(p) for p in paths]
+    default = kwargs.get('default', None)
+    fail_on_missing_key = kwargs.get('fail_on_missing_key')
+    fail_on_invalid_config = kwargs.get('fail_on_invalid_config')
+
+    values = [default] * len(paths)
+    errors = {}
+
+    root = _build_path_trie(paths)
+    for i in root[1]:
+        # empty key path
+        errors[i] = ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_NO_KEYS)
+
+    stack = [(config, root[0])]
+    while stack:
+        config, children = stack.pop()
+        for key, child in children.items():
+            error = None
+            if config is None:
+                if fail_on_missing_key:
+                    error = KeyError("Missing config key {}".format(key))
+
+            elif not isinstance(config, (dict, Mapping)):
+                if fail_on_invalid_config:
+                    error = ConfigurationError(
+                        GET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+                elif fail_on_missing_key:
+                    error = KeyError("Missing config key {}".format(key))
+
+            elif key in config:
+                value = config[key]
+                for i in child[1]:
+                    values[i] = value
+                if child[0]:
+                    stack.append((value, child[0]))
+                continue
+
+            elif fail_on_missing_key:
+                error = KeyError(GET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS.format(key))
+
+            # Paths at and below this node all resolve to default or
+            # share the same error
+            if error is not None:
+                for i in _trie_indices(child):
+                    errors[i] = error
+
+    if errors:
+        raise errors[min(errors)]
+
+    if kwargs.get('as_dict'):
+        return dict(zip(paths, values))
+    return values
+
 SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG = "Expecting dict to hold config"
 SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS = "Specify config keys to set value"
 
 def set_config_value(config, value, *keys):
-    if not isinstance(config, dict):
+    if not isinstance(config, (dict, MutableMapping)):
         raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
     if not keys:
         raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS)
@@ -100,33 +278,297 @@ def set_config_value(config, value, *keys):
     if len(keys) == 1:
         config[keys[0]] = value
     else:
-        if not isinstance(config.get(keys[0]), dict):
+        # Nested mutable mappings (e.g. LayeredConfig views) are set
+        # into, like dicts, rather than replaced
+        if not isinstance(config.get(keys[0]), (dict, MutableMapping)):
             config[keys[0]] = dict()
         set_config_value(config[keys[0]], value, *keys[1:])
 
 MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT = "Conflicting config dicts can't be merged. key: {}."
 
+# Types of common leaf values, checked before the (much slower)
+# isinstance check against MutableMapping when merging
+_SCALAR_TYPES = frozenset([str, int, float, bool, list, tuple])
+
+def _linked_key_path(node):
+    """Returns key path tuple from (parent node, key) linked path node"""
+    keys = []
+    while node is not None:
+        node, key = node
+        keys.append(key)
+    return tuple(reversed(keys))
+
+def _merge_conflict_error(node):
+    return ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(
+        ' > '.join(_linked_key_path(node))))
+
 def merge_configs(config, to_be_merged_config, *keys):
-    if not isinstance(config, dict) or not isinstance(to_be_merged_config, dict):
-        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+    """Merges to_be_merged_config into config in place, returning config
 
-    # Merge in place
-    for k, v in to_be_merged_config.items():
-        new_keys = keys + (k,)
+    Nested dicts are merged, other values are replaced. A None value
+    can be replaced by a dict, but not the converse; replacing a dict
+    with a non-dict value or vice versa raises ConfigurationError.
+    keys, if specified, is the key path of config within an enclosing
+    config, and is only used in error messages.
 
-        # Note: this allows None to be replaced by a dict, but not the converse
-        if config.get(k) is None or (
-                not isinstance(config[k], dict) and not isinstance(v, dict)):
-            config[k] = v
-        elif isinstance(config[k], dict) and isinstance(v, dict):
+    The merge walks the configs with an explicit stack rather than
+    recursion, so it isn't limited by the interpreter's recursion limit,
+    and only builds key paths for error messages when there's a conflict.
+    """
+    # config, and the dicts nested in it, may be any mutable mapping
+    # (e.g. LazyConfigParserDict or LayeredConfig), but to_be_merged_config
+    # must be nested dicts
+    if not isinstance(config, (dict, MutableMapping)) or not isinstance(
+            to_be_merged_config, dict):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
 
-            merge_configs(config[k], v, *new_keys)
+    # Key paths are tracked as linked (parent node, key) nodes
+    node = None
+    for k in keys:
+        node = (node, k)
+
+    # Merge in place, depth first, in the same order recursion would
+    stack = [(config, iter(to_be_merged_config.items()), node)]
+    while stack:
+        d, items, node = stack[-1]
+        for k, v in items:
+            # Note: this allows None to be replaced by a dict, but not the converse
+            current = d.get(k)
+            if current is None or (
+                    not isinstance(v, dict) and (type(current) in _SCALAR_TYPES
+                        or not isinstance(current, (dict, MutableMapping)))):
+                d[k] = v
+            elif isinstance(v, dict) and isinstance(current, (dict, MutableMapping)):
+                stack.append((current, iter(v.items()), (node, k)))
+                break
+            else:
+                raise _merge_conflict_error((node, k))
         else:
-            raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(' > '.join(new_keys)))
+            stack.pop()
 
     # return reference to config, even though it was merged in place
     return config
 
+def merge_configs_many(config, *to_be_merged_configs):
+    """Merges any number of configs into config in place, returning config
+
+    merge_configs_many(config, a, b, c) has the same result as
+
+        merge_configs(config, a)
+        merge_configs(config, b)
+        merge_configs(config, c)
+
+    but the configs are merged in a single traversal, in which each
+    nested dict in the result is visited once, together with the dicts
+    from all merged configs at the same key path, in order of precedence
+    (later configs taking precedence over earlier ones). The same
+    conflicts are detected, and, if there are any, the ConfigurationError
+    raised is the one that the first of the sequential merge_configs
+    calls to fail would have raised. As with merge_configs, config may be
+    partially merged when that happens.
+    """
+    if not isinstance(config, (dict, MutableMapping)) or not all(
+            isinstance(c, dict) for c in to_be_merged_configs):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+
+    # (index of merged config, linked key path node) of each conflict
+    conflicts = []
+
+    # Each stack entry is a dict in config along with the dicts from the
+    # merged configs to be merged into it, so that each key path is
+    # visited once, for all merged configs together
+    stack = [(config, list(enumerate(to_be_merged_configs)), None)]
+    while stack:
+        d, sources, node = stack.pop()
+        pending = None
+        for i, source in sources:
+            for k, v in source.items():
+                # Note: this allows None to be replaced by a dict, but not the converse
+                current = d.get(k)
+                if current is None or (
+                        not isinstance(v, dict) and (type(current) in _SCALAR_TYPES
+                            or not isinstance(current, (dict, MutableMapping)))):
+                    d[k] = v
+                elif isinstance(v, dict) and isinstance(current, (dict, MutableMapping)):
+                    if pending is None:
+                        pending = {k: [(i, v)]}
+                    elif k in pending:
+                        pending[k].append((i, v))
+                    else:
+                        pending[k] = [(i, v)]
+                else:
+                    # Sequential merging would stop at this point in
+                    # config i; skip its value
+                    conflicts.append((i, (node, k)))
+
+        if pending is not None:
+            for k, dicts in pending.items():
+                stack.append((d[k], dicts, (node, k)))
+
+    if conflicts:
+        # Find the conflict that sequential merging would have hit first,
+        # i.e. the one in the earliest merged config and, within that
+        # config, the earliest in depth first order
+        def order(conflict):
+            i, node = conflict
+            positions = []
+            d = to_be_merged_configs[i]
+            for k in _linked_key_path(node):
+                positions.append(list(d).index(k))
+                d = d[k]
+            return (i, positions)
+        raise _merge_conflict_error(min(conflicts, key=order)[1])
+
+    # return reference to config, even though it was merged in place
+    return config
+
+def _iter_paths(config, prefix=()):
+    """Yields (key path, value) for every key at every level of config"""
+    stack = [(prefix, config)]
+    while stack:
+        prefix, config = stack.pop()
+        for k, v in config.items():
+            path = prefix + (k,)
+            yield path, v
+            if isinstance(v, dict):
+                stack.append((path, v))
+
+##
+## Config dict class
+##
+
+_NOT_INDEXED = object()
+
+class ConfigDict(dict):
+    """Config dict with get, set, and in-place merge methods
+
+    Lookups through get_value use a flat index mapping full key path
+    tuples to values, so that a lookup costs one hash probe no matter
+    how deeply nested the value is. The index is built on the first
+    lookup and is patched incrementally by set_value, merge, and item
+    assignment and deletion on the ConfigDict itself. Other dict
+    methods (update, pop, etc.) discard it, to be rebuilt on the next
+    lookup.
+
+    Nested dicts are plain dicts, so the index can't see changes made
+    to them directly; call invalidate_index after doing so. Set
+    use_index to False to disable the index altogether.
+    """
+
+    use_index = True
+    _index = None
+
+    def __reduce__(self):
+        # Don't pickle or copy the index
+        return (self.__class__, (dict(self),))
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self, *keys, **kwargs)"""
+        if _access_profile is not None:
+            return _access_profile._get_value(self, keys, kwargs)
+        value = self._get_indexed_value(keys, _NOT_INDEXED)
+        if value is not _NOT_INDEXED:
+            return value
+        # Let get_config_value handle defaults and errors
+        return get_config_value(self, *keys, **kwargs)
+
+    def _get_indexed_value(self, keys, default):
+        """Returns the value at key path keys from the index, building
+        it if necessary, or default if it's not there or the index is
+        disabled
+        """
+        if keys and self.use_index:
+            if self._index is None:
+                self._index = dict(_iter_paths(self))
+            try:
+                return self._index[keys]
+            except (KeyError, TypeError):
+                pass
+        return default
+
+    def set_value(self, value, *keys):
+        """Sets value with set_config_value(self, value, *keys)"""
+        index, self._index = self._index, None
+        set_config_value(self, value, *keys)
+        if index is not None:
+            self._unindex(index, keys)
+            d = self
+            for i in range(1, len(keys)):
+                d = d[keys[i-1]]
+                index[keys[:i]] = d
+            self._index_subtree(index, keys, value)
+            self._index = index
+
+    def merge(self, to_be_merged_config):
+        """Merges to_be_merged_config into self in place, returning self
+
+        See merge_configs for how conflicts are handled.
+        """
+        index, self._index = self._index, None
+        merge_configs(self, to_be_merged_config)
+        if index is not None:
+            stack = [((), self, to_be_merged_config)]
+            while stack:
+                prefix, config, merged = stack.pop()
+                for k, v in merged.items():
+                    path = prefix + (k,)
+                    if config[k] is v or not isinstance(v, dict):
+                        # replaced (only None and non-dict values are
+                        # replaced, so there's nothing below to unindex)
+                        self._index_subtree(index, path, v)
+                    else:
+                        # merged in place
+                        index[path] = config[k]
+                        stack.append((path, config[k], v))
+            self._index = index
+        return self
+
+    def invalidate_index(self):
+        self._index = None
+
+    @staticmethod
+    def _unindex(index, path):
+        old = index.pop(path, None)
+        if isinstance(old, dict):
+            for p, _ in _iter_paths(old, path):
+                index.pop(p, None)
+
+    @staticmethod
+    def _index_subtree(index, path, value):
+        index[path] = value
+        if isinstance(value, dict):
+            index.update(_iter_paths(value, path))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self._index is not None:
+            self._unindex(self._index, (key,))
+            self._index_subtree(self._index, (key,), value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        if self._index is not None:
+            self._unindex(self._index, (key,))
+
+    def _invalidating(name):
+        method = getattr(dict, name)
+        def f(self, *args, **kwargs):
+            self._index = None
+            return method(self, *args, **kwargs)
+        f.__name__ = name
+        f.__doc__ = method.__doc__
+        return f
+
+    update = _invalidating('update')
+    setdefault = _invalidating('setdefault')
+    pop = _invalidating('pop')
+    popitem = _invalidating('popitem')
+    clear = _invalidating('clear')
+    if hasattr(dict, '__ior__'):
+        # Python 3.9+; dict's |= doesn't go through update
+        __ior__ = _invalidating('__ior__')
+    del _invalidating
+
 ##
 ## Config dict immutability
 ##
@@ -139,6 +581,11 @@ class ImmutableConfigDict(dict):
     def __hash__(self):
         return id(self)
 
+    def __reduce__(self):
+        # The default reduction sets items one at a time on unpickling,
+        # which __setitem__ doesn't allow
+        return (self.__class__, (dict(self),))
+
     def _immutable(self, *args, **kws):
         raise TypeError('object is immutable')
 
@@ -149,5 +596,7 @@ class ImmutableConfigDict(dict):
     setdefault  = _immutable
     pop         = _immutable
     popitem     = _immutable
+    # dict's |= (Python 3.9+) doesn't go through update
+    __ior__     = _immutable
 
 
@@ -0,0 +1,93 @@
+"""afconfig.aio
+
+Loading config layers concurrently, with asyncio
+"""
+
+__author__ = "Joel Dubowy"
+
+import asyncio
+import inspect
+import json
+import urllib.request
+
+from . import merge_configs_many, ConfigurationError
+from .loaders import load_file
+
+__all__ = [
+    'load_configs',
+    'load_layers'
+]
+
+LOAD_ERR_MSG_INVALID_CONFIG = "Config source {} doesn't contain a dict"
+LOAD_ERR_MSG_INVALID_SOURCE = "Invalid config source: {!r}"
+
+URL_SCHEMES = ('http://', 'https://')
+
+async def load_configs(sources, executor=None, timeout=None):
+    """Loads all config sources concurrently, and merges them in order
+
+    Returns the same config as
+
+        merge_configs_many({}, *[load(s) for s in sources])
+
+    i.e. later sources take precedence over earlier ones, whatever order
+    they finish loading in, and conflicts raise the same
+    ConfigurationError. See load_layers for the supported sources and
+    the executor and timeout options.
+    """
+    layers = await load_layers(sources, executor=executor, timeout=timeout)
+    return merge_configs_many({}, *layers)
+
+async def load_layers(sources, executor=None, timeout=None):
+    """Loads all config sources concurrently, returning the list of
+    loaded configs, in the same order as sources
+
+    Each source may be:
+     - a dict -- used as is
+     - an http:// or https:// URL -- fetched and parsed as JSON
+     - a filename -- loaded with load_file (i.e. as INI or JSON,
+          depending on the extension)
+     - a coroutine function -- called and awaited
+     - any other callable -- called with no arguments
+
+    Files are loaded, fetched JSON parsed, and callables called in
+    executor (by default, the event loop's default thread pool). Pass a
+    ProcessPoolExecutor to parse large files in parallel without
+    contending for the GIL; callables must then be picklable. URLs are
+    always fetched in the default thread pool, with the given timeout,
+    in seconds.
+
+    If any sources fail to load, the exception raised is that of the
+    first of them, in the order of sources, once all have finished.
+    """
+    loop = asyncio.get_running_loop()
+    layers = await asyncio.gather(*[_load(loop, source, executor, timeout)
+        for source in sources], return_exceptions=True)
+    for layer in layers:
+        if isinstance(layer, BaseException):
+            raise layer
+    return layers
+
+async def _load(loop, source, executor, timeout):
+    if isinstance(source, dict):
+        config = source
+    elif isinstance(source, str) and source.lower().startswith(URL_SCHEMES):
+        data = await loop.run_in_executor(None, _fetch, source, timeout)
+        config = await loop.run_in_executor(executor, json.loads, data)
+    elif isinstance(source, str):
+        config = await loop.run_in_executor(executor, load_file, source)
+    elif inspect.iscoroutinefunction(source):
+        config = await source()
+    elif callable(source):
+        config = await loop.run_in_executor(executor, source)
+    else:
+        raise ConfigurationError(LOAD_ERR_MSG_INVALID_SOURCE.format(source))
+
+    if not isinstance(config, dict):
+        raise ConfigurationError(LOAD_ERR_MSG_INVALID_CONFIG.format(
+            source if isinstance(source, str) else repr(source)))
+    return config
+
+def _fetch(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
@@ -0,0 +1,109 @@
+"""afconfig.atomic
+
+Thread-safe config holder with lock-free reads
+"""
+
+__author__ = "Joel Dubowy"
+
+import threading
+from collections.abc import Mapping
+
+from . import ConfigurationError, SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+from .persistent import _freeze
+
+__all__ = [
+    'AtomicConfig'
+]
+
+class AtomicConfig(object):
+    """Holds a FrozenConfigDict that can be safely replaced while other
+    threads are reading it
+
+    Readers call snapshot (or get_value) without taking any lock. The
+    snapshot is deeply immutable, so a reader sees one consistent config
+    for as long as it holds on to it, no matter what's published in the
+    meantime:
+
+        config = atomic_config.snapshot()
+        a = config.get_value('a')
+        b = config.get_value('b')  # from the same config as a
+
+    Writers (publish, merge, set_value, update) build the new config
+    off to the side, sharing unchanged subtrees with the current one (see
+    FrozenConfigDict), and then publish it with a single reference
+    assignment. Writers are serialized with a lock, so concurrent
+    updates are never lost, but never block readers.
+    """
+
+    def __init__(self, config=None):
+        self._lock = threading.Lock()
+        self._config = _frozen_config(config if config is not None else {})
+        self._version = 0
+
+    def snapshot(self):
+        """Returns the current config, as a FrozenConfigDict"""
+        return self._config
+
+    @property
+    def version(self):
+        """Number of times a new config has been published"""
+        return self._version
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self.snapshot(), *keys, **kwargs)"""
+        return self._config.get_value(*keys, **kwargs)
+
+    def publish(self, config):
+        """Replaces the config, returning the new FrozenConfigDict"""
+        config = _frozen_config(config)
+        with self._lock:
+            self._set(config)
+        return config
+
+    def update(self, func):
+        """Replaces the config with func(current config)
+
+        func is called with the writer lock held and must return a
+        config (ideally built from the current one with assoc_in,
+        dissoc_in, or merge); if it raises, the current config is kept.
+        Returns the new FrozenConfigDict.
+        """
+        with self._lock:
+            config = _frozen_config(func(self._config))
+            self._set(config)
+        return config
+
+    def merge(self, to_be_merged_config):
+        """Merges to_be_merged_config into the config, as by merge_configs,
+        but without ever exposing a partially merged config
+        """
+        return self.update(lambda c: c.merge(to_be_merged_config))
+
+    def set_value(self, value, *keys):
+        """Sets value at key path keys, as by set_config_value"""
+        return self.update(lambda c: c.assoc_in(keys, value))
+
+    def compare_and_set(self, expected, config):
+        """Publishes config only if the current config is expected
+
+        Returns True if config was published.
+        """
+        config = _frozen_config(config)
+        with self._lock:
+            if self._config is not expected:
+                return False
+            self._set(config)
+        return True
+
+    def _set(self, config):
+        if config is not self._config:
+            self._config = config
+            self._version += 1
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._config)
+
+def _frozen_config(config):
+    if not isinstance(config, Mapping):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+    return _freeze(config)
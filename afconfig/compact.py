@@ -0,0 +1,194 @@
+"""afconfig.compact
+
+Compact, read-only representation of large config trees
+"""
+
+__author__ = "Joel Dubowy"
+
+import struct
+import sys
+from collections.abc import Mapping
+
+from . import get_config_value
+
+__all__ = [
+    'compact_config',
+    'CompactConfigDict'
+]
+
+def compact_config(config, intern_values=True, share_subtrees=True):
+    """Returns read-only, memory efficient copy of config, as nested
+    CompactConfigDict objects
+
+    Each dict becomes a CompactConfigDict holding just a reference to
+    its shape (its keys, interned, along with a key -> position table),
+    which is shared by all dicts with the same keys in the same order,
+    and a tuple of its values. Lists become tuples.
+
+    Options:
+     - intern_values -- intern string values, so that repeated values
+          (e.g. ecoregion names) are stored once
+     - share_subtrees -- store identical subtrees (and leaf tuples) once
+          and share them, which is safe since they're read-only
+    """
+    compactor = _Compactor(intern_values, share_subtrees)
+    return compactor.compact(config)
+
+class _Shape(object):
+    """Keys of a CompactConfigDict, shared by all those with the same keys"""
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {k: i for i, k in enumerate(keys)}
+
+class CompactConfigDict(Mapping):
+    """Read-only config dict storing its keys in a table shared with
+    other dicts of the same shape, and its values in a tuple
+
+    Supports the read-only dict interface, get_config_value (and
+    get_value), == (with lists and tuples of equal items comparing
+    equal), hashing (by content), and pickling; as with
+    ImmutableConfigDict, methods that would modify it raise TypeError.
+    Use compact_config to create one, and thaw to get back plain dicts.
+    """
+
+    __slots__ = ('_shape', '_values')
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._shape.index[key]]
+        except TypeError:
+            # unhashable key
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            return key in self._shape.index
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __eq__(self, other):
+        # Lists are stored as tuples, so the two compare equal, so that
+        # a compacted config equals the original
+        if other is self:
+            return True
+        if isinstance(other, CompactConfigDict) and (
+                self._shape is other._shape):
+            return _equal(self._values, other._values)
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            k in other and _equal(v, other[k]) for k, v in self._items())
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __hash__(self):
+        return hash((frozenset(self._shape.keys), frozenset(self._items())))
+
+    def __reduce__(self):
+        return (compact_config, (self.thaw(),))
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, dict(self._items()))
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self, *keys, **kwargs)"""
+        return get_config_value(self, *keys, **kwargs)
+
+    def thaw(self):
+        """Returns copy of config as plain, mutable nested dicts (and
+        lists)
+        """
+        return {k: _thaw(v) for k, v in self._items()}
+
+    def _items(self):
+        # Faster than Mapping's items view, which looks up each key
+        return zip(self._shape.keys, self._values)
+
+    def _immutable(self, *args, **kws):
+        raise TypeError('object is immutable')
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear       = _immutable
+    update      = _immutable
+    setdefault  = _immutable
+    pop         = _immutable
+    popitem     = _immutable
+    del _immutable
+
+def _equal(a, b):
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+def _thaw(value):
+    if isinstance(value, CompactConfigDict):
+        return value.thaw()
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+_FLOAT64 = struct.Struct('<d')
+
+def _leaf_key(value):
+    # Keyed by type, since e.g. 1 == 1.0 == True, and floats by their
+    # bytes, since 0.0 == -0.0
+    return (type(value), _FLOAT64.pack(value)
+        if isinstance(value, float) else value)
+
+class _Compactor(object):
+
+    def __init__(self, intern_values, share_subtrees):
+        self._intern_values = intern_values
+        self._shapes = {}
+        self._shared = {} if share_subtrees else None
+
+    def compact(self, value):
+        if isinstance(value, Mapping):
+            return self._compact_dict(value)
+        if isinstance(value, (list, tuple)):
+            values = tuple([self.compact(v) for v in value])
+            return self._share(tuple, values, values)
+        if self._intern_values and type(value) is str:
+            return sys.intern(value)
+        return value
+
+    def _compact_dict(self, config):
+        keys = tuple(sys.intern(k) if type(k) is str else k for k in config)
+        # Keys other than strs are keyed by type (and floats by their
+        # bytes), so that, e.g., dicts with keys 1 and True don't share
+        # a shape
+        shape_key = keys if all(type(k) is str for k in keys) else tuple(
+            _leaf_key(k) for k in keys)
+        shape = self._shapes.get(shape_key)
+        if shape is None:
+            shape = self._shapes[shape_key] = _Shape(keys)
+        values = tuple([self.compact(v) for v in config.values()])
+        d = object.__new__(CompactConfigDict)
+        d._shape = shape
+        d._values = values
+        return self._share(shape, values, d)
+
+    def _share(self, kind, values, value):
+        if self._shared is None:
+            return value
+        # Nested dicts and tuples have already been shared, so they're
+        # keyed by identity; leaves are keyed by _leaf_key
+        try:
+            key = (kind, tuple([id(v) if isinstance(v,
+                (CompactConfigDict, tuple)) else _leaf_key(v)
+                for v in values]))
+            return self._shared.setdefault(key, value)
+        except TypeError:
+            # unhashable leaf value
+            return value
@@ -0,0 +1,131 @@
+"""afconfig.diff
+
+Finding what changed between two configs, and re-applying the changes
+"""
+
+__author__ = "Joel Dubowy"
+
+import collections
+import copy
+from collections.abc import Mapping
+
+from . import (
+    set_config_value,
+    ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+)
+from .persistent import FrozenConfigDict
+
+__all__ = [
+    'diff_configs',
+    'apply_patch',
+    'PatchOp'
+]
+
+PATCH_SET = 'set'
+PATCH_REMOVE = 'remove'
+
+PATCH_ERR_MSG_INVALID_OP = "Invalid patch operation: {!r}"
+
+PatchOp = collections.namedtuple('PatchOp', ['op', 'keys', 'value'])
+PatchOp.__new__.__defaults__ = (None,)
+
+def diff_configs(a, b):
+    """Returns list of PatchOp tuples that turn config a into config b
+
+    Each op is either PatchOp('set', keys, value), for values added or
+    changed in b, or PatchOp('remove', keys, None), for values not in b.
+    Nested dicts in both configs are descended into, so ops are at the
+    deepest key paths that differ. Values of different types (e.g. 1 and
+    True) differ, but lists and tuples with the same items don't,
+    since FrozenConfigDict stores lists as tuples.
+
+    Subtrees that are the same object, or FrozenConfigDict objects with
+    equal cached fingerprints (see config_fingerprint), are skipped
+    without being traversed, so diffing two configs derived from one
+    another with FrozenConfigDict's assoc_in, dissoc_in, or merge costs
+    in proportion to the dicts that differ, not the size of the configs.
+    """
+    if not isinstance(a, Mapping) or not isinstance(b, Mapping):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+
+    ops = []
+    stack = [(a, b, ())]
+    while stack:
+        a, b, keys = stack.pop()
+        if _same_subtree(a, b):
+            continue
+        for k, v in b.items():
+            old_v = a.get(k, _MISSING)
+            if old_v is v:
+                continue
+            if isinstance(v, Mapping) and isinstance(old_v, Mapping):
+                stack.append((old_v, v, keys + (k,)))
+            elif old_v is _MISSING or not _equal(old_v, v):
+                ops.append(PatchOp(PATCH_SET, keys + (k,), v))
+        for k in a:
+            if k not in b:
+                ops.append(PatchOp(PATCH_REMOVE, keys + (k,)))
+    return ops
+
+def apply_patch(config, ops):
+    """Applies ops (e.g. as returned by diff_configs) to config
+
+    Plain dicts are modified in place, with values set as by
+    set_config_value (i.e. creating or replacing dicts along the key
+    path as needed); set values are deep copied, so that the patched
+    config doesn't share mutable values with the ops. For a
+    FrozenConfigDict, a new FrozenConfigDict is built with assoc_in and
+    dissoc_in. Either way, the patched config is returned. Removing a
+    missing value does nothing.
+    """
+    frozen = isinstance(config, FrozenConfigDict)
+    if not frozen and not isinstance(config, dict):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+
+    for op in ops:
+        if len(op) == 3 and op[0] == PATCH_SET:
+            if frozen:
+                config = config.assoc_in(op[1], op[2])
+            else:
+                set_config_value(config, copy.deepcopy(op[2]), *op[1])
+        elif len(op) in (2, 3) and op[0] == PATCH_REMOVE:
+            if frozen:
+                config = config.dissoc_in(op[1])
+            else:
+                _remove_value(config, op[1])
+        else:
+            raise ConfigurationError(PATCH_ERR_MSG_INVALID_OP.format(op))
+    return config
+
+_MISSING = object()
+
+def _same_subtree(a, b):
+    if a is b:
+        return True
+    fingerprint = getattr(a, '_fingerprint', None)
+    return fingerprint is not None and fingerprint == getattr(
+        b, '_fingerprint', None)
+
+def _equal(a, b):
+    if a is b:
+        return True
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (set, frozenset)) and isinstance(b, (set, frozenset)):
+        return a == b
+    if isinstance(a, Mapping) and isinstance(b, Mapping):
+        return len(a) == len(b) and all(
+            k in b and _equal(v, b[k]) for k, v in a.items())
+    return type(a) is type(b) and a == b
+
+def _remove_value(config, keys):
+    keys = tuple(keys)
+    if not keys:
+        raise ConfigurationError(PATCH_ERR_MSG_INVALID_OP.format(
+            (PATCH_REMOVE, keys)))
+    for key in keys[:-1]:
+        config = config.get(key)
+        if not isinstance(config, dict):
+            return
+    config.pop(keys[-1], None)
@@ -0,0 +1,153 @@
+"""afconfig.fingerprint
+
+Stable content fingerprints of config dicts, and memoization keyed on them
+"""
+
+__author__ = "Joel Dubowy"
+
+import collections
+import functools
+import hashlib
+import threading
+from collections.abc import Mapping
+
+from .persistent import FrozenConfigDict
+
+__all__ = [
+    'config_fingerprint',
+    'memoize_on_config'
+]
+
+FINGERPRINT_DIGEST_SIZE = 16
+
+def config_fingerprint(config):
+    """Returns hex digest identifying the content of config
+
+    Equal configs (regardless of key order, and of whether they're
+    plain dicts, FrozenConfigDict objects, or other mappings) have
+    equal fingerprints, which, unlike hash(), are stable across
+    processes and python versions. Lists and tuples fingerprint
+    the same, since FrozenConfigDict converts one to the other.
+
+    Fingerprints of FrozenConfigDict objects are cached per subtree,
+    so fingerprinting a config derived from an already fingerprinted
+    one (e.g. with assoc_in or merge) only costs in proportion to the
+    dicts that differ between them.
+
+    Supported leaf values are None, bool, int, float, str, bytes, and
+    lists, tuples, sets and frozensets of them; anything else raises
+    TypeError.
+    """
+    return _dict_digest(config).hex()
+
+def _dict_digest(config):
+    digest = getattr(config, '_fingerprint', None)
+    if digest is not None:
+        return digest
+
+    items = sorted(_encode(k) + _encode(v) for k, v in config.items())
+    h = hashlib.blake2b(b'd', digest_size=FINGERPRINT_DIGEST_SIZE)
+    for item in items:
+        h.update(item)
+    digest = h.digest()
+
+    if isinstance(config, FrozenConfigDict):
+        config._fingerprint = digest
+    return digest
+
+def _encode(value):
+    # Each encoding is prefixed with a type tag and, for variable
+    # length data, the data length, so that distinct values
+    # can't have the same encoding
+    if isinstance(value, Mapping):
+        return b'D' + _dict_digest(value)
+    if value is None:
+        return b'n'
+    if value is True:
+        return b'T'
+    if value is False:
+        return b'F'
+    if isinstance(value, str):
+        return _tagged(b's', value.encode('utf-8'))
+    if isinstance(value, int):
+        return _tagged(b'i', str(value).encode('ascii'))
+    if isinstance(value, float):
+        return _tagged(b'f', repr(value).encode('ascii'))
+    if isinstance(value, bytes):
+        return _tagged(b'b', value)
+    if isinstance(value, (list, tuple)):
+        return _tagged(b'l', b''.join(_encode(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return _tagged(b'S', b''.join(sorted(_encode(v) for v in value)))
+    raise TypeError("Can't fingerprint config value of type {}".format(
+        type(value).__name__))
+
+def _tagged(tag, data):
+    return tag + str(len(data)).encode('ascii') + b':' + data
+
+##
+## Memoization
+##
+
+CacheInfo = collections.namedtuple('CacheInfo',
+    ['hits', 'misses', 'maxsize', 'currsize'])
+
+def memoize_on_config(maxsize=128):
+    """Decorator caching results by config content and remaining args
+
+    The decorated function's first argument is the config. Results
+    are cached by the config's fingerprint (see config_fingerprint)
+    along with the other args, which must be hashable, so that calls
+    with equal but distinct configs share cache entries. Passing
+    FrozenConfigDict configs makes repeated lookups cheap, since their
+    fingerprints are cached.
+
+    The least recently used entries are evicted once there are more
+    than maxsize of them; if maxsize is None, the cache is unbounded.
+    As with functools.lru_cache, the decorated function has
+    cache_info and cache_clear methods, and the decorator can
+    be applied with or without arguments.
+    """
+    if callable(maxsize):
+        # used without arguments
+        return memoize_on_config()(maxsize)
+
+    def decorator(func):
+        cache = collections.OrderedDict()
+        lock = threading.Lock()
+        stats = {'hits': 0, 'misses': 0}
+
+        @functools.wraps(func)
+        def wrapper(config, *args, **kwargs):
+            key = (config_fingerprint(config), args,
+                tuple(sorted(kwargs.items())))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    stats['hits'] += 1
+                    return cache[key]
+                stats['misses'] += 1
+
+            result = func(config, *args, **kwargs)
+
+            with lock:
+                cache[key] = result
+                if maxsize is not None and len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        def cache_info():
+            with lock:
+                return CacheInfo(stats['hits'], stats['misses'],
+                    maxsize, len(cache))
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                stats['hits'] = stats['misses'] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
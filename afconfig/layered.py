@@ -0,0 +1,205 @@
+"""afconfig.layered
+
+Copy-on-write view of a stack of config dicts, merged lazily
+"""
+
+__author__ = "Joel Dubowy"
+
+import itertools
+from collections.abc import Mapping, MutableMapping
+
+from . import (
+    get_config_value,
+    merge_configs,
+    ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
+    SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+
+__all__ = [
+    'LayeredConfig'
+]
+
+class LayeredConfig(MutableMapping):
+    """Nested view of an ordered list of config dicts
+
+    LayeredConfig(defaults, site, run) looks like the result of
+
+        merge_configs(merge_configs(copy.deepcopy(defaults), site), run)
+
+    but nothing is copied or merged up front. Each key is resolved when
+    it's first read, with the same precedence (later layers taking
+    precedence over earlier ones) and the same conflicts as
+    merge_configs; nested dicts are returned as LayeredConfig views of
+    the layers' dicts at that key path. Creating a view is therefore
+    O(1), and reading from it costs in proportion to what's read.
+
+    Writes (item assignment and deletion, set_value, merge) are recorded
+    in the view and never modify the layers, which can safely be
+    shared by any number of views. The layers themselves shouldn't be
+    modified while views of them are in use, since resolved values are
+    cached.
+
+    Use to_dict to materialize the merged config, or a subtree of it,
+    as plain dicts.
+    """
+
+    def __init__(self, *layers):
+        for layer in layers:
+            if not isinstance(layer, dict):
+                raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+        self._init(layers, ())
+
+    @classmethod
+    def _nested(cls, layers, keys):
+        view = cls.__new__(cls)
+        view._init(layers, keys)
+        return view
+
+    def _init(self, layers, keys):
+        self._layers = tuple(layers)  # lowest precedence first
+        self._keys = keys  # key path of this view, for error messages
+        self._resolved = {}
+        self._writes = {}
+        self._deleted = set()
+
+    ## Reading
+
+    def __getitem__(self, key):
+        try:
+            return self._writes[key]
+        except KeyError:
+            pass
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        if key in self._deleted:
+            raise KeyError(key)
+        value = self._resolved[key] = self._resolve(key)
+        return value
+
+    def _resolve(self, key):
+        dicts = None
+        value = None
+        found = False
+        for layer in self._layers:
+            if key not in layer:
+                continue
+            found = True
+            v = layer[key]
+            # Note: as with merge_configs, this allows None to be
+            # replaced by a dict, but not the converse
+            if value is None or (
+                    not isinstance(value, dict) and not isinstance(v, dict)):
+                value = v
+                if isinstance(v, dict):
+                    dicts = [v]
+            elif isinstance(value, dict) and isinstance(v, dict):
+                dicts.append(v)
+            else:
+                raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(
+                    ' > '.join(self._keys + (key,))))
+
+        if not found:
+            raise KeyError(key)
+        if dicts is not None:
+            return self._nested(dicts, self._keys + (key,))
+        return value
+
+    def __contains__(self, key):
+        if key in self._writes:
+            return True
+        if key in self._deleted:
+            return False
+        return any(key in layer for layer in self._layers)
+
+    def __iter__(self):
+        # Keys are in the order merge_configs would have added them
+        keys = dict.fromkeys(itertools.chain(*self._layers))
+        for key in self._deleted:
+            keys.pop(key, None)
+        keys.update(dict.fromkeys(self._writes))
+        return iter(keys)
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self, *keys, **kwargs)"""
+        return get_config_value(self, *keys, **kwargs)
+
+    def to_dict(self):
+        """Returns the merged config as (new) plain nested dicts
+
+        Values other than nested dicts aren't copied.
+        """
+        d = {}
+        for key in self:
+            value = self[key]
+            if isinstance(value, LayeredConfig):
+                value = value.to_dict()
+            d[key] = value
+        return d
+
+    ## Writing
+
+    def __setitem__(self, key, value):
+        self._writes[key] = value
+        self._resolved.pop(key, None)
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._writes.pop(key, None)
+        self._resolved.pop(key, None)
+        self._deleted.add(key)
+
+    def set_value(self, value, *keys):
+        """Sets value at key path, as set_config_value would"""
+        if not keys:
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS)
+
+        config = self
+        for key in keys[:-1]:
+            if not isinstance(config.get(key), (dict, LayeredConfig)):
+                config[key] = dict()
+            config = config[key]
+        config[keys[-1]] = value
+
+    def merge(self, to_be_merged_config):
+        """Merges to_be_merged_config into the view, returning the view
+
+        Conflicts are handled as by merge_configs.
+        """
+        if not isinstance(to_be_merged_config, dict):
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+
+        # Depth first, in the same order as merge_configs
+        stack = [(self, iter(to_be_merged_config.items()))]
+        while stack:
+            view, items = stack[-1]
+            for k, v in items:
+                # Note: this allows None to be replaced by a dict, but not the converse
+                current = view.get(k)
+                if current is None or (
+                        not isinstance(current, Mapping) and not isinstance(v, dict)):
+                    view[k] = v
+                elif isinstance(current, LayeredConfig) and isinstance(v, dict):
+                    stack.append((current, iter(v.items())))
+                    break
+                elif isinstance(current, dict) and isinstance(v, dict):
+                    # dict previously written to the view
+                    merge_configs(current, v, *(view._keys + (k,)))
+                else:
+                    raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(
+                        ' > '.join(view._keys + (k,))))
+            else:
+                stack.pop()
+
+        return self
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.to_dict())
@@ -0,0 +1,240 @@
+"""afconfig.loaders
+
+Loading config files, optionally only the parts under given key paths
+"""
+
+__author__ = "Joel Dubowy"
+
+import configparser
+import json
+import mmap
+import re
+
+from . import _build_path_trie, ConfigurationError
+from .parsers import config_parser_to_dict
+
+__all__ = [
+    'load_file',
+    'load_json',
+    'load_ini'
+]
+
+INI_EXTENSIONS = ('.ini', '.cfg', '.conf')
+
+def load_file(filename, prefixes=None):
+    """Loads config file with load_ini, if it ends in .ini, .cfg, or
+    .conf, and otherwise with load_json
+    """
+    if filename.lower().endswith(INI_EXTENSIONS):
+        return load_ini(filename, prefixes)
+    return load_json(filename, prefixes)
+
+##
+## JSON
+##
+
+LOAD_JSON_ERR_MSG_INVALID_JSON = "Invalid JSON in {} at byte {}"
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(
+    rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null')
+# Everything up to and including the next opening or closing bracket
+# outside of a string, for skipping over objects and arrays. Other
+# characters are matched one at a time, rather than with a nested +,
+# so that there's only one way to match any input, and a truncated
+# file fails in linear rather than exponential time
+_NEXT_BRACKET = re.compile(
+    rb'(?:[^"\[\]{}]|"[^"\\]*(?:\\.[^"\\]*)*")*([\[\]{}])', re.DOTALL)
+
+def load_json(filename, prefixes=None):
+    """Loads JSON config file, or just the subtrees under prefixes
+
+    prefixes is a list of key paths (tuples of keys). If specified, only
+    the values at those key paths are loaded, along with the dicts
+    enclosing them; everything else in the file is scanned over without
+    being decoded. Key paths not in the file are ignored.
+
+    The file is memory mapped rather than read into memory, so that
+    loading a handful of entries from a very large file costs little
+    more than the OS reading its pages.
+    """
+    if prefixes is None:
+        with open(filename, 'rb') as f:
+            return json.load(f)
+
+    trie = _build_path_trie([tuple(p) for p in prefixes])
+    if trie[1]:
+        # empty key path, i.e. everything
+        return load_json(filename)
+
+    with open(filename, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            raise ConfigurationError(LOAD_JSON_ERR_MSG_INVALID_JSON.format(
+                filename, 0))
+        try:
+            scanner = _JSONScanner(buf, filename)
+            pos = scanner.skip_whitespace(0)
+            if buf[pos:pos+1] != b'{':
+                scanner.fail(pos)
+            config = {}
+            pos = scanner.skip_whitespace(scanner.load_object(pos, trie[0], config))
+            if pos != len(buf):
+                scanner.fail(pos)
+            return config
+        finally:
+            buf.close()
+
+class _JSONScanner(object):
+
+    def __init__(self, buf, filename):
+        self.buf = buf
+        self.filename = filename
+
+    def fail(self, pos):
+        raise ConfigurationError(LOAD_JSON_ERR_MSG_INVALID_JSON.format(
+            self.filename, pos))
+
+    def skip_whitespace(self, pos):
+        return _WHITESPACE.match(self.buf, pos).end()
+
+    def expect(self, pos, char):
+        pos = self.skip_whitespace(pos)
+        if self.buf[pos:pos+1] != char:
+            self.fail(pos)
+        return self.skip_whitespace(pos + 1)
+
+    def skip_value(self, pos):
+        """Returns position right after the value starting at pos"""
+        buf = self.buf
+        c = buf[pos:pos+1]
+        if c == b'{' or c == b'[':
+            depth = 1
+            pos += 1
+            while True:
+                m = _NEXT_BRACKET.match(buf, pos)
+                if m is None:
+                    self.fail(pos)
+                pos = m.end()
+                if m.group(1) in b'[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return pos
+
+        m = (_STRING if c == b'"' else _SCALAR).match(buf, pos)
+        if m is None:
+            self.fail(pos)
+        return m.end()
+
+    def load_object(self, pos, children, config):
+        """Loads into config the subtrees of the object at pos that
+        match the trie nodes in children, returning position right after
+        the object
+        """
+        buf = self.buf
+        pos = self.skip_whitespace(pos + 1)
+        if buf[pos:pos+1] == b'}':
+            return pos + 1
+
+        while True:
+            m = _STRING.match(buf, pos)
+            if m is None:
+                self.fail(pos)
+            key = m.group()
+            key = (json.loads(key) if b'\\' in key
+                else key[1:-1].decode('utf-8'))
+            pos = self.expect(m.end(), b':')
+
+            child = children.get(key)
+            if child is None:
+                pos = self.skip_value(pos)
+            elif child[1]:
+                # a requested key path ends here; take the whole value
+                end = self.skip_value(pos)
+                config[key] = json.loads(buf[pos:end])
+                pos = end
+            elif buf[pos:pos+1] == b'{':
+                d = {}
+                pos = self.load_object(pos, child[0], d)
+                # As with json.load, a duplicate key replaces any
+                # earlier value
+                if d:
+                    config[key] = d
+                else:
+                    config.pop(key, None)
+            else:
+                # not an object, so nothing below it to load
+                pos = self.skip_value(pos)
+                config.pop(key, None)
+
+            pos = self.skip_whitespace(pos)
+            c = buf[pos:pos+1]
+            if c == b'}':
+                return pos + 1
+            elif c != b',':
+                self.fail(pos)
+            pos = self.skip_whitespace(pos + 1)
+
+##
+## INI
+##
+
+def load_ini(filename, prefixes=None, config_parser=None, raw=False):
+    """Loads INI config file, or just the sections and options under prefixes
+
+    prefixes is a list of key paths, each either (section,) or
+    (section, option). If specified, lines of other sections are
+    skipped as the file is read, never reaching the parser. Note that
+    section and option names are matched after the parser's
+    transformations (e.g. options are lowercased by default).
+
+    config_parser is the ConfigParser object to read the file with
+    (a new ConfigParser by default); raw is passed on to
+    config_parser_to_dict. Interpolation that refers to skipped
+    sections (e.g. with ExtendedInterpolation) will fail; use raw=True
+    to avoid that.
+    """
+    if config_parser is None:
+        config_parser = configparser.ConfigParser()
+
+    trie = None
+    if prefixes is not None:
+        trie = _build_path_trie([tuple(p) for p in prefixes])
+        if trie[1]:
+            # empty key path, i.e. everything
+            trie = None
+
+    with open(filename) as f:
+        lines = f if trie is None else _filter_ini_lines(
+            f, config_parser, set(trie[0]))
+        config_parser.read_file(lines, source=filename)
+
+    config = config_parser_to_dict(config_parser, raw=raw)
+    if trie is None:
+        return config
+
+    for section, (options, indices) in trie[0].items():
+        if indices or section not in config:
+            continue
+        # only specific options requested
+        config[section] = {o: v for o, v in config[section].items()
+            if o in options and options[o][1]}
+    return {s: d for s, d in config.items()
+        if s in trie[0] and (d or trie[0][s][1])}
+
+def _filter_ini_lines(lines, config_parser, sections):
+    """Yields only the lines of the given sections (and defaults)"""
+    sections = sections | {config_parser.default_section}
+    keep = True  # let the parser handle lines before any section header
+    for line in lines:
+        if line[:1] == '[':
+            m = config_parser.SECTCRE.match(line.strip())
+            if m:
+                keep = m.group('header') in sections
+        if keep:
+            yield line
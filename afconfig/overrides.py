@@ -0,0 +1,170 @@
+"""afconfig.overrides
+
+Overriding config values with environment variables and command line options
+"""
+
+__author__ = "Joel Dubowy"
+
+import json
+import os
+
+from . import merge_configs, set_config_value, ConfigurationError
+
+__all__ = [
+    'ConfigOverrides'
+]
+
+OVERRIDES_ERR_MSG_NO_ENV_PREFIX = "Specify environment variable prefix"
+OVERRIDES_ERR_MSG_INVALID_OPTION = "Invalid config option {!r}; expecting KEY_PATH=VALUE"
+OVERRIDES_ERR_MSG_UNKNOWN_OPTION = "Unknown config option {!r}"
+
+class ConfigOverrides(object):
+    """Overrides of config values from environment variables and
+    command line options
+
+    Environment variable names are env_prefix followed by the keys of
+    the key path, upper cased and joined with separator, e.g. with
+    prefix 'BLUESKY__', BLUESKY__EMISSIONS__SPECIES sets
+    ('emissions', 'species'). Command line options are 'a.b.c=value'
+    strings (whitespace around the key path and value is ignored), e.g.
+    as collected by add_argument:
+
+        overrides = ConfigOverrides('BLUESKY__')
+        parser = argparse.ArgumentParser()
+        overrides.add_argument(parser)
+        args = parser.parse_args()
+        overrides.apply(config, options=args.config_options)
+
+    If paths, the list of valid key paths, is specified, the mapping from
+    variable and option names to key paths is computed once, up front,
+    and only the names in it are looked up, rather than every
+    environment variable being scanned; unknown options then raise
+    ConfigurationError. Otherwise, each matching name is split into a
+    key path (lower cased, for environment variables) the first time
+    it's seen, and the result cached.
+
+    Values are parsed as JSON (so 'true', '1.5', and '[1, 2]' become
+    bool, float, and list), falling back to the string itself, unless
+    parse_values is False. Only the values of matching names are
+    parsed, each distinct string once.
+    """
+
+    def __init__(self, env_prefix, separator='__', paths=None,
+            parse_values=True):
+        if not env_prefix:
+            raise ConfigurationError(OVERRIDES_ERR_MSG_NO_ENV_PREFIX)
+        self._env_prefix = env_prefix
+        self._separator = separator
+        self._parse_values = parse_values
+        self._values = {}
+
+        self._env_map = self._option_map = None
+        if paths is not None:
+            paths = [tuple(p) for p in paths]
+            self._env_map = {self._env_name(p): p for p in paths}
+            self._option_map = {'.'.join(p): p for p in paths}
+        self._env_cache = {}
+        self._option_cache = {}
+
+    def _env_name(self, keys):
+        return self._env_prefix + self._separator.join(
+            k.upper() for k in keys)
+
+    def add_argument(self, parser, *flags, **kwargs):
+        """Adds repeatable option (by default -C/--config-option) to
+        argparse parser, collected into args.config_options
+        """
+        kwargs.setdefault('dest', 'config_options')
+        kwargs.setdefault('action', 'append')
+        kwargs.setdefault('default', [])
+        kwargs.setdefault('metavar', 'KEY_PATH=VALUE')
+        kwargs.setdefault('help', "Override config value, e.g. "
+            "emissions.species='[\"PM2.5\"]'; env var {} does the same".format(
+            self._env_name(('emissions', 'species'))))
+        return parser.add_argument(*(flags or ('-C', '--config-option')),
+            **kwargs)
+
+    ##
+    ## Collecting and applying overrides
+    ##
+
+    def collect(self, environ=None, options=None):
+        """Returns dict of all overrides, with options taking precedence
+        over environment variables
+
+        environ defaults to os.environ
+        """
+        overrides = {}
+        for keys, value in self._env_overrides(
+                os.environ if environ is None else environ):
+            set_config_value(overrides, self._parse(value), *keys)
+        for keys, value in self._option_overrides(options or []):
+            set_config_value(overrides, self._parse(value), *keys)
+        return overrides
+
+    def apply(self, config, environ=None, options=None):
+        """Merges all overrides into config in a single merge_configs
+        call, returning config
+        """
+        overrides = self.collect(environ=environ, options=options)
+        if overrides:
+            merge_configs(config, overrides)
+        return config
+
+    def _env_overrides(self, environ):
+        if self._env_map is not None:
+            if len(self._env_map) < len(environ):
+                for name, keys in self._env_map.items():
+                    value = environ.get(name)
+                    if value is not None:
+                        yield keys, value
+            else:
+                for name, value in environ.items():
+                    keys = self._env_map.get(name)
+                    if keys is not None:
+                        yield keys, value
+            return
+
+        prefix = self._env_prefix
+        cache = self._env_cache
+        for name in [n for n in environ if n.startswith(prefix)]:
+            keys = cache.get(name)
+            if keys is None:
+                keys = cache[name] = tuple(k.lower() for k in
+                    name[len(prefix):].split(self._separator) if k)
+            if keys:
+                yield keys, environ[name]
+
+    def _option_overrides(self, options):
+        for option in options:
+            name, sep, value = option.partition('=')
+            name = name.strip()
+            if not sep or not all(name.split('.')):
+                raise ConfigurationError(
+                    OVERRIDES_ERR_MSG_INVALID_OPTION.format(option))
+            if self._option_map is not None:
+                keys = self._option_map.get(name)
+                if keys is None:
+                    raise ConfigurationError(
+                        OVERRIDES_ERR_MSG_UNKNOWN_OPTION.format(name))
+            else:
+                keys = self._option_cache.get(name)
+                if keys is None:
+                    keys = self._option_cache[name] = tuple(name.split('.'))
+            yield keys, value.strip()
+
+    def _parse(self, value):
+        if not self._parse_values:
+            return value
+        try:
+            return self._values[value]
+        except KeyError:
+            pass
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = value
+        # Don't cache mutable values, which callers could modify
+        if not isinstance(parsed, (dict, list)):
+            self._values[value] = parsed
+        return parsed
@@ -0,0 +1,158 @@
+"""afconfig.parsers
+
+Converting ConfigParser objects to config dicts
+
+Imported lazily by afconfig, on first access to config_parser_to_dict or
+LazyConfigParserDict.
+"""
+
+__author__ = "Joel Dubowy"
+
+from collections.abc import Mapping, MutableMapping
+
+__all__ = [
+    'config_parser_to_dict',
+    'LazyConfigParserDict'
+]
+
+def config_parser_to_dict(config, lazy=False, raw=False):
+    """Converts ConfigParser object to dict of section dicts
+
+    Options:
+     - lazy -- return LazyConfigParserDict, which converts (and
+          interpolates) each section when it's first accessed, rather
+          than converting all of them up front
+     - raw -- don't interpolate values; sections are copied in bulk
+          from the parser's internal storage, which is much faster
+          than getting each value through the parser
+    """
+    if lazy:
+        return LazyConfigParserDict(config, raw=raw)
+
+    d = {}
+    if config:
+        if raw:
+            return {s: _raw_config_parser_section(config, s)
+                for s in config.sections()}
+        return {s:{k:v for k,v in config.items(s)} for s in config.sections()}
+    return d
+
+def _raw_config_parser_section(config, section):
+    try:
+        # Same as what config.items(section, raw=True) returns, without
+        # going through the parser for each value
+        d = dict(config._defaults)
+        d.update(config._sections[section])
+        return d
+    except AttributeError:
+        return dict(config.items(section, raw=True))
+
+def _config_parser_section(config, section, raw):
+    if raw:
+        return _raw_config_parser_section(config, section)
+    return {k:v for k,v in config.items(section)}
+
+class LazyConfigParserDict(MutableMapping):
+    """Mapping of ConfigParser sections, each converted to a dict on
+    first access
+
+    Looking up a section (via [], get, in, get_config_value, etc.)
+    converts just that section, so the cost of interpolating values is
+    only paid for the sections that are used. Iterating over values or
+    items, ==, |, etc. convert all remaining sections; call materialize
+    to do so explicitly.
+
+    This isn't a dict subclass, since dict-level operations implemented
+    in C (e.g. json.dumps, and dict's |) read a dict's storage directly,
+    and so would only see the sections already converted. Use
+    dict(lazy_dict), or json.dumps(lazy_dict, default=dict), to get a
+    plain dict.
+
+    The ConfigParser object shouldn't be modified while there are
+    unconverted sections.
+    """
+
+    def __init__(self, config, raw=False):
+        self._config = config
+        self._raw = raw
+        # All keys, in order (sections first), as an ordered set, and
+        # the values of those converted or set so far
+        self._keys = dict.fromkeys(config.sections() if config else [])
+        self._converted = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._converted[key]
+        except KeyError:
+            pass
+        if key in self._keys:
+            value = _config_parser_section(self._config, key, self._raw)
+            self._converted[key] = value
+            return value
+        raise KeyError(key)
+
+    def materialize(self):
+        """Converts any remaining sections, returning self"""
+        for key in self._keys:
+            if key not in self._converted:
+                self[key]
+        return self
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __setitem__(self, key, value):
+        self._keys[key] = None
+        self._converted[key] = value
+
+    def __delitem__(self, key):
+        del self._keys[key]
+        self._converted.pop(key, None)
+
+    def copy(self):
+        """Returns plain dict copy, with all sections converted"""
+        self.materialize()
+        return {key: self._converted[key] for key in self._keys}
+
+    def __eq__(self, other):
+        if isinstance(other, LazyConfigParserDict):
+            other = other.copy()
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.copy() == other
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __or__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        d = self.copy()
+        d.update(other)
+        return d
+
+    def __ror__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        d = dict(other)
+        d.update(self.copy())
+        return d
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.copy())
@@ -0,0 +1,195 @@
+"""afconfig.persistent
+
+Deeply immutable, persistent config dicts
+"""
+
+__author__ = "Joel Dubowy"
+
+from collections.abc import Mapping
+
+from . import (
+    get_config_value,
+    ImmutableConfigDict,
+    ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
+    SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+
+__all__ = [
+    'FrozenConfigDict'
+]
+
+class FrozenConfigDict(ImmutableConfigDict):
+    """Deeply immutable config dict, with cheap modified copies
+
+    On construction, nested dicts (and other mappings, such as
+    LayeredConfig views) are converted to FrozenConfigDict
+    objects, lists and tuples to tuples, and sets to frozensets. Nested
+    FrozenConfigDict objects are used as is, not copied.
+
+    Updates (assoc_in, dissoc_in, merge) return new FrozenConfigDict
+    objects, copying only the dicts along the updated key paths and
+    sharing all other subtrees with the original. A single-value update
+    therefore costs O(depth * width of the dicts on the path) rather than
+    O(size of the config), and thousands of variants of a large config
+    only cost the memory of what differs between them.
+
+    Unlike ImmutableConfigDict, which hashes by id, FrozenConfigDict
+    objects hash by content (computed once and cached per subtree), so
+    equal configs can be used interchangeably as dict keys and set
+    members. All leaf values must therefore be hashable.
+    """
+
+    _hash = None
+    _fingerprint = None  # see afconfig.fingerprint
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, ((k, _freeze(v))
+            for k, v in dict(*args, **kwargs).items()))
+
+    @classmethod
+    def _wrap(cls, d):
+        """Returns FrozenConfigDict with d's (already frozen) items"""
+        frozen = dict.__new__(cls)
+        dict.update(frozen, d)
+        return frozen
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if (isinstance(other, FrozenConfigDict) and self._hash is not None
+                and other._hash is not None and self._hash != other._hash):
+            return False
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self, *keys, **kwargs)"""
+        return get_config_value(self, *keys, **kwargs)
+
+    def assoc_in(self, keys, value):
+        """Returns copy with value set at key path keys
+
+        As with set_config_value, any non-dict values along the key
+        path are replaced with dicts.
+        """
+        keys = tuple(keys)
+        if not keys:
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS)
+
+        nodes = [self]
+        for key in keys[:-1]:
+            node = nodes[-1].get(key)
+            nodes.append(node if isinstance(node, FrozenConfigDict)
+                else _EMPTY)
+
+        value = _freeze(value)
+        if nodes[-1].get(keys[-1], _MISSING) is value:
+            return self
+        for node, key in zip(reversed(nodes), reversed(keys)):
+            d = dict(node)
+            d[key] = value
+            value = self._wrap(d)
+        return value
+
+    def dissoc_in(self, keys):
+        """Returns copy without the value at key path keys
+
+        Returns self if there's no value at keys.
+        """
+        keys = tuple(keys)
+        if not keys:
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS)
+
+        nodes = [self]
+        for key in keys[:-1]:
+            node = nodes[-1].get(key)
+            if not isinstance(node, FrozenConfigDict):
+                return self
+            nodes.append(node)
+        if keys[-1] not in nodes[-1]:
+            return self
+
+        value = _MISSING
+        for node, key in zip(reversed(nodes), reversed(keys)):
+            d = dict(node)
+            if value is _MISSING:
+                del d[key]
+            else:
+                d[key] = value
+            value = self._wrap(d)
+        return value
+
+    def merge(self, to_be_merged_config):
+        """Returns copy with to_be_merged_config merged into it
+
+        Conflicts are handled as by merge_configs.
+        """
+        if not isinstance(to_be_merged_config, dict):
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+        return _merge(self, to_be_merged_config, ())
+
+    def thaw(self):
+        """Returns copy of config as plain, mutable nested dicts"""
+        return {k: v.thaw() if isinstance(v, FrozenConfigDict) else v
+            for k, v in self.items()}
+
+_MISSING = object()
+_EMPTY = FrozenConfigDict()
+
+def _freeze(value):
+    if isinstance(value, FrozenConfigDict):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenConfigDict(value)
+    if isinstance(value, (list, tuple)):
+        frozen = tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        frozen = frozenset(_freeze(v) for v in value)
+    else:
+        return value
+    # Share already frozen tuples and frozensets
+    if type(value) is type(frozen) and all(
+            a is b for a, b in zip(frozen, value)):
+        return value
+    return frozen
+
+def _merge(config, to_be_merged_config, keys):
+    d = None
+    for k, v in to_be_merged_config.items():
+        current = config.get(k)
+        # Note: this allows None to be replaced by a dict, but not the converse
+        if current is None or (
+                not isinstance(current, dict) and not isinstance(v, dict)):
+            v = _freeze(v)
+        elif isinstance(current, dict) and isinstance(v, dict):
+            v = _merge(current, v, keys + (k,))
+        else:
+            raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(
+                ' > '.join(keys + (k,))))
+
+        if config.get(k, _MISSING) is not v:
+            if d is None:
+                d = dict(config)
+            d[k] = v
+
+    # Share config if nothing changed
+    return config if d is None else FrozenConfigDict._wrap(d)
@@ -0,0 +1,186 @@
+"""afconfig.profiling
+
+Opt-in recording of which config key paths are looked up, how often,
+and from where
+"""
+
+__author__ = "Joel Dubowy"
+
+import collections
+import json
+import sys
+import threading
+import time
+
+import afconfig
+from . import (
+    _get_config_value,
+    ConfigDict,
+    ConfigurationError,
+    GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+)
+
+__all__ = [
+    'ConfigAccessProfile'
+]
+
+class ConfigAccessProfile(object):
+    """Records get_config_value and ConfigDict.get_value calls while
+    enabled
+
+    For each key path looked up, the number of hits, misses (i.e.
+    lookups returning the default or raising KeyError), and cumulative
+    time spent are recorded, as well as, if callers is True, the
+    file and line number of each caller (i.e. of the innermost frame
+    outside of afconfig, so that lookups through, e.g.,
+    FrozenConfigDict.get_value are attributed to the code calling it):
+
+        with ConfigAccessProfile(callers=True) as profile:
+            run()
+        print(profile.to_json(indent=2))
+
+    Lookups through FrozenConfigDict, AtomicConfig, etc., which call
+    get_config_value, are recorded as well, but not those made with
+    compile_path accessors or get_config_values.
+
+    If callback is specified, it's called as callback(keys, hit,
+    seconds) after each lookup, e.g. to forward stats elsewhere.
+
+    Only one profile can be enabled at a time. When none is, the only
+    overhead is a check of a module global per lookup.
+    """
+
+    def __init__(self, callers=False, callback=None):
+        self._callers = callers
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def enable(self):
+        """Starts recording lookups, stopping any other enabled profile"""
+        afconfig._access_profile = self
+        return self
+
+    def disable(self):
+        if afconfig._access_profile is self:
+            afconfig._access_profile = None
+
+    @property
+    def enabled(self):
+        return afconfig._access_profile is self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, e_type, value, tb):
+        self.disable()
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    ##
+    ## Exporting
+    ##
+
+    def to_list(self):
+        """Returns list of per key path stats dicts, in decreasing order
+        of cumulative time
+        """
+        with self._lock:
+            stats = [{
+                'keys': list(keys),
+                'hits': s.hits,
+                'misses': s.misses,
+                'seconds': s.seconds,
+                'callers': dict(s.callers) if s.callers is not None else None
+            } for keys, s in self._stats.items()]
+        stats.sort(key=lambda s: s['seconds'], reverse=True)
+        if not self._callers:
+            for s in stats:
+                del s['callers']
+        return stats
+
+    def to_json(self, **kwargs):
+        """Returns to_list() as JSON; kwargs are passed to json.dumps"""
+        return json.dumps(self.to_list(), **kwargs)
+
+    ##
+    ## Recording
+    ##
+
+    def _get_value(self, config, keys, kwargs):
+        if not keys:
+            raise ConfigurationError(GET_CONFIG_VALUE_ERR_MSG_NO_KEYS)
+        default = kwargs.get('default', None)
+
+        hit = False
+        start = time.perf_counter()
+        try:
+            value = _lookup(config, keys, bool(kwargs.get('fail_on_missing_key')),
+                bool(kwargs.get('fail_on_invalid_config')))
+            hit = value is not _MISSING
+            return value if hit else default
+        finally:
+            # KeyErrors raised with fail_on_missing_key are misses
+            seconds = time.perf_counter() - start
+            caller = _caller() if self._callers else None
+            self._record(keys, hit, seconds, caller)
+
+    def _record(self, keys, hit, seconds, caller):
+        with self._lock:
+            try:
+                stats = self._stats.get(keys)
+            except TypeError:
+                # unhashable key
+                keys = tuple(repr(k) for k in keys)
+                stats = self._stats.get(keys)
+            if stats is None:
+                stats = self._stats[keys] = _KeyPathStats(
+                    collections.Counter() if self._callers else None)
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            stats.seconds += seconds
+            if caller is not None:
+                stats.callers['{}:{}'.format(caller.f_code.co_filename,
+                    caller.f_lineno)] += 1
+        if self._callback:
+            self._callback(keys, hit, seconds)
+
+class _KeyPathStats(object):
+    __slots__ = ('hits', 'misses', 'seconds', 'callers')
+
+    def __init__(self, callers):
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+        self.callers = callers
+
+_MISSING = object()
+
+def _lookup(config, keys, fail_on_missing_key, fail_on_invalid_config):
+    """Returns value at keys, as get_config_value would (or ConfigDict's
+    index, for ConfigDict objects), or _MISSING
+    """
+    if isinstance(config, ConfigDict):
+        value = config._get_indexed_value(keys, _MISSING)
+        if value is not _MISSING:
+            return value
+    return _get_config_value(config, keys, _MISSING,
+        fail_on_missing_key, fail_on_invalid_config)
+
+def _caller():
+    """Returns the innermost frame of the code that called into afconfig,
+    e.g. via FrozenConfigDict.get_value, or None if there isn't one
+    """
+    # frame 0 is this one, 1 is _get_value
+    frame = sys._getframe(2)
+    while frame is not None and _in_afconfig(frame.f_globals.get('__name__')):
+        frame = frame.f_back
+    return frame
+
+def _in_afconfig(module_name):
+    return module_name is not None and (module_name == afconfig.__name__
+        or module_name.startswith(afconfig.__name__ + '.'))
@@ -0,0 +1,177 @@
+"""afconfig.query
+
+Finding the values at key paths with wildcards
+"""
+
+__author__ = "Joel Dubowy"
+
+from collections.abc import Mapping
+
+from . import ConfigurationError, SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+__all__ = [
+    'query_config',
+    'ConfigIndex'
+]
+
+ANY_KEY = '*'
+ANY_PATH = '**'
+
+def query_config(config, *pattern):
+    """Lazily yields (key path, value) for each key path in config
+    matching pattern
+
+    pattern is a key path in which '*' matches any single key, and '**'
+    matches any number (including zero) of keys, e.g.
+
+        query_config(config, 'fuelbeds', '*', 'emission_factors')
+        query_config(config, '**', 'emission_factors')
+
+    Literal keys are looked up directly, so only the parts of config
+    under wildcards are traversed. Matches are yielded in depth-first
+    order, each once. Any collections.abc.Mapping is treated like
+    a dict.
+    """
+    if not isinstance(config, Mapping):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+    pattern = _normalize(pattern)
+    return _dedupe(_walk(config, (), pattern), pattern)
+
+class ConfigIndex(object):
+    """Inverted index, from each key to the key paths ending with it,
+    for repeatedly querying a large config
+
+    query(*pattern) yields the same matches as query_config(config,
+    *pattern), but, rather than walking the config, starts from the
+    index's entries for the pattern's most selective literal key, so
+    that, e.g., ('**', 'emission_factors') costs in proportion to the
+    number of emission_factors keys rather than the size of the config.
+    Patterns without literal keys fall back to walking the config.
+
+    The index is built up front, and doesn't see later changes to the
+    config; create a new ConfigIndex after modifying it.
+    """
+
+    def __init__(self, config):
+        if not isinstance(config, Mapping):
+            raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+        self._config = config
+        self._postings = {}
+        # Depth-first, so that each key's entries are in the same order
+        # as query_config would yield them
+        stack = list(reversed([((k,), v) for k, v in config.items()]))
+        while stack:
+            path, value = stack.pop()
+            self._postings.setdefault(path[-1], []).append((path, value))
+            if isinstance(value, Mapping):
+                stack.extend(reversed([(path + (k,), v)
+                    for k, v in value.items()]))
+
+    def count(self, key):
+        """Returns number of key paths ending with key"""
+        try:
+            return len(self._postings.get(key, ()))
+        except TypeError:
+            # unhashable key
+            return 0
+
+    def query(self, *pattern):
+        """Lazily yields (key path, value) for each key path in the
+        config matching pattern (see query_config)
+        """
+        pattern = _normalize(pattern)
+        literals = [(self.count(k), i) for i, k in enumerate(pattern)
+            if k not in _WILDCARDS]
+        if not literals:
+            return _dedupe(_walk(self._config, (), pattern), pattern)
+
+        count, i = min(literals)
+        head, tail = pattern[:i + 1], pattern[i + 1:]
+        postings = self._postings[pattern[i]] if count else ()
+        return _dedupe((m for path, value in postings
+            if _path_matches(path, head)
+            for m in _walk(value, path, tail)), pattern)
+
+_WILDCARDS = (ANY_KEY, ANY_PATH)
+
+def _normalize(pattern):
+    # Consecutive '**' are equivalent to one
+    normalized = []
+    for k in pattern:
+        if not (k == ANY_PATH and normalized and normalized[-1] == ANY_PATH):
+            normalized.append(k)
+    return tuple(normalized)
+
+def _dedupe(matches, pattern):
+    # With more than one '**', a key path can be matched more than one way
+    if sum(1 for k in pattern if k == ANY_PATH) < 2:
+        return matches
+    return _unique(matches)
+
+def _unique(matches):
+    seen = set()
+    for path, value in matches:
+        if path not in seen:
+            seen.add(path)
+            yield path, value
+
+def _walk(config, path, pattern):
+    """Yields (key path, value) for each match of pattern under config,
+    which is at key path path
+    """
+    # Each stack entry is a value, its key path, and the position in
+    # pattern to match from; children are pushed in reverse, so that
+    # matches are yielded in depth-first order
+    stack = [(config, path, 0)]
+    while stack:
+        value, path, i = stack.pop()
+        if i == len(pattern):
+            yield path, value
+            continue
+
+        key = pattern[i]
+        if key == ANY_PATH:
+            # '**' matching one or more keys, then zero
+            if isinstance(value, Mapping):
+                stack.extend(reversed([(v, path + (k,), i)
+                    for k, v in value.items()]))
+                stack.append((value, path, i + 1))
+            elif i + 1 == len(pattern):
+                # values other than dicts only match a trailing '**'
+                yield path, value
+        elif not isinstance(value, Mapping):
+            continue
+        elif key == ANY_KEY:
+            stack.extend(reversed([(v, path + (k,), i + 1)
+                for k, v in value.items()]))
+        else:
+            try:
+                if key in value:
+                    stack.append((value[key], path + (key,), i + 1))
+            except TypeError:
+                # unhashable key
+                pass
+
+def _path_matches(path, pattern):
+    """Returns True if key path path matches pattern in its entirety"""
+    # Greedy wildcard matching, backtracking to the last '**'
+    p = i = 0
+    star = None
+    while p < len(path):
+        if i < len(pattern) and pattern[i] == ANY_PATH:
+            star = (i, p)
+            i += 1
+        elif i < len(pattern) and (pattern[i] == ANY_KEY
+                or pattern[i] == path[p]):
+            i += 1
+            p += 1
+        elif star is not None:
+            # let the last '**' match one more key
+            i = star[0] + 1
+            p = star[1] + 1
+            star = (star[0], p)
+        else:
+            return False
+    while i < len(pattern) and pattern[i] == ANY_PATH:
+        i += 1
+    return i == len(pattern)
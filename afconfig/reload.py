@@ -0,0 +1,363 @@
+"""afconfig.reload
+
+Reloading layered config files when they change, incrementally
+"""
+
+__author__ = "Joel Dubowy"
+
+import marshal
+import os
+import threading
+from collections.abc import Mapping
+
+from . import (
+    _build_path_trie,
+    ConfigurationError,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+from .atomic import AtomicConfig
+from .diff import _equal
+from .loaders import load_file
+from .persistent import FrozenConfigDict, _freeze, _merge, _EMPTY
+
+__all__ = [
+    'ConfigReloader'
+]
+
+RELOAD_ERR_MSG_INVALID_CONFIG = "Config file {} doesn't contain a dict"
+
+class ConfigReloader(object):
+    """Merged config of a list of files, kept up to date as they change
+
+    filenames are the config layers, in increasing order of precedence,
+    i.e. merged as by merge_configs_many(filenames[0], filenames[1], ...).
+    Each file is loaded with loader(filename), which defaults to
+    load_file (i.e. load_ini for files ending in .ini, .cfg, or .conf,
+    and load_json for everything else).
+
+    check (called directly, or periodically by a thread started with
+    start) stats each file, and re-loads only those whose mtime, inode,
+    or size changed. Each re-loaded layer is diffed against its previous
+    contents, and only the changed key paths are re-merged into the
+    merged config, which shares all other subtrees with the previous
+    version (see FrozenConfigDict). The cost of a reload is therefore
+    that of parsing the changed file, plus the size of the change,
+    rather than that of re-merging everything.
+
+    The merged config is held in an AtomicConfig, so any number of
+    threads can read it while it's being reloaded:
+
+        reloader = ConfigReloader(['defaults.json', 'local.json'])
+        reloader.subscribe(('emissions',), on_emissions_change)
+        reloader.start(interval=1.0)
+        ...
+        reloader.get_value('emissions', 'species')
+
+    Subscribers, registered on key path prefixes, are called as
+    callback(keys, old_value, new_value) (None for missing values) only
+    when the merged value under their prefix actually changes.
+    """
+
+    def __init__(self, filenames, loader=None):
+        self._loader = loader or load_file
+        self._filenames = list(filenames)
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+        self._signatures = [_signature(f) for f in self._filenames]
+        # The layers as loaded, for diffing, and frozen, for merging
+        self._sources = [self._load(f) for f in self._filenames]
+        self._layers = [_freeze(s) for s in self._sources]
+        config = FrozenConfigDict()
+        for layer in self._layers:
+            config = _merge(config, layer, ())
+        self._config = AtomicConfig(config)
+
+    @property
+    def filenames(self):
+        return list(self._filenames)
+
+    @property
+    def config(self):
+        """The current merged config, as a FrozenConfigDict"""
+        return self._config.snapshot()
+
+    def get_value(self, *keys, **kwargs):
+        return self._config.get_value(*keys, **kwargs)
+
+    def subscribe(self, keys, callback):
+        """Calls callback(keys, old_value, new_value) when the merged
+        value at key path keys changes
+
+        An empty key path subscribes to any change.
+        """
+        keys = tuple(keys)
+        with self._lock:
+            self._subscriptions.setdefault(keys, []).append(callback)
+
+    def unsubscribe(self, keys, callback):
+        keys = tuple(keys)
+        with self._lock:
+            callbacks = self._subscriptions.get(keys, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscriptions.pop(keys, None)
+
+    ##
+    ## Reloading
+    ##
+
+    def check(self):
+        """Re-loads any changed files, and returns the list of key paths
+        whose merged values changed
+
+        Files that are (momentarily) missing are skipped, and picked up
+        again on a later check. If a file fails to load or conflicts with
+        the other layers, the exception is raised and the merged config
+        is left unchanged, with the file retried on the next check.
+        """
+        with self._lock:
+            changed_layers = []
+            for idx, filename in enumerate(self._filenames):
+                try:
+                    signature = _signature(filename)
+                except FileNotFoundError:
+                    continue
+                if signature != self._signatures[idx]:
+                    changed_layers.append((idx, signature))
+            if not changed_layers:
+                return []
+
+            sources = list(self._sources)
+            layers = list(self._layers)
+            paths = []
+            for idx, signature in changed_layers:
+                # Patch the previous version of the layer, rather than
+                # freezing the whole new one
+                source = self._load(self._filenames[idx])
+                layer_paths = _diff_paths(sources[idx], source)
+                sources[idx] = source
+                if layer_paths:
+                    layers[idx] = _patch(layers[idx], [(keys,
+                        _get(source, keys)) for keys in layer_paths])
+                    paths.extend(layer_paths)
+
+            old_config = self._config.snapshot()
+            config, changed = _apply(old_config, layers, paths)
+
+            # Only commit once everything has been loaded and merged
+            self._sources = sources
+            self._layers = layers
+            for idx, signature in changed_layers:
+                self._signatures[idx] = signature
+            self._config.publish(config)
+            notifications = self._notifications(old_config, config, changed)
+
+        for callback, keys, old_value, new_value in notifications:
+            callback(keys, old_value, new_value)
+        return changed
+
+    def start(self, interval=1.0, on_error=None):
+        """Starts a daemon thread that calls check every interval seconds
+
+        Exceptions raised by check are passed to on_error, if specified,
+        and otherwise ignored (the file will be retried on the next
+        check).
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+            args=(interval, on_error), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread started by start"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval, on_error):
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+
+    def _load(self, filename):
+        config = self._loader(filename)
+        if not isinstance(config, dict):
+            raise ConfigurationError(
+                RELOAD_ERR_MSG_INVALID_CONFIG.format(filename))
+        return config
+
+    def _notifications(self, old_config, config, changed):
+        # changed are the paths whose merged values changed, so the value
+        # under a subscription's prefix changed if the prefix is one of
+        # them or an ancestor of one; if it's a descendant of one, its
+        # value has to be compared
+        affected = set()
+        for keys in changed:
+            for i in range(len(keys) + 1):
+                affected.add(keys[:i])
+        changed = set(changed)
+
+        notifications = []
+        for keys, callbacks in self._subscriptions.items():
+            if keys not in affected and not any(
+                    keys[:i] in changed for i in range(len(keys))):
+                continue
+            old_value = _get(old_config, keys)
+            new_value = _get(config, keys)
+            if keys in affected or _changed(old_value, new_value):
+                notifications.extend((c, keys,
+                    None if old_value is _MISSING else old_value,
+                    None if new_value is _MISSING else new_value)
+                    for c in callbacks)
+        return notifications
+
+_MISSING = object()
+
+def _signature(filename):
+    s = os.stat(filename)
+    return (s.st_mtime_ns, s.st_ino, s.st_size)
+
+def _get(config, keys):
+    for key in keys:
+        if not isinstance(config, dict) or key not in config:
+            return _MISSING
+        config = config[key]
+    return config
+
+def _diff_paths(old, new, keys=()):
+    """Returns the key paths at which new differs from old
+
+    Nested dicts are descended into, so that only the deepest changed
+    paths are returned; added and removed keys are returned as is.
+    Values are compared by type as well as value, at any depth, so that,
+    e.g., 1 replaced by True counts as a change. Subtrees that are equal
+    (==) are checked with _identical, at C speed, and only descended
+    into if that fails.
+    """
+    paths = []
+    stack = [(old, new, keys)]
+    while stack:
+        old, new, keys = stack.pop()
+        for k, v in new.items():
+            old_v = old.get(k, _MISSING)
+            if old_v is v:
+                continue
+            t = type(v)
+            if t is type(old_v):
+                if t is dict:
+                    if old_v != v or not _identical(old_v, v):
+                        stack.append((old_v, v, keys + (k,)))
+                elif old_v != v or (isinstance(v, (list, tuple))
+                        and not _identical(old_v, v) and _changed(old_v, v)):
+                    paths.append(keys + (k,))
+            elif isinstance(v, dict) and isinstance(old_v, dict):
+                stack.append((old_v, v, keys + (k,)))
+            else:
+                # added, or changed type
+                paths.append(keys + (k,))
+        if len(old) > len(new) or old.keys() != new.keys():
+            paths.extend(keys + (k,) for k in old if k not in new)
+    return paths
+
+def _merged_value(layers, keys):
+    """Returns the value at keys that merging all layers would produce"""
+    value = _MISSING
+    for layer in layers:
+        v = _get(layer, keys)
+        if v is _MISSING:
+            continue
+        # Same rules as merge_configs
+        if value is _MISSING or value is None or (
+                not isinstance(value, dict) and not isinstance(v, dict)):
+            value = v
+        elif isinstance(value, dict) and isinstance(v, dict):
+            value = _merge(value, v, keys)
+        else:
+            raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(
+                ' > '.join(keys)))
+    return value
+
+def _apply(config, layers, paths):
+    """Re-merges the values at paths into config
+
+    Returns the new config, and the paths whose merged values changed
+    """
+    updates = []
+    for keys in paths:
+        value = _merged_value(layers, keys)
+        old_value = _get(config, keys)
+        if value is not old_value and (value is _MISSING
+                or old_value is _MISSING or _changed(old_value, value)):
+            updates.append((keys, value))
+    if updates:
+        config = _patch(config, updates)
+    return config, [keys for keys, value in updates]
+
+def _identical(a, b):
+    """Returns True if a and b are known to have the same types and
+    values throughout, or False if they may not
+
+    marshal's output encodes the type of every value, so, unlike ==, it
+    tells 1, 1.0, and True apart; it also differs for equal dicts in
+    different orders, and it doesn't support arbitrary types, so False
+    only means that a and b need to be compared item by item.
+    """
+    try:
+        return marshal.dumps(a) == marshal.dumps(b)
+    except ValueError:
+        return False
+
+def _changed(old_value, value):
+    # Type-aware, at any depth, so that, e.g., True replacing 1 (or
+    # [True] replacing [1]) counts as a change
+    if type(old_value) is not type(value) or old_value != value:
+        return True
+    if isinstance(value, (list, tuple)):
+        # The values are equal, so only the types of their items can
+        # differ; compare them all at once, and only go through the
+        # items one by one if any of them are containers
+        types = list(map(type, value))
+        if types != list(map(type, old_value)):
+            return True
+        return any(issubclass(t, _CONTAINERS) for t in set(types)) and any(
+            _changed(a, b) for a, b in zip(old_value, value))
+    return isinstance(value, Mapping) and not _equal(old_value, value)
+
+_CONTAINERS = (Mapping, list, tuple)
+
+def _patch(config, updates):
+    """Returns copy of FrozenConfigDict config with the values at the
+    given key paths replaced, or removed if _MISSING
+
+    updates is a list of (keys, value) pairs. Each dict along the
+    updated paths is copied only once, however many of its values
+    change. If one key path is a prefix of another, the value of the
+    shorter one wins.
+    """
+    root = _build_path_trie([keys for keys, value in updates])
+    return _patch_node(config, root[0], updates)
+
+def _patch_node(config, children, updates):
+    d = dict(config)
+    for key, (grandchildren, indices) in children.items():
+        if indices:
+            value = updates[indices[-1]][1]
+            if value is _MISSING:
+                d.pop(key, None)
+            else:
+                d[key] = _freeze(value)
+        else:
+            current = d.get(key)
+            d[key] = _patch_node(current if isinstance(current,
+                FrozenConfigDict) else _EMPTY, grandchildren, updates)
+    return FrozenConfigDict._wrap(d)
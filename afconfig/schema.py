@@ -0,0 +1,244 @@
+"""afconfig.schema
+
+Validating and coercing a config once, into typed objects
+"""
+
+__author__ = "Joel Dubowy"
+
+import collections
+import configparser
+import keyword
+from collections.abc import Mapping
+
+from . import ConfigurationError
+
+__all__ = [
+    'Schema',
+    'Field',
+    'MapOf'
+]
+
+SCHEMA_ERR_MSG_INVALID_SPEC = "Invalid schema spec at key {}"
+SCHEMA_ERR_MSG_INVALID_NAME = "Config key {} isn't a valid attribute name"
+SCHEMA_ERR_MSG_MISSING_KEY = "Key {} not in config"
+SCHEMA_ERR_MSG_NOT_A_DICT = "Config value at key {} must be a dict"
+SCHEMA_ERR_MSG_INVALID_VALUE = "Invalid value for config key {}: {!r}"
+
+_REQUIRED = object()
+
+class Field(object):
+    """Schema spec entry with options
+
+    type is any spec accepted by Schema (a type, a nested dict, etc.);
+    default, if specified, makes the key optional, and is used, as is,
+    when the key is missing or its value is None.
+    """
+
+    def __init__(self, type, default=_REQUIRED):
+        self.type = type
+        self.default = default
+
+class MapOf(object):
+    """Schema spec for a dict with arbitrary keys (e.g. fuelbed ids)
+    and values all matching the same spec
+
+    Loads as a plain dict, since the keys needn't be valid attribute
+    names.
+    """
+
+    def __init__(self, type):
+        self.type = type
+
+class Schema(object):
+    """Compiled config schema
+
+    spec is a dict mapping each expected key to its spec, which is one
+    of the following:
+     - int, float, bool, or str -- coerced from strings (e.g. values
+          loaded from INI files), with bool accepting the same strings
+          as ConfigParser.getboolean
+     - any other callable -- called on the value, which is invalid if
+          it raises ValueError or TypeError
+     - a nested dict spec -- loads as a nested typed object
+     - a one-element list, e.g. [int] -- loads as a tuple of values
+          matching the element's spec; strings are split on commas
+     - MapOf(spec) or Field(spec, ...)
+
+    Schema(spec).load(config) validates and coerces the whole config in
+    one pass, returning a namedtuple (with a nested namedtuple for each
+    nested dict spec), so that reads are plain attribute lookups, with
+    no per-read checks or conversions:
+
+        schema = Schema({
+            'consumption': {'ecoregion': str, 'factor': float},
+            'emissions': {'species': [str], 'enabled': Field(bool, False)}
+        })
+        config = schema.load(config_parser_to_dict(config_parser))
+        config.consumption.factor * 2
+
+    Keys not in the spec are ignored. Invalid or missing values raise
+    ConfigurationError with the full key path.
+    """
+
+    def __init__(self, spec, name='Config'):
+        if not isinstance(spec, dict):
+            raise ConfigurationError(SCHEMA_ERR_MSG_INVALID_SPEC.format(''))
+        self._load = _compile(spec, (), name)
+        self.type = self._load.type
+
+    def load(self, config):
+        """Returns typed object holding the validated and coerced config"""
+        return self._load(config, ())
+
+def _key_path(keys):
+    return ' > '.join(str(k) for k in keys)
+
+def _invalid(keys, value):
+    return ConfigurationError(SCHEMA_ERR_MSG_INVALID_VALUE.format(
+        _key_path(keys), value))
+
+##
+## Compiling specs into loaders
+##
+
+# Each loader is called as loader(value, keys), where keys is the key
+# path of value, for error messages
+
+def _compile(spec, keys, name):
+    if isinstance(spec, Field):
+        return _compile(spec.type, keys, name)
+    if isinstance(spec, dict):
+        return _compile_dict(spec, keys, name)
+    if isinstance(spec, MapOf):
+        return _compile_map(spec, keys, name)
+    if isinstance(spec, list) and len(spec) == 1:
+        return _compile_list(spec[0], keys, name)
+    if isinstance(spec, type) and spec in _COERCERS:
+        return _COERCERS[spec]
+    if callable(spec):
+        return _compile_callable(spec)
+    raise ConfigurationError(SCHEMA_ERR_MSG_INVALID_SPEC.format(
+        _key_path(keys)))
+
+def _compile_dict(spec, keys, name):
+    fields = []
+    for key, sub_spec in spec.items():
+        if not isinstance(key, str) or not key.isidentifier() or (
+                key.startswith('_') or keyword.iskeyword(key)):
+            raise ConfigurationError(SCHEMA_ERR_MSG_INVALID_NAME.format(
+                _key_path(keys + (key,))))
+        field = sub_spec if isinstance(sub_spec, Field) else Field(sub_spec)
+        fields.append((key, _compile(field.type, keys + (key,),
+            name + '_' + key), field.default))
+
+    cls = collections.namedtuple(name, [f[0] for f in fields])
+
+    def load(config, keys):
+        if not isinstance(config, Mapping):
+            raise ConfigurationError(SCHEMA_ERR_MSG_NOT_A_DICT.format(
+                _key_path(keys)))
+        values = []
+        for key, loader, default in fields:
+            value = config.get(key)
+            if value is None:
+                if default is _REQUIRED:
+                    raise ConfigurationError(SCHEMA_ERR_MSG_MISSING_KEY.format(
+                        _key_path(keys + (key,))))
+                values.append(default)
+            else:
+                values.append(loader(value, keys + (key,)))
+        return cls._make(values)
+
+    load.type = cls
+    return load
+
+def _compile_map(spec, keys, name):
+    value_loader = _compile(spec.type, keys + ('*',), name + '_value')
+
+    def load(config, keys):
+        if not isinstance(config, Mapping):
+            raise ConfigurationError(SCHEMA_ERR_MSG_NOT_A_DICT.format(
+                _key_path(keys)))
+        return {k: value_loader(v, keys + (k,)) for k, v in config.items()}
+
+    load.type = dict
+    return load
+
+def _compile_list(spec, keys, name):
+    item_loader = _compile(spec, keys + ('*',), name + '_item')
+
+    def load(value, keys):
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(',')] if value.strip() else []
+        elif not isinstance(value, (list, tuple)):
+            raise _invalid(keys, value)
+        return tuple(item_loader(v, keys + (i,)) for i, v in enumerate(value))
+
+    load.type = tuple
+    return load
+
+def _compile_callable(func):
+    def load(value, keys):
+        try:
+            return func(value)
+        except (ValueError, TypeError):
+            raise _invalid(keys, value)
+
+    load.type = func if isinstance(func, type) else object
+    return load
+
+##
+## Scalar coercion
+##
+
+def _load_int(value, keys):
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    elif isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise _invalid(keys, value)
+
+def _load_float(value, keys):
+    if type(value) is float:
+        return value
+    if isinstance(value, (int, str)) and not isinstance(value, bool):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise _invalid(keys, value)
+
+def _load_bool(value, keys):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        b = configparser.ConfigParser.BOOLEAN_STATES.get(value.strip().lower())
+        if b is not None:
+            return b
+    elif value in (0, 1) and isinstance(value, int):
+        return bool(value)
+    raise _invalid(keys, value)
+
+def _load_str(value, keys):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple, set)):
+        raise _invalid(keys, value)
+    return str(value)
+
+_load_int.type = int
+_load_float.type = float
+_load_bool.type = bool
+_load_str.type = str
+
+_COERCERS = {
+    int: _load_int,
+    float: _load_float,
+    bool: _load_bool,
+    str: _load_str
+}
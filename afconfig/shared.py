@@ -0,0 +1,122 @@
+"""afconfig.shared
+
+Sharing a config with worker processes without pickling it for each task
+"""
+
+__author__ = "Joel Dubowy"
+
+import os
+import tempfile
+
+from . import get_config_value
+from .snapshot import save_snapshot, open_snapshot
+
+__all__ = [
+    'SharedConfig',
+    'ConfigHandle'
+]
+
+# Snapshots opened in this process, by filename, oldest first. A worker
+# never learns when a SharedConfig is closed, so, to keep long lived
+# workers from holding on to (the /dev/shm pages of) every snapshot
+# published during their lifetime, those whose files have been deleted
+# are dropped whenever another is opened, and at most
+# MAX_OPEN_SNAPSHOTS are kept. Dropped snapshots aren't closed, since
+# views of them may still be in use; their memory is freed once they
+# aren't.
+MAX_OPEN_SNAPSHOTS = 8
+_open_snapshots = {}
+
+class SharedConfig(object):
+    """Config published once, via snapshot file, to any number of processes
+
+    Rather than passing the config to each task (which pickles it every
+    time), pass the small, picklable handle:
+
+        with SharedConfig(config) as shared:
+            with ProcessPoolExecutor() as executor:
+                executor.map(process_fire, fires, itertools.repeat(shared.handle))
+
+        def process_fire(fire, config_handle):
+            ecoregion = config_handle.get_value('consumption', 'ecoregion')
+
+    Each worker process opens the snapshot (see afconfig.snapshot) the
+    first time it resolves the handle, and reuses it after that; workers
+    forked after the handle is first resolved in the parent inherit the
+    already open snapshot. The snapshot is written to /dev/shm, when
+    available, so that it's never written to disk.
+
+    The snapshot file is deleted by close (or on exiting the context);
+    processes that already have it open can keep using it. Each process
+    keeps up to MAX_OPEN_SNAPSHOTS snapshots open, and lets go of those
+    that have been closed the next time it opens another.
+    """
+
+    def __init__(self, config, directory=None):
+        if directory is None and os.path.isdir('/dev/shm'):
+            directory = '/dev/shm'
+        fd, filename = tempfile.mkstemp(prefix='afconfig-', suffix='.snap',
+            dir=directory)
+        os.close(fd)
+        try:
+            save_snapshot(config, filename)
+        except Exception:
+            os.unlink(filename)
+            raise
+        self.handle = ConfigHandle(filename)
+
+    def close(self):
+        _open_snapshots.pop(self.handle.filename, None)
+        try:
+            os.unlink(self.handle.filename)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ConfigHandle(object):
+    """Small, picklable reference to a SharedConfig's snapshot"""
+
+    __slots__ = ('filename',)
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def resolve(self):
+        """Returns the config, as a read-only SnapshotConfig view"""
+        config = _open_snapshots.get(self.filename)
+        if config is None:
+            config = open_snapshot(self.filename)
+            _prune_open_snapshots()
+            _open_snapshots[self.filename] = config
+        return config
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self.resolve(), *keys, **kwargs)"""
+        return get_config_value(self.resolve(), *keys, **kwargs)
+
+    def __reduce__(self):
+        return (self.__class__, (self.filename,))
+
+    def __eq__(self, other):
+        return (isinstance(other, ConfigHandle)
+            and other.filename == self.filename)
+
+    def __hash__(self):
+        return hash(self.filename)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.filename)
+
+def _prune_open_snapshots():
+    """Drops open snapshots whose files have been deleted, and then the
+    oldest, to make room for one more
+    """
+    for filename in [f for f in _open_snapshots if not os.path.exists(f)]:
+        del _open_snapshots[filename]
+    while len(_open_snapshots) >= MAX_OPEN_SNAPSHOTS:
+        del _open_snapshots[next(iter(_open_snapshots))]
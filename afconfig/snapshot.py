@@ -0,0 +1,336 @@
+"""afconfig.snapshot
+
+Compact binary snapshots of config dicts, read lazily via mmap
+
+A snapshot is written once, with save_snapshot, and opened by any number
+of processes with open_snapshot, which memory maps the file rather than
+reading it. Nothing is decoded up front; each dict's keys are decoded
+the first time the dict is accessed, and each value the first time
+it's read, so opening a snapshot is O(1) and the OS shares the
+file's pages among all the processes that have it open.
+
+File layout (all integers little-endian):
+
+    header: magic (8 bytes), root value offset (uint64)
+    values, each a one byte type tag followed by:
+        'N', 'T', 'F' -- (None, True, False) nothing
+        'i' -- int64
+        'I' -- uint32 length, decimal digits (ints that don't fit in 64 bits)
+        'f' -- float64
+        's' -- uint32 length, utf-8 encoded str
+        'b' -- uint32 length, bytes
+        'l' -- uint32 count, count uint64 value offsets (list or tuple)
+        'd' -- uint32 count, count pairs of uint64 key and value offsets,
+               in insertion order, then count uint32 pair indices,
+               sorted by the keys' encoded bytes (for binary search)
+
+Values are written before the containers that refer to them, and equal
+strings, as well as repeated references to the same dict or list, are
+written once.
+"""
+
+__author__ = "Joel Dubowy"
+
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Mapping
+
+from . import (
+    get_config_value,
+    ConfigurationError
+)
+
+__all__ = [
+    'save_snapshot',
+    'open_snapshot',
+    'SnapshotConfig'
+]
+
+SNAPSHOT_MAGIC = b'AFCSNAP\x01'
+SNAPSHOT_ERR_MSG_INVALID_FILE = "Invalid config snapshot file {}"
+SNAPSHOT_ERR_MSG_UNSUPPORTED_VALUE = "Can't snapshot config value of type {}"
+
+_HEADER = struct.Struct('<8sQ')
+_UINT32 = struct.Struct('<I')
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+_OFFSET = struct.Struct('<Q')
+_PAIR = struct.Struct('<QQ')
+
+##
+## Writing
+##
+
+def save_snapshot(config, filename):
+    """Writes config dict to snapshot file
+
+    The file is written to a temporary file and then moved into place,
+    so processes opening it never see a partially written snapshot.
+
+    Supported values are dicts (and other mappings), lists, tuples,
+    str, bytes, int, float, bool and None; anything else raises
+    ConfigurationError.
+    """
+    if not isinstance(config, Mapping):
+        raise ConfigurationError(SNAPSHOT_ERR_MSG_UNSUPPORTED_VALUE.format(
+            type(config).__name__))
+
+    writer = _SnapshotWriter()
+    root = writer.write(config)
+    _HEADER.pack_into(writer.buf, 0, SNAPSHOT_MAGIC, root)
+
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=dirname, prefix='.afcsnap-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(writer.buf)
+        # mkstemp creates the file readable only by its owner; give it
+        # the mode open() would have, so other users' processes can
+        # still open the snapshot
+        os.chmod(tmp_filename, 0o666 & ~_umask())
+        os.replace(tmp_filename, filename)
+    except Exception:
+        os.unlink(tmp_filename)
+        raise
+
+def _umask():
+    # The only way to read the umask is to set it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+class _SnapshotWriter(object):
+
+    def __init__(self):
+        self.buf = bytearray(_HEADER.size)
+        self.scalars = {}  # (type, value) -> offset
+        self.containers = {}  # id -> (container, offset)
+
+    def write(self, value):
+        """Writes value, if not already written, and returns its offset"""
+        if isinstance(value, (Mapping, list, tuple)):
+            written = self.containers.get(id(value))
+            if written is not None:
+                return written[1]
+            if isinstance(value, Mapping):
+                pairs = [(self.write(k), self.write(v)) for k, v in value.items()]
+                sort_keys = [self._sort_key(k) for k in value]
+                order = sorted(range(len(pairs)), key=sort_keys.__getitem__)
+                offset = self._append(b'd', _UINT32.pack(len(pairs)),
+                    b''.join(_PAIR.pack(*p) for p in pairs),
+                    b''.join(_UINT32.pack(i) for i in order))
+            else:
+                offsets = [self.write(v) for v in value]
+                offset = self._append(b'l', _UINT32.pack(len(offsets)),
+                    b''.join(_OFFSET.pack(o) for o in offsets))
+            # keep a reference to value so that its id isn't reused
+            self.containers[id(value)] = (value, offset)
+            return offset
+
+        # keyed by type, since e.g. 1 == 1.0 == True, and floats by
+        # their bytes, since 0.0 == -0.0
+        key = (type(value), _FLOAT64.pack(value)
+            if isinstance(value, float) else value)
+        offset = self.scalars.get(key)
+        if offset is None:
+            offset = self.scalars[key] = self._append(*self._encode(value))
+        return offset
+
+    def _sort_key(self, key):
+        try:
+            return b''.join(self._encode(key))
+        except ConfigurationError:
+            # containers (e.g. tuple keys) go last
+            return b'\xff'
+
+    def _encode(self, value):
+        if value is None:
+            return (b'N',)
+        if value is True:
+            return (b'T',)
+        if value is False:
+            return (b'F',)
+        if isinstance(value, str):
+            data = value.encode('utf-8')
+            return (b's', _UINT32.pack(len(data)), data)
+        if isinstance(value, int):
+            if -2**63 <= value < 2**63:
+                return (b'i', _INT64.pack(value))
+            data = str(value).encode('ascii')
+            return (b'I', _UINT32.pack(len(data)), data)
+        if isinstance(value, float):
+            return (b'f', _FLOAT64.pack(value))
+        if isinstance(value, bytes):
+            return (b'b', _UINT32.pack(len(value)), value)
+        raise ConfigurationError(SNAPSHOT_ERR_MSG_UNSUPPORTED_VALUE.format(
+            type(value).__name__))
+
+    def _append(self, *parts):
+        offset = len(self.buf)
+        for part in parts:
+            self.buf += part
+        return offset
+
+##
+## Reading
+##
+
+def open_snapshot(filename):
+    """Opens snapshot file, returning read-only view of its root dict
+
+    The returned SnapshotConfig can be passed to get_config_value and
+    anything else that accepts a Mapping.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            raise ConfigurationError(SNAPSHOT_ERR_MSG_INVALID_FILE.format(filename))
+
+    if len(buf) < _HEADER.size:
+        buf.close()
+        raise ConfigurationError(SNAPSHOT_ERR_MSG_INVALID_FILE.format(filename))
+    magic, root = _HEADER.unpack_from(buf, 0)
+    if magic != SNAPSHOT_MAGIC or buf[root:root+1] != b'd':
+        buf.close()
+        raise ConfigurationError(SNAPSHOT_ERR_MSG_INVALID_FILE.format(filename))
+    return SnapshotConfig(buf, root)
+
+def _decode(buf, offset):
+    tag = buf[offset:offset+1]
+    offset += 1
+    if tag == b'd':
+        return SnapshotConfig(buf, offset - 1)
+    if tag == b's':
+        n, = _UINT32.unpack_from(buf, offset)
+        return buf[offset+4:offset+4+n].decode('utf-8')
+    if tag == b'i':
+        return _INT64.unpack_from(buf, offset)[0]
+    if tag == b'f':
+        return _FLOAT64.unpack_from(buf, offset)[0]
+    if tag == b'N':
+        return None
+    if tag == b'T':
+        return True
+    if tag == b'F':
+        return False
+    if tag == b'l':
+        n, = _UINT32.unpack_from(buf, offset)
+        offsets = struct.unpack_from('<{}Q'.format(n), buf, offset + 4)
+        return tuple(_decode(buf, o) for o in offsets)
+    if tag == b'b':
+        n, = _UINT32.unpack_from(buf, offset)
+        return buf[offset+4:offset+4+n]
+    if tag == b'I':
+        n, = _UINT32.unpack_from(buf, offset)
+        return int(buf[offset+4:offset+4+n])
+    raise ConfigurationError("Invalid config snapshot value tag {!r}".format(tag))
+
+def _encoded_scalar(buf, offset):
+    """Returns encoded bytes of scalar value at offset
+
+    Containers are represented by b'\\xff', to match their sort key.
+    """
+    tag = buf[offset:offset+1]
+    if tag in b'sbI':
+        n, = _UINT32.unpack_from(buf, offset + 1)
+        return buf[offset:offset+5+n]
+    if tag in b'if':
+        return buf[offset:offset+9]
+    if tag in b'NTF':
+        return tag
+    return b'\xff'
+
+class SnapshotConfig(Mapping):
+    """Read-only, lazily decoded view of a dict in a snapshot
+
+    Nested dicts are returned as SnapshotConfig views, and lists as
+    tuples. Decoded keys and values are cached in the view.
+    """
+
+    __slots__ = ('_buf', '_offset', '_offsets', '_values')
+
+    def __init__(self, buf, offset):
+        self._buf = buf
+        self._offset = offset
+        self._offsets = None  # key -> value offset
+        self._values = {}
+
+    def _index(self):
+        if self._offsets is None:
+            buf = self._buf
+            n, = _UINT32.unpack_from(buf, self._offset + 1)
+            pairs = struct.unpack_from('<{}Q'.format(2 * n), buf, self._offset + 5)
+            self._offsets = {_decode(buf, pairs[i]): pairs[i+1]
+                for i in range(0, 2 * n, 2)}
+        return self._offsets
+
+    def _value_offset(self, key):
+        if self._offsets is not None or type(key) is not str:
+            return self._index()[key]
+
+        # Binary search of the keys, sorted by their encoded bytes, so
+        # that looking up a few keys in a wide dict doesn't require
+        # decoding all of them
+        buf = self._buf
+        data = key.encode('utf-8')
+        target = b's' + _UINT32.pack(len(data)) + data
+        n, = _UINT32.unpack_from(buf, self._offset + 1)
+        pairs_offset = self._offset + 5
+        order_offset = pairs_offset + _PAIR.size * n
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i, = _UINT32.unpack_from(buf, order_offset + 4 * mid)
+            key_offset, value_offset = _PAIR.unpack_from(
+                buf, pairs_offset + _PAIR.size * i)
+            encoded = _encoded_scalar(buf, key_offset)
+            if encoded == target:
+                return value_offset
+            if encoded < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = _decode(self._buf, self._value_offset(key))
+        return value
+
+    def __contains__(self, key):
+        try:
+            self._value_offset(key)
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self):
+        return _UINT32.unpack_from(self._buf, self._offset + 1)[0]
+
+    def get_value(self, *keys, **kwargs):
+        """Returns get_config_value(self, *keys, **kwargs)"""
+        return get_config_value(self, *keys, **kwargs)
+
+    def to_dict(self):
+        """Returns fully decoded copy, as plain dicts and lists"""
+        return {k: _to_plain(self[k]) for k in self}
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.to_dict())
+
+def _to_plain(value):
+    if isinstance(value, SnapshotConfig):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_to_plain(v) for v in value]
+    return value
@@ -0,0 +1,88 @@
+"""Compares read throughput of AtomicConfig with a dict guarded by a
+global lock, with N reader threads and one writer reloading the config
+
+Usage:
+
+    python benchmarks/bench_atomic_config.py [--threads N [N ...]] [--duration SECONDS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value, merge_configs
+from afconfig.atomic import AtomicConfig
+
+def make_config(num_sections):
+    return {
+        str(i): {'consumption': {'ecoregion': 'western'}, 'pm25': i}
+            for i in range(num_sections)
+    }
+
+class LockedConfig(object):
+    """What we had to do before: one lock around every read and reload"""
+
+    def __init__(self, config):
+        self._lock = threading.Lock()
+        self._config = config
+
+    def get_value(self, *keys):
+        with self._lock:
+            return get_config_value(self._config, *keys)
+
+    def merge(self, to_be_merged_config):
+        with self._lock:
+            merge_configs(self._config, to_be_merged_config)
+
+def run(holder, num_threads, duration):
+    stop = threading.Event()
+    counts = [0] * num_threads
+
+    def read(idx):
+        n = 0
+        while not stop.is_set():
+            for i in range(100):
+                holder.get_value('7', 'consumption', 'ecoregion')
+            n += 100
+        counts[idx] = n
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            holder.merge({'7': {'pm25': i}})
+            i += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=read, args=(i,))
+        for i in range(num_threads)] + [threading.Thread(target=write)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(counts) / duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--sections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=1.0)
+    args = parser.parse_args()
+
+    print("{:>8} {:>20} {:>20}".format('threads', 'locked (reads/s)',
+        'atomic (reads/s)'))
+    for num_threads in args.threads:
+        locked = run(LockedConfig(make_config(args.sections)),
+            num_threads, args.duration)
+        atomic = run(AtomicConfig(make_config(args.sections)),
+            num_threads, args.duration)
+        print("{:>8} {:>20,.0f} {:>20,.0f}".format(num_threads, locked, atomic))
+
+if __name__ == "__main__":
+    main()
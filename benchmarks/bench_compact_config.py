@@ -0,0 +1,82 @@
+"""Compares memory used by a large config as plain nested dicts, as a
+FrozenConfigDict, and compacted with compact_config, as measured by
+tracemalloc, along with lookup times
+
+The synthetic config has one million leaf values, in many small dicts
+with the same keys, some of them repeated across fuelbeds.
+
+Usage:
+
+    python benchmarks/bench_compact_config.py [--fuelbeds FUELBEDS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value
+from afconfig.compact import compact_config
+from afconfig.persistent import FrozenConfigDict
+
+ECOREGIONS = ['western', 'southern', 'boreal', 'eastern']
+
+def make_config(num_fuelbeds):
+    # 10 leaves per fuelbed
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {
+                    'ecoregion': ECOREGIONS[i % 4],
+                    'fuel_moisture': {'1hr': 10, '10hr': 12, 'duff': 150},
+                    'factors': [1.5, 2.0]
+                },
+                'emissions': {'pm25': i * 0.1, 'co': i * 0.2, 'co2': i * 3}
+            } for i in range(num_fuelbeds)
+        }
+    }
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fuelbeds', type=int, default=100000)
+    args = parser.parse_args()
+
+    # Load from JSON, so that, as with real configs, nothing is
+    # shared to start with
+    data = json.dumps(make_config(args.fuelbeds))
+    plain = json.loads(data)
+
+    print("{} fuelbeds, {} leaves".format(args.fuelbeds, args.fuelbeds * 10))
+    print("{:<36} {:>10} {:>14}".format('', 'MB', 'ns / lookup'))
+    keys = ('fuelbeds', str(args.fuelbeds // 2), 'consumption',
+        'fuel_moisture', 'duff')
+    for name, func in [
+            ('plain dicts', lambda: json.loads(data)),
+            ('FrozenConfigDict', lambda: FrozenConfigDict(plain)),
+            ('compact_config, no sharing', lambda: compact_config(plain,
+                share_subtrees=False)),
+            ('compact_config', lambda: compact_config(plain))]:
+        config, size = measure(func)
+        assert 150 == get_config_value(config, *keys)
+        t = min(timeit.repeat(lambda: get_config_value(config, *keys),
+            number=100000, repeat=3))
+        print("{:<36} {:>10.1f} {:>14.0f}".format(name, size / 1e6, t * 1e4))
+        del config
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Compares compile_path accessors with get_config_value
+
+Usage:
+
+    python benchmarks/bench_compile_path.py [-n NUMBER]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value, compile_path
+
+def nested_config(depth):
+    keys = tuple('k{}'.format(i) for i in range(depth))
+    config = 'leaf'
+    for k in reversed(keys):
+        config = {k: config, 'other': 1}
+    return config, keys
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=200000,
+        help="number of lookups per measurement")
+    args = parser.parse_args()
+
+    print("{:>5} {:>16} {:>16} {:>8}".format(
+        'depth', 'recursive (ns)', 'compiled (ns)', 'speedup'))
+    for depth in range(1, 11):
+        config, keys = nested_config(depth)
+        accessor = compile_path(*keys, default=None)
+        recursive = min(timeit.repeat(
+            lambda: get_config_value(config, *keys, default=None),
+            number=args.number, repeat=3)) / args.number * 1e9
+        compiled = min(timeit.repeat(lambda: accessor(config),
+            number=args.number, repeat=3)) / args.number * 1e9
+        print("{:>5} {:>16.1f} {:>16.1f} {:>7.2f}x".format(
+            depth, recursive, compiled, recursive / compiled))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compares config_parser_to_dict's eager, raw and lazy modes
+
+Usage:
+
+    python benchmarks/bench_config_parser_to_dict.py [--sections SECTIONS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import configparser
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import config_parser_to_dict
+
+def ini_string(num_sections, num_options):
+    lines = ['[DEFAULT]', 'root = /data', '']
+    for i in range(num_sections):
+        lines.append('[fuelbed_{}]'.format(i))
+        for j in range(num_options):
+            lines.append('option_{} = %(root)s/{}/{}'.format(j, i, j))
+        lines.append('')
+    return '\n'.join(lines)
+
+def best_time(f, repeat):
+    best = None
+    for i in range(repeat):
+        t = time.perf_counter()
+        f()
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=10000)
+    parser.add_argument('--options', type=int, default=10)
+    parser.add_argument('--accessed', type=int, default=20,
+        help="number of sections accessed in lazy mode")
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read_string(ini_string(args.sections, args.options))
+    accessed = ['fuelbed_{}'.format(i) for i in range(args.accessed)]
+
+    def lazy_some(raw=False):
+        d = config_parser_to_dict(config, lazy=True, raw=raw)
+        for s in accessed:
+            d[s]
+
+    cases = [
+        ('eager', lambda: config_parser_to_dict(config)),
+        ('raw', lambda: config_parser_to_dict(config, raw=True)),
+        ('lazy, {} accessed'.format(args.accessed), lazy_some),
+        ('lazy raw, {} accessed'.format(args.accessed),
+            lambda: lazy_some(raw=True)),
+        ('lazy, all accessed',
+            lambda: config_parser_to_dict(config, lazy=True).materialize()),
+    ]
+
+    print("{} sections x {} options".format(args.sections, args.options))
+    eager = None
+    for name, f in cases:
+        t = best_time(f, args.repeat)
+        eager = eager or t
+        print("{:<24} {:>10.2f} ms {:>9.1f}x".format(name, t * 1000, eager / t))
+
+if __name__ == "__main__":
+    main()
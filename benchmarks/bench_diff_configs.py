@@ -0,0 +1,67 @@
+"""Compares finding what changed between two large configs by comparing
+JSON dumps with diff_configs, on plain dicts and on FrozenConfigDict
+objects that share unchanged subtrees
+
+Usage:
+
+    python benchmarks/bench_diff_configs.py [--sections SECTIONS] [--changes CHANGES] [--repeat REPEAT]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import set_config_value
+from afconfig.diff import diff_configs
+from afconfig.persistent import FrozenConfigDict
+
+def make_config(num_sections):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {'ecoregion': 'western', 'factors': [1.5] * 5},
+                'emissions': {'pm25': i, 'co': i * 2}
+            } for i in range(num_sections)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=50000)
+    parser.add_argument('--changes', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = [('fuelbeds', str(i * 97 % args.sections), 'emissions', 'pm25')
+        for i in range(args.changes)]
+    a = make_config(args.sections)
+    b = copy.deepcopy(a)
+    frozen_a = frozen_b = FrozenConfigDict(a)
+    for keys in paths:
+        set_config_value(b, -1, *keys)
+        frozen_b = frozen_b.assoc_in(keys, -1)
+
+    def json_dumps():
+        return (json.dumps(a, sort_keys=True) != json.dumps(b, sort_keys=True))
+
+    assert json_dumps()
+    assert len(paths) == len(diff_configs(a, b))
+    assert len(paths) == len(diff_configs(frozen_a, frozen_b))
+
+    print("{} sections, {} changes".format(args.sections, args.changes))
+    print("{:<36} {:>10}".format('', 'ms'))
+    for name, func in [
+            ('compare JSON dumps (no paths)', json_dumps),
+            ('diff_configs, plain dicts', lambda: diff_configs(a, b)),
+            ('diff_configs, FrozenConfigDict', lambda: diff_configs(frozen_a, frozen_b))]:
+        t = timeit.timeit(func, number=args.repeat)
+        print("{:<36} {:>10.3f}".format(name, t * 1000 / args.repeat))
+
+if __name__ == "__main__":
+    main()
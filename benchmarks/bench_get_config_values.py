@@ -0,0 +1,52 @@
+"""Compares get_config_values with one get_config_value call per path
+
+Usage:
+
+    python benchmarks/bench_get_config_values.py [-n NUMBER]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import itertools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value, get_config_values
+
+def config_and_paths(width, depth, num_paths):
+    """Returns config `width` keys wide and `depth` levels deep, along
+    with the first num_paths leaf paths, which share their prefixes
+    """
+    config = 'leaf'
+    for d in reversed(range(depth)):
+        config = {'k{}_{}'.format(d, i): config for i in range(width)}
+    levels = [['k{}_{}'.format(d, i) for i in range(width)]
+        for d in range(depth)]
+    paths = list(itertools.islice(itertools.product(*levels), num_paths))
+    return config, paths
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=2000,
+        help="number of batches per measurement")
+    args = parser.parse_args()
+
+    print("{:>5} {:>6} {:>18} {:>18} {:>8}".format(
+        'depth', 'paths', 'individual (us)', 'batch (us)', 'speedup'))
+    for depth in (3, 5, 8):
+        for num_paths in (50, 200):
+            config, paths = config_and_paths(6, depth, num_paths)
+            individual = min(timeit.repeat(
+                lambda: [get_config_value(config, *p) for p in paths],
+                number=args.number, repeat=3)) / args.number * 1e6
+            batch = min(timeit.repeat(
+                lambda: get_config_values(config, paths),
+                number=args.number, repeat=3)) / args.number * 1e6
+            print("{:>5} {:>6} {:>18.1f} {:>18.1f} {:>7.2f}x".format(
+                depth, len(paths), individual, batch, individual / batch))
+
+if __name__ == "__main__":
+    main()
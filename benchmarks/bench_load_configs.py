@@ -0,0 +1,116 @@
+"""Compares cold-start latency of loading config layers serially, then
+merging them, with loading them concurrently with load_configs
+
+Layers are a number of JSON files plus a number of JSON documents served
+by a local stand-in HTTP server that responds after a fixed latency.
+
+Usage:
+
+    python benchmarks/bench_load_configs.py [--files FILES] [--sections SECTIONS] [--urls URLS] [--latency LATENCY] [--repeat REPEAT]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import asyncio
+import concurrent.futures
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import merge_configs_many
+from afconfig.aio import load_configs
+from afconfig.loaders import load_file
+
+def make_config(num_sections, layer):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {'ecoregion': 'western', 'factors': [1.5] * 5},
+                'emissions': {'pm25': i + layer, 'co': i * 2}
+            } for i in range(num_sections)
+        }
+    }
+
+def start_server(latency):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = json.dumps({'service': {self.path.strip('/'): True}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def load_serially(sources):
+    layers = []
+    for source in sources:
+        if source.startswith('http://'):
+            with urllib.request.urlopen(source) as response:
+                layers.append(json.loads(response.read()))
+        else:
+            layers.append(load_file(source))
+    return merge_configs_many({}, *layers)
+
+def time_it(func, repeat):
+    t = time.perf_counter()
+    for i in range(repeat):
+        func()
+    return (time.perf_counter() - t) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--sections', type=int, default=5000)
+    parser.add_argument('--urls', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sources = []
+            for i in range(args.files):
+                sources.append(os.path.join(tmp_dir, '{}.json'.format(i)))
+                with open(sources[-1], 'w') as f:
+                    json.dump(make_config(args.sections, i), f)
+            sources.extend('http://127.0.0.1:{}/{}'.format(
+                server.server_port, i) for i in range(args.urls))
+
+            expected = load_serially(sources)
+            print("{} files x {} sections, {} urls x {:.0f} ms latency".format(
+                args.files, args.sections, args.urls, args.latency * 1000))
+            print("{:<24} {:>10}".format('', 'ms'))
+            print("{:<24} {:>10.1f}".format('serial',
+                time_it(lambda: load_serially(sources), args.repeat)))
+
+            def run(executor):
+                config = asyncio.run(load_configs(sources, executor=executor))
+                assert config == expected
+            print("{:<24} {:>10.1f}".format('load_configs (threads)',
+                time_it(lambda: run(None), args.repeat)))
+            with concurrent.futures.ProcessPoolExecutor() as executor:
+                run(executor)  # start the worker processes
+                print("{:<24} {:>10.1f}".format('load_configs (processes)',
+                    time_it(lambda: run(executor), args.repeat)))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
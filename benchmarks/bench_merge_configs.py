@@ -0,0 +1,90 @@
+"""Benchmarks merge_configs on wide and deep configs
+
+Compares the current, stack based merge_configs with the recursive
+implementation it replaced (afconfig <= 1.1.3).
+
+Usage:
+
+    python benchmarks/bench_merge_configs.py [--width WIDTH] [--depth DEPTH]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import (
+    merge_configs, ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+
+def recursive_merge_configs(config, to_be_merged_config, *keys):
+    if not isinstance(config, dict) or not isinstance(to_be_merged_config, dict):
+        raise ConfigurationError(SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG)
+
+    for k, v in to_be_merged_config.items():
+        new_keys = keys + (k,)
+        if config.get(k) is None or (
+                not isinstance(config[k], dict) and not isinstance(v, dict)):
+            config[k] = v
+        elif isinstance(config[k], dict) and isinstance(v, dict):
+            recursive_merge_configs(config[k], v, *new_keys)
+        else:
+            raise ConfigurationError(MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format(' > '.join(new_keys)))
+    return config
+
+def wide_configs(width):
+    a = {'k{}'.format(i): {'a': i, 'c': {'x': i}} for i in range(width)}
+    b = {'k{}'.format(i): {'b': i, 'c': {'y': i}} for i in range(width)}
+    return a, b
+
+def deep_configs(depth):
+    a, b = {}, {}
+    d_a, d_b = a, b
+    for i in range(depth):
+        d_a['k'], d_b['k'] = {'a': i}, {'b': i}
+        d_a, d_b = d_a['k'], d_b['k']
+    return a, b
+
+def time_merge(merge, make_configs, repeat):
+    best = None
+    for i in range(repeat):
+        a, b = make_configs()
+        t = time.perf_counter()
+        try:
+            merge(a, b)
+        except RecursionError:
+            return None
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=100000)
+    parser.add_argument('--depth', type=int, default=5000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ('wide ({} keys)'.format(args.width),
+            lambda: wide_configs(args.width)),
+        ('deep ({} levels)'.format(args.depth),
+            lambda: deep_configs(args.depth))
+    ]
+
+    print("{:<22} {:>16} {:>16}".format('case', 'recursive (ms)', 'stack (ms)'))
+    for name, make_configs in cases:
+        results = []
+        for merge in (recursive_merge_configs, merge_configs):
+            t = time_merge(merge, make_configs, args.repeat)
+            results.append('RecursionError' if t is None else
+                '{:.1f}'.format(t * 1000))
+        print("{:<22} {:>16} {:>16}".format(name, *results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compares merge_configs_many with sequential merge_configs calls
+
+Usage:
+
+    python benchmarks/bench_merge_configs_many.py [--width WIDTH]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import merge_configs, merge_configs_many
+
+def layers(num_layers, width):
+    """Returns num_layers configs, each overriding settings in
+    the same `width` sections
+    """
+    return [
+        {'s{}'.format(i): {'a': l, 'b': {'c': l}, 'l{}'.format(l): l}
+            for i in range(width)}
+        for l in range(num_layers)
+    ]
+
+def sequential(config, layers):
+    for layer in layers:
+        merge_configs(config, layer)
+
+def many(config, layers):
+    merge_configs_many(config, *layers)
+
+def time_merge(merge, num_layers, width, repeat):
+    best = None
+    for i in range(repeat):
+        base, *to_be_merged = layers(num_layers + 1, width)
+        gc.disable()
+        t = time.perf_counter()
+        merge(base, to_be_merged)
+        t = time.perf_counter() - t
+        gc.enable()
+        best = t if best is None else min(best, t)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=5000)
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print("{:>6} {:>17} {:>17} {:>8}".format(
+        'layers', 'sequential (ms)', 'many (ms)', 'speedup'))
+    for num_layers in (2, 6, 10):
+        seq = time_merge(sequential, num_layers, args.width, args.repeat)
+        mny = time_merge(many, num_layers, args.width, args.repeat)
+        print("{:>6} {:>17.1f} {:>17.1f} {:>7.2f}x".format(
+            num_layers, seq * 1000, mny * 1000, seq / mny))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compares applying environment variable overrides with ConfigOverrides
+against the usual hand written loop over the environment
+
+The environment has thousands of unrelated variables, plus a number of
+overrides.
+
+Usage:
+
+    python benchmarks/bench_overrides.py [--env-vars ENV_VARS] [--overrides OVERRIDES] [--repeat REPEAT]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import set_config_value
+from afconfig.overrides import ConfigOverrides
+
+PREFIX = 'BLUESKY__'
+
+def make_config(num_sections):
+    return {
+        'fuelbeds': {
+            str(i): {'emissions': {'pm25': i, 'co': i * 2}}
+            for i in range(num_sections)
+        }
+    }
+
+def hand_written(config, environ):
+    for name, value in environ.items():
+        if name.startswith(PREFIX):
+            keys = [k.lower() for k in name[len(PREFIX):].split('__')]
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+            set_config_value(config, value, *keys)
+    return config
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env-vars', type=int, default=5000)
+    parser.add_argument('--overrides', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    environ = {'UNRELATED_VAR_{}'.format(i): 'value {}'.format(i)
+        for i in range(args.env_vars)}
+    environ.update({'{}FUELBEDS__{}__EMISSIONS__PM25'.format(PREFIX, i): '0.5'
+        for i in range(args.overrides)})
+    config = make_config(args.overrides * 10)
+    paths = [('fuelbeds', str(i), 'emissions', k)
+        for i in range(args.overrides * 10) for k in ('pm25', 'co')]
+
+    dynamic = ConfigOverrides(PREFIX)
+    precomputed = ConfigOverrides(PREFIX, paths=paths)
+    expected = hand_written(make_config(args.overrides * 10), environ)
+    assert expected == dynamic.apply(make_config(args.overrides * 10), environ)
+    assert expected == precomputed.apply(make_config(args.overrides * 10), environ)
+
+    print("{} env vars, {} overrides, {} key paths".format(
+        len(environ), args.overrides, len(paths)))
+    print("{:<32} {:>10}".format('', 'us / apply'))
+    for name, func in [
+            ('hand written loop', lambda: hand_written(config, environ)),
+            ('ConfigOverrides', lambda: dynamic.apply(config, environ)),
+            ('ConfigOverrides (with paths)', lambda: precomputed.apply(config, environ)),
+            ('ConfigOverrides (os.environ)', lambda: dynamic.apply(config))]:
+        t = timeit.timeit(func, number=args.repeat)
+        print("{:<32} {:>10.1f}".format(name, t * 1e6 / args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Measures the per-lookup cost of get_config_value and
+ConfigDict.get_value with no ConfigAccessProfile enabled, with one
+enabled, and with one recording callers
+
+Usage:
+
+    python benchmarks/bench_profiling.py [--lookups LOOKUPS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value, ConfigDict
+from afconfig.profiling import ConfigAccessProfile
+
+CONFIG = {'fuelbeds': {'consumption': {'ecoregion': 'western'}}}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lookups', type=int, default=1000000)
+    args = parser.parse_args()
+
+    config_dict = ConfigDict(CONFIG)
+    funcs = [
+        ('get_config_value', lambda: get_config_value(CONFIG,
+            'fuelbeds', 'consumption', 'ecoregion')),
+        ('ConfigDict.get_value', lambda: config_dict.get_value(
+            'fuelbeds', 'consumption', 'ecoregion'))
+    ]
+
+    print("{:<24} {:>10} {:>10} {:>10}".format('ns / lookup', 'disabled',
+        'enabled', 'callers'))
+    def best(func):
+        return min(timeit.repeat(func, number=args.lookups // 5, repeat=5)) * 5
+
+    for name, func in funcs:
+        times = [best(func)]
+        for profile in (ConfigAccessProfile(), ConfigAccessProfile(callers=True)):
+            with profile:
+                times.append(best(func))
+        print("{:<24} {:>10.0f} {:>10.0f} {:>10.0f}".format(name,
+            *[t * 1e9 / args.lookups for t in times]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compares finding every emission_factors value in a large config with
+a hand written recursive walk, query_config, and a ConfigIndex
+
+Usage:
+
+    python benchmarks/bench_query_config.py [--fuelbeds FUELBEDS] [--repeat REPEAT]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value
+from afconfig.query import query_config, ConfigIndex
+
+def make_config(num_fuelbeds):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {
+                    'ecoregion': 'western',
+                    'fuel_moisture': {'1hr': 10, '10hr': 12, 'duff': 150},
+                },
+                'emissions': {'pm25': i, 'co': i * 2},
+                # only some fuelbeds have their own emission factors
+                **({'emission_factors': {'pm25': 0.1}} if i % 100 == 0 else {})
+            } for i in range(num_fuelbeds)
+        },
+        'defaults': {'emission_factors': {'pm25': 0.2}}
+    }
+
+def hand_written(config, key, path=()):
+    matches = []
+    for k in config:
+        v = get_config_value(config, k)
+        if k == key:
+            matches.append((path + (k,), v))
+        if isinstance(v, dict):
+            matches.extend(hand_written(v, key, path + (k,)))
+    return matches
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fuelbeds', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    config = make_config(args.fuelbeds)
+    t = timeit.default_timer()
+    index = ConfigIndex(config)
+    index_time = timeit.default_timer() - t
+
+    expected = sorted(hand_written(config, 'emission_factors'))
+    assert expected == sorted(query_config(config, '**', 'emission_factors'))
+    assert expected == sorted(index.query('**', 'emission_factors'))
+
+    print("{} fuelbeds, {} matches; building the index took {:.0f} ms".format(
+        args.fuelbeds, len(expected), index_time * 1000))
+    print("{:<48} {:>10}".format('', 'ms'))
+    for name, func in [
+            ('hand written walk', lambda: hand_written(config, 'emission_factors')),
+            ("query_config('**', 'emission_factors')",
+                lambda: list(query_config(config, '**', 'emission_factors'))),
+            ("query_config('fuelbeds', '*', 'emission_factors')",
+                lambda: list(query_config(config, 'fuelbeds', '*', 'emission_factors'))),
+            ("ConfigIndex.query('**', 'emission_factors')",
+                lambda: list(index.query('**', 'emission_factors')))]:
+        t = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print("{:<48} {:>10.3f}".format(name, t * 1000))
+
+if __name__ == "__main__":
+    main()
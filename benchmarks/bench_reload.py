@@ -0,0 +1,86 @@
+"""Compares incremental reloading, with ConfigReloader, with re-loading
+and re-merging all config files from scratch
+
+A large base layer is overlaid with a small local layer, and a single
+value is changed in one or the other.
+
+Usage:
+
+    python benchmarks/bench_reload.py [--sections SECTIONS] [--repeat REPEAT]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import merge_configs_many
+from afconfig.reload import ConfigReloader
+
+def make_config(num_sections):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {'ecoregion': 'western', 'factors': [1.5] * 5},
+                'emissions': {'pm25': i, 'co': i * 2}
+            } for i in range(num_sections)
+        }
+    }
+
+def write(filename, config, i):
+    with open(filename, 'w') as f:
+        json.dump(config, f)
+    # make sure the change is seen, even with coarse mtime resolution
+    os.utime(filename, ns=(i, i))
+
+def full_reload(filenames):
+    layers = []
+    for filename in filenames:
+        with open(filename) as f:
+            layers.append(json.load(f))
+    return merge_configs_many({}, *layers)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    base = make_config(args.sections)
+    local = {'fuelbeds': {'7': {'emissions': {'pm25': 0}}}}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filenames = [os.path.join(tmp_dir, 'base.json'),
+            os.path.join(tmp_dir, 'local.json')]
+        write(filenames[0], base, 1)
+        write(filenames[1], local, 1)
+        reloader = ConfigReloader(filenames)
+
+        print("{} sections".format(args.sections))
+        print("{:<20} {:>14} {:>14}".format('changed layer',
+            'full (ms)', 'incremental (ms)'))
+        for name, idx, config, section in [
+                ('local (small)', 1, local, '7'),
+                ('base (large)', 0, base, '8')]:
+            full = incremental = 0.0
+            for i in range(args.repeat):
+                config['fuelbeds'][section]['emissions']['pm25'] = i + 1
+                write(filenames[idx], config, i + 2 + idx * args.repeat)
+
+                t = time.perf_counter()
+                full_reload(filenames)
+                full += time.perf_counter() - t
+
+                t = time.perf_counter()
+                changed = reloader.check()
+                incremental += time.perf_counter() - t
+                assert changed, "change not detected"
+            print("{:<20} {:>14.2f} {:>14.2f}".format(name,
+                full * 1000 / args.repeat, incremental * 1000 / args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compares reading values from an INI-derived config dict, converting
+each one on every read, with reading them from a Schema-loaded typed config
+
+Usage:
+
+    python benchmarks/bench_schema.py [--reads READS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import configparser
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import config_parser_to_dict, get_config_value
+from afconfig.schema import Schema
+
+INI = """
+[consumption]
+ecoregion = western
+factor = 1.5
+iterations = 3
+enabled = true
+"""
+
+SPEC = {
+    'consumption': {
+        'ecoregion': str,
+        'factor': float,
+        'iterations': int,
+        'enabled': bool
+    }
+}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reads', type=int, default=1000000)
+    args = parser.parse_args()
+
+    config_parser = configparser.ConfigParser()
+    config_parser.read_string(INI)
+    config = config_parser_to_dict(config_parser)
+    schema = Schema(SPEC)
+
+    def per_read():
+        return (float(get_config_value(config, 'consumption', 'factor'))
+            * int(get_config_value(config, 'consumption', 'iterations'))
+            if get_config_value(config, 'consumption', 'enabled') == 'true'
+            else 0.0)
+
+    typed = schema.load(config)
+    def typed_read():
+        c = typed.consumption
+        return c.factor * c.iterations if c.enabled else 0.0
+
+    assert per_read() == typed_read()
+    n = args.reads // 3
+    results = [
+        ('get_config_value + convert', timeit.timeit(per_read, number=n)),
+        ('Schema typed attributes', timeit.timeit(typed_read, number=n))
+    ]
+    load_time = timeit.timeit(lambda: schema.load(config), number=1000) / 1000
+
+    print("{} reads (3 values per call)".format(n * 3))
+    print("{:<28} {:>12}".format('', 'ns / read'))
+    for name, t in results:
+        print("{:<28} {:>12.0f}".format(name, t * 1e9 / (n * 3)))
+    print("one-time Schema.load: {:.1f} us".format(load_time * 1e6))
+
+if __name__ == "__main__":
+    main()
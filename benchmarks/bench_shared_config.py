@@ -0,0 +1,68 @@
+"""Compares per-task overhead of passing a config to process pool tasks
+directly versus passing a SharedConfig handle
+
+Usage:
+
+    python benchmarks/bench_shared_config.py [--sections SECTIONS] [--tasks TASKS] [--workers WORKERS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import concurrent.futures
+import itertools
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value
+from afconfig.shared import SharedConfig
+
+def make_config(num_sections):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {'ecoregion': 'western', 'factors': [1.5] * 20},
+                'emissions': {'pm25': i, 'co': i * 2}
+            } for i in range(num_sections)
+        }
+    }
+
+def task_config(i, config):
+    return get_config_value(config, 'fuelbeds', str(i), 'emissions', 'pm25')
+
+def task_handle(i, handle):
+    return handle.get_value('fuelbeds', str(i), 'emissions', 'pm25')
+
+def run(task, arg, num_tasks, num_workers):
+    with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+        # warm up the workers
+        list(executor.map(abs, range(num_workers)))
+        t = time.perf_counter()
+        list(executor.map(task, range(num_tasks), itertools.repeat(arg)))
+        return time.perf_counter() - t
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=10000)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    config = make_config(args.sections)
+    with SharedConfig(config) as shared:
+        print("{} sections, {} tasks, {} workers".format(
+            args.sections, args.tasks, args.workers))
+        print("{:<8} {:>16} {:>20}".format('', 'pickled (bytes)',
+            'per task (ms)'))
+        for name, task, arg in [
+                ('config', task_config, config),
+                ('handle', task_handle, shared.handle)]:
+            t = run(task, arg, args.tasks, args.workers)
+            print("{:<8} {:>16} {:>20.3f}".format(name,
+                len(pickle.dumps(arg)), t * 1000 / args.tasks))
+
+if __name__ == "__main__":
+    main()
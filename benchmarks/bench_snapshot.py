@@ -0,0 +1,86 @@
+"""Compares opening a config snapshot with parsing the same config as JSON
+
+Each of a pool of worker processes loads the config and looks up a
+few values, either by parsing a JSON file or by opening a snapshot.
+
+Usage:
+
+    python benchmarks/bench_snapshot.py [--sections SECTIONS] [--workers WORKERS]
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import concurrent.futures
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import get_config_value
+from afconfig.snapshot import save_snapshot, open_snapshot
+
+def make_config(num_sections):
+    return {
+        'fuelbeds': {
+            str(i): {
+                'consumption': {'ecoregion': 'western', 'factors': [1.5] * 20},
+                'emissions': {'pm25': i, 'co': i * 2}
+            } for i in range(num_sections)
+        }
+    }
+
+def worker_json(filename):
+    t = time.perf_counter()
+    with open(filename) as f:
+        config = json.load(f)
+    values = [get_config_value(config, 'fuelbeds', str(i), 'emissions', 'pm25')
+        for i in range(10)]
+    return (time.perf_counter() - t,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def worker_snapshot(filename):
+    t = time.perf_counter()
+    config = open_snapshot(filename)
+    values = [get_config_value(config, 'fuelbeds', str(i), 'emissions', 'pm25')
+        for i in range(10)]
+    return (time.perf_counter() - t,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def run(worker, filename, num_workers):
+    with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+        results = list(executor.map(worker, [filename] * num_workers))
+    times, rss = zip(*results)
+    return sum(times) / len(times), max(rss)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    config = make_config(args.sections)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_filename = os.path.join(tmp_dir, 'config.json')
+        snapshot_filename = os.path.join(tmp_dir, 'config.snap')
+        with open(json_filename, 'w') as f:
+            json.dump(config, f)
+        save_snapshot(config, snapshot_filename)
+        del config
+
+        print("{:.1f} MB JSON, {:.1f} MB snapshot, {} workers".format(
+            os.path.getsize(json_filename) / 1e6,
+            os.path.getsize(snapshot_filename) / 1e6, args.workers))
+        print("{:<10} {:>22} {:>18}".format(
+            '', 'load + lookups (ms)', 'max RSS (MB)'))
+        for name, worker, filename in [
+                ('json', worker_json, json_filename),
+                ('snapshot', worker_snapshot, snapshot_filename)]:
+            t, rss = run(worker, filename, args.workers)
+            print("{:<10} {:>22.2f} {:>18.1f}".format(name, t * 1000, rss / 1024))
+
+if __name__ == "__main__":
+    main()
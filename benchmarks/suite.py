@@ -0,0 +1,366 @@
+"""Benchmark and regression-tracking suite for afconfig's primitives
+
+Times each primitive on synthetic configs with the given width (keys per
+dict), depth (levels of nesting) and number of layers, appends the
+results to a JSON history file, and reports each primitive that's more
+than threshold times slower than its baseline -- the results of the
+first run (or of the last run with --update-baseline) with the same
+parameters and Python version. Exits with status 1 if any regressed.
+
+Usage:
+
+    python benchmarks/suite.py [--width WIDTH] [--depth DEPTH] [--layers LAYERS]
+        [--history HISTORY] [--threshold THRESHOLD] [--update-baseline]
+
+benchmarks/test_suite.py runs the same checks with pytest, if
+AFCONFIG_BENCHMARKS is set to 1.
+"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+import collections
+import configparser
+import copy
+import datetime
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afconfig import (
+    compile_path,
+    config_parser_to_dict,
+    get_config_value,
+    get_config_values,
+    merge_configs,
+    merge_configs_many,
+    set_config_value,
+    ConfigDict,
+    ImmutableConfigDict
+)
+from afconfig.compact import compact_config
+from afconfig.diff import diff_configs
+from afconfig.persistent import FrozenConfigDict
+from afconfig.query import query_config
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'history.json')
+DEFAULT_THRESHOLD = 1.5
+
+Params = collections.namedtuple('Params', ['width', 'depth', 'layers'])
+Regression = collections.namedtuple('Regression',
+    ['name', 'seconds', 'baseline', 'ratio'])
+
+##
+## Synthetic configs
+##
+
+def make_keys(width):
+    return ['k{}'.format(i) for i in range(width)]
+
+def make_config(width, depth, layer=0):
+    """Returns config with width keys per dict, nested depth levels deep
+    (i.e. width ** depth integer leaves)
+
+    Configs with the same width and depth have the same keys, so that
+    layers merge without conflicts; their leaf values differ by layer.
+    """
+    keys = make_keys(width)
+    config = {}
+    level = [config]
+    for i in range(depth - 1):
+        next_level = []
+        for d in level:
+            for k in keys:
+                d[k] = {}
+                next_level.append(d[k])
+        level = next_level
+    for n, d in enumerate(level):
+        for i, k in enumerate(keys):
+            d[k] = layer * len(level) * width + n * width + i
+    return config
+
+def make_layers(width, depth, layers):
+    """Returns list of layers configs, each as returned by make_config"""
+    return [make_config(width, depth, layer=i) for i in range(layers)]
+
+def leaf_paths(width, depth):
+    """Returns key paths of all leaves in make_config(width, depth)"""
+    return list(itertools.product(make_keys(width), repeat=depth))
+
+def make_config_parser(width, depth):
+    """Returns ConfigParser with the same number of values as
+    make_config(width, depth), in width ** (depth - 1) sections
+    """
+    keys = make_keys(width)
+    config = configparser.ConfigParser()
+    config.read_dict({'.'.join(s): {k: str(i) for i, k in enumerate(keys)}
+        for s in itertools.product(keys, repeat=max(depth - 1, 1))})
+    return config
+
+def make_immutable_config(config):
+    """Returns copy of config as nested ImmutableConfigDict objects"""
+    return ImmutableConfigDict((k, make_immutable_config(v)
+        if isinstance(v, dict) else v) for k, v in config.items())
+
+##
+## Benchmarks
+##
+
+# Each benchmark is a function that, given Params, sets up its input
+# and returns the function to time; those that modify their input
+# must leave it such that repeated calls do the same work
+BENCHMARKS = collections.OrderedDict()
+
+def benchmark(name):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+@benchmark('get_config_value')
+def bench_get_config_value(params):
+    config = make_config(params.width, params.depth)
+    paths = leaf_paths(params.width, params.depth)
+    def run():
+        for path in paths:
+            get_config_value(config, *path)
+    return run
+
+@benchmark('get_config_value (missing)')
+def bench_get_config_value_missing(params):
+    config = make_config(params.width, params.depth)
+    paths = [p[:-1] + ('missing',) for p in leaf_paths(params.width, params.depth)]
+    def run():
+        for path in paths:
+            get_config_value(config, *path, default=0)
+    return run
+
+@benchmark('get_config_values')
+def bench_get_config_values(params):
+    config = make_config(params.width, params.depth)
+    paths = leaf_paths(params.width, params.depth)
+    return lambda: get_config_values(config, paths)
+
+@benchmark('compile_path')
+def bench_compile_path(params):
+    config = make_config(params.width, params.depth)
+    accessors = [compile_path(*p) for p in leaf_paths(params.width, params.depth)]
+    def run():
+        for accessor in accessors:
+            accessor(config)
+    return run
+
+@benchmark('ConfigDict.get_value')
+def bench_config_dict_get_value(params):
+    config = ConfigDict(make_config(params.width, params.depth))
+    paths = leaf_paths(params.width, params.depth)
+    def run():
+        for path in paths:
+            config.get_value(*path)
+    return run
+
+@benchmark('set_config_value')
+def bench_set_config_value(params):
+    config = make_config(params.width, params.depth)
+    paths = leaf_paths(params.width, params.depth)
+    def run():
+        for path in paths:
+            set_config_value(config, 1, *path)
+    return run
+
+@benchmark('merge_configs')
+def bench_merge_configs(params):
+    config, to_be_merged_config = make_layers(params.width, params.depth, 2)
+    return lambda: merge_configs(config, to_be_merged_config)
+
+@benchmark('merge_configs_many')
+def bench_merge_configs_many(params):
+    config = make_config(params.width, params.depth)
+    layers = make_layers(params.width, params.depth, params.layers)
+    return lambda: merge_configs_many(config, *layers)
+
+@benchmark('config_parser_to_dict')
+def bench_config_parser_to_dict(params):
+    config = make_config_parser(params.width, params.depth)
+    return lambda: config_parser_to_dict(config)
+
+@benchmark('ImmutableConfigDict')
+def bench_immutable_config_dict(params):
+    config = make_config(params.width, params.depth)
+    return lambda: make_immutable_config(config)
+
+@benchmark('get_config_value (ImmutableConfigDict)')
+def bench_immutable_config_dict_get_value(params):
+    config = make_immutable_config(make_config(params.width, params.depth))
+    paths = leaf_paths(params.width, params.depth)
+    def run():
+        for path in paths:
+            get_config_value(config, *path)
+    return run
+
+@benchmark('FrozenConfigDict.merge')
+def bench_frozen_config_dict_merge(params):
+    layers = [FrozenConfigDict(c) for c in
+        make_layers(params.width, params.depth, params.layers)]
+    def run():
+        config = layers[0]
+        for layer in layers[1:]:
+            config = config.merge(layer)
+    return run
+
+@benchmark('compact_config')
+def bench_compact_config(params):
+    config = make_config(params.width, params.depth)
+    return lambda: compact_config(config)
+
+@benchmark('diff_configs')
+def bench_diff_configs(params):
+    a, b = make_layers(params.width, params.depth, 2)
+    return lambda: diff_configs(a, b)
+
+@benchmark('query_config')
+def bench_query_config(params):
+    config = make_config(params.width, params.depth)
+    return lambda: list(query_config(config, '**', 'k0'))
+
+##
+## Running
+##
+
+def time_benchmark(run, repeat=5, min_time=0.02):
+    """Returns best time per call of run, in seconds, of repeat samples,
+    each calling run enough times to take at least min_time seconds
+    """
+    number = 1
+    while True:
+        t = _time(run, number)
+        if t >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / t) + 1 if t else 0)
+    best = t / number
+    for i in range(repeat - 1):
+        best = min(best, _time(run, number) / number)
+    return best
+
+def _time(run, number):
+    t = time.perf_counter()
+    for i in range(number):
+        run()
+    return time.perf_counter() - t
+
+def run_suite(params, names=None, repeat=5, min_time=0.02):
+    """Returns dict mapping each benchmark's name (or each of names) to
+    its time per call, in seconds
+    """
+    return collections.OrderedDict((name, time_benchmark(
+        BENCHMARKS[name](params), repeat=repeat, min_time=min_time))
+        for name in (names or BENCHMARKS))
+
+##
+## History and regressions
+##
+
+def baseline_key(params):
+    """Returns key of baseline for params, which is specific to the
+    Python version
+    """
+    return 'python={} width={} depth={} layers={}'.format(
+        platform.python_version(), *params)
+
+def load_history(filename):
+    if not os.path.exists(filename):
+        return {'baselines': {}, 'runs': []}
+    with open(filename) as f:
+        return json.load(f)
+
+def save_history(history, filename):
+    # Written to a temporary file first, so that an interrupted run
+    # doesn't leave a truncated history
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_filename, filename)
+
+def get_baseline(history, params):
+    """Returns dict of baseline results for params, or an empty dict"""
+    baseline = history['baselines'].get(baseline_key(params))
+    return dict(baseline['results']) if baseline else {}
+
+def record_run(history, params, results, update_baseline=False):
+    """Appends results to history, and makes them the baseline for params
+    if update_baseline is True or there isn't one yet
+
+    Benchmarks missing from an existing baseline (i.e. added to the
+    suite since) are added to it.
+    """
+    key = baseline_key(params)
+    run = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'key': key,
+        'platform': platform.platform(),
+        'results': dict(results)
+    }
+    history['runs'].append(run)
+    baseline = history['baselines'].get(key)
+    if update_baseline or baseline is None:
+        history['baselines'][key] = copy.deepcopy(run)
+    else:
+        for name, seconds in results.items():
+            baseline['results'].setdefault(name, seconds)
+    return history
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns list of Regression tuples for the results more than
+    threshold times their baseline
+    """
+    regressions = []
+    for name, seconds in results.items():
+        baseline_seconds = baseline.get(name)
+        if baseline_seconds and seconds > threshold * baseline_seconds:
+            regressions.append(Regression(name, seconds, baseline_seconds,
+                seconds / baseline_seconds))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--layers', type=int, default=5)
+    parser.add_argument('-b', '--benchmark', dest='names', action='append',
+        choices=list(BENCHMARKS), help="benchmark to run (default: all)")
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05,
+        help="minimum seconds per sample")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    params = Params(args.width, args.depth, args.layers)
+    history = load_history(args.history)
+    baseline = get_baseline(history, params)
+    results = run_suite(params, names=args.names, repeat=args.repeat,
+        min_time=args.min_time)
+    regressions = find_regressions(results, baseline, args.threshold)
+    record_run(history, params, results, update_baseline=args.update_baseline)
+    save_history(history, args.history)
+
+    regressed = {r.name for r in regressions}
+    print(baseline_key(params))
+    print("{:<40} {:>12} {:>12} {:>8}".format(
+        'primitive', 'time (us)', 'base (us)', 'ratio'))
+    for name, seconds in results.items():
+        baseline_seconds = baseline.get(name)
+        print("{:<40} {:>12.1f} {:>12} {:>8}{}".format(name, seconds * 1e6,
+            '{:.1f}'.format(baseline_seconds * 1e6) if baseline_seconds else '-',
+            '{:.2f}'.format(seconds / baseline_seconds) if baseline_seconds else '-',
+            '  REGRESSED' if name in regressed else ''))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Tests of the benchmark suite (see suite.py), and, if enabled, pytest
+runs of the suite itself, failing for each primitive that's regressed
+past the threshold against the stored baseline
+
+The regression checks time things and write to the history file, so
+they only run if AFCONFIG_BENCHMARKS is set to 1:
+
+    AFCONFIG_BENCHMARKS=1 py.test benchmarks
+
+They're configured with environment variables:
+
+ - AFCONFIG_BENCHMARK_HISTORY -- history file (default benchmarks/history.json)
+ - AFCONFIG_BENCHMARK_THRESHOLD -- slowdown ratio that fails (default 2.0,
+      to allow for noisier timings than when running suite.py directly)
+ - AFCONFIG_BENCHMARK_UPDATE_BASELINE -- if set to 1, make this run the
+      baseline
+ - AFCONFIG_BENCHMARK_SIZE -- width, depth, and layers (default 8,3,3)
+"""
+
+__author__ = "Joel Dubowy"
+
+import os
+
+import pytest
+from py.test import raises
+
+import suite
+
+ENABLED = os.environ.get('AFCONFIG_BENCHMARKS') == '1'
+HISTORY = os.environ.get('AFCONFIG_BENCHMARK_HISTORY', suite.DEFAULT_HISTORY)
+THRESHOLD = float(os.environ.get('AFCONFIG_BENCHMARK_THRESHOLD', 2.0))
+UPDATE_BASELINE = os.environ.get('AFCONFIG_BENCHMARK_UPDATE_BASELINE') == '1'
+PARAMS = suite.Params(*[int(e) for e in
+    os.environ.get('AFCONFIG_BENCHMARK_SIZE', '8,3,3').split(',')])
+
+class TestGenerators(object):
+
+    def test_make_config(self):
+        assert suite.make_config(2, 1) == {'k0': 0, 'k1': 1}
+        assert suite.make_config(2, 2, layer=1) == {
+            'k0': {'k0': 4, 'k1': 5},
+            'k1': {'k0': 6, 'k1': 7}
+        }
+
+    def test_leaf_paths(self):
+        config = suite.make_config(3, 4)
+        paths = suite.leaf_paths(3, 4)
+        assert len(paths) == 3 ** 4
+        assert sorted(suite.get_config_value(config, *p) for p in paths) == list(
+            range(3 ** 4))
+
+    def test_make_layers(self):
+        layers = suite.make_layers(3, 2, 4)
+        assert len(layers) == 4
+        # same keys, different values
+        assert all(set(l) == set(layers[0]) for l in layers)
+        assert len({l['k2']['k2'] for l in layers}) == 4
+
+    def test_make_config_parser(self):
+        d = suite.config_parser_to_dict(suite.make_config_parser(2, 3))
+        assert sorted(d) == ['k0.k0', 'k0.k1', 'k1.k0', 'k1.k1']
+        assert d['k1.k0'] == {'k0': '0', 'k1': '1'}
+
+    def test_make_immutable_config(self):
+        config = suite.make_immutable_config(suite.make_config(2, 3))
+        assert config == suite.make_config(2, 3)
+        assert isinstance(config['k1']['k0'], suite.ImmutableConfigDict)
+        with raises(TypeError):
+            config['k1']['k0'] = 1
+
+class TestHistory(object):
+
+    PARAMS = suite.Params(2, 2, 2)
+
+    def test_first_run_is_baseline(self, tmpdir):
+        filename = str(tmpdir.join('history.json'))
+        history = suite.load_history(filename)
+        assert suite.get_baseline(history, self.PARAMS) == {}
+
+        suite.record_run(history, self.PARAMS, {'a': 1.0})
+        suite.save_history(history, filename)
+        history = suite.load_history(filename)
+        assert suite.get_baseline(history, self.PARAMS) == {'a': 1.0}
+        assert len(history['runs']) == 1
+
+    def test_later_runs_dont_change_baseline(self):
+        history = suite.load_history('/dev/null/missing.json')
+        suite.record_run(history, self.PARAMS, {'a': 1.0})
+        suite.record_run(history, self.PARAMS, {'a': 3.0, 'b': 2.0})
+        # new benchmarks are added to the baseline, though
+        assert suite.get_baseline(history, self.PARAMS) == {'a': 1.0, 'b': 2.0}
+        assert [r['results']['a'] for r in history['runs']] == [1.0, 3.0]
+
+        suite.record_run(history, self.PARAMS, {'a': 3.0}, update_baseline=True)
+        assert suite.get_baseline(history, self.PARAMS) == {'a': 3.0}
+
+    def test_baselines_are_per_params(self):
+        history = suite.load_history('/dev/null/missing.json')
+        suite.record_run(history, self.PARAMS, {'a': 1.0})
+        assert suite.get_baseline(history, suite.Params(2, 2, 3)) == {}
+
+    def test_find_regressions(self):
+        baseline = {'a': 1.0, 'b': 1.0}
+        results = {'a': 1.4, 'b': 2.0, 'c': 100.0}
+        assert suite.find_regressions(results, baseline, threshold=1.5) == [
+            suite.Regression('b', 2.0, 1.0, 2.0)]
+        assert suite.find_regressions(results, baseline, threshold=2.5) == []
+        assert suite.find_regressions(results, {}) == []
+
+##
+## Regression checks
+##
+
+@pytest.fixture(scope='module')
+def run():
+    """Runs the suite once, comparing against and then recording to the
+    history file, and returns the results and the prior baseline
+    """
+    history = suite.load_history(HISTORY)
+    baseline = suite.get_baseline(history, PARAMS)
+    results = suite.run_suite(PARAMS, repeat=5, min_time=0.01)
+    suite.record_run(history, PARAMS, results, update_baseline=UPDATE_BASELINE)
+    suite.save_history(history, HISTORY)
+    return results, baseline
+
+@pytest.mark.skipif(not ENABLED,
+    reason="set AFCONFIG_BENCHMARKS=1 to run regression checks")
+@pytest.mark.parametrize('name', list(suite.BENCHMARKS))
+def test_no_regression(run, name):
+    results, baseline = run
+    regressions = suite.find_regressions({name: results[name]}, baseline,
+        threshold=THRESHOLD)
+    assert not regressions, ("{} took {:.1f} us, {:.2f} times its baseline"
+        " of {:.1f} us").format(name, regressions[0].seconds * 1e6,
+        regressions[0].ratio, regressions[0].baseline * 1e6)
@@ -8,15 +8,22 @@ from py.test import raises
 
 from afconfig import (
     config_parser_to_dict,
+    LazyConfigParserDict,
     get_config_value,
+    compile_path,
+    get_config_values,
     set_config_value,
     merge_configs,
+    merge_configs_many,
+    ConfigDict,
+    ImmutableConfigDict,
     GET_CONFIG_VALUE_ERR_MSG_NO_KEYS,
     SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
     SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS,
     MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT,
     ConfigurationError
 )
+from afconfig.layered import LayeredConfig
 
 
 class TestConfigParserToDict(object):
@@ -43,6 +50,117 @@ class TestConfigParserToDict(object):
         }
         assert d == config_parser_to_dict(c)
 
+    def _interpolated_config(self):
+        c = configparser.ConfigParser(defaults={'root': '/data'})
+        c.read_string("""
+[a]
+aa = sdf
+ab = %(root)s/a
+
+[b]
+ba = 123
+""")
+        return c
+
+    def test_raw(self):
+        assert {} == config_parser_to_dict(None, raw=True)
+        c = self._interpolated_config()
+        assert {
+            'a': {'root': '/data', 'aa': 'sdf', 'ab': '%(root)s/a'},
+            'b': {'root': '/data', 'ba': '123'}
+        } == config_parser_to_dict(c, raw=True)
+        assert {
+            'a': {'root': '/data', 'aa': 'sdf', 'ab': '/data/a'},
+            'b': {'root': '/data', 'ba': '123'}
+        } == config_parser_to_dict(c)
+
+    def test_lazy(self):
+        assert {} == config_parser_to_dict(None, lazy=True)
+        c = self._interpolated_config()
+        for raw in (False, True):
+            d = config_parser_to_dict(c, lazy=True, raw=raw)
+            assert isinstance(d, LazyConfigParserDict)
+            assert 2 == len(d)
+            assert ['a', 'b'] == list(d)
+            assert 'b' in d
+            assert 'z' not in d
+            assert 0 == len(d._converted)
+
+            assert '123' == get_config_value(d, 'b', 'ba')
+            assert 1 == len(d._converted)
+            assert None == d.get('z')
+            with raises(KeyError) as e_info:
+                d['z']
+
+            assert config_parser_to_dict(c, raw=raw) == d
+            assert 2 == len(d._converted)
+
+    def test_lazy_modification(self):
+        c = self._interpolated_config()
+        d = config_parser_to_dict(c, lazy=True)
+        d['a'] = 1
+        del d['b']
+        d['c'] = {'ca': 2}
+        assert {'a': 1, 'c': {'ca': 2}} == d
+        assert ['a', 'c'] == list(d)
+
+        d = config_parser_to_dict(c, lazy=True)
+        merge_configs(d, {'a': {'aa': 'foo'}, 'c': 1})
+        assert {
+            'a': {'root': '/data', 'aa': 'foo', 'ab': '/data/a'},
+            'b': {'root': '/data', 'ba': '123'},
+            'c': 1
+        } == d
+
+    def test_lazy_order(self):
+        # Keys are in section order, regardless of which were converted
+        # first; those added are at the end
+        c = configparser.ConfigParser()
+        c.read_dict({'a': {'x': '1'}, 'b': {'x': '2'}, 'c': {'x': '3'}})
+        d = config_parser_to_dict(c, lazy=True)
+        d['c']
+        assert ['a', 'b', 'c'] == list(d)
+        assert ['a', 'b', 'c'] == list(d.copy())
+        d['b'] = 1
+        d['z'] = 2
+        del d['a']
+        d['a'] = 3
+        assert ['b', 'c', 'z', 'a'] == list(d)
+        assert ['b', 'c', 'z', 'a'] == list(d.copy())
+        assert {'b': 1, 'c': {'x': '3'}, 'z': 2, 'a': 3} == d
+
+    def test_lazy_whole_dict_operations(self):
+        # None of these may see only the sections converted so far
+        import json
+        c = self._interpolated_config()
+        expected = config_parser_to_dict(c)
+
+        d = config_parser_to_dict(c, lazy=True)
+        with raises(TypeError):
+            # Not silently '{}'
+            json.dumps(d)
+        assert expected == json.loads(json.dumps(d, default=dict))
+
+        d = config_parser_to_dict(c, lazy=True)
+        assert expected == dict(d)
+        assert expected == {**config_parser_to_dict(c, lazy=True)}
+        assert expected == d | {}
+        assert type(d | {}) is dict
+        assert dict(expected, c=1) == config_parser_to_dict(c, lazy=True) | {'c': 1}
+        assert dict(expected, c=1) == {'c': 1} | config_parser_to_dict(c, lazy=True)
+
+        d = config_parser_to_dict(c, lazy=True)
+        d |= {'c': 1}
+        assert isinstance(d, LazyConfigParserDict)
+        assert dict(expected, c=1) == d
+
+    def test_lazy_pickle(self):
+        import pickle
+        c = self._interpolated_config()
+        d = pickle.loads(pickle.dumps(config_parser_to_dict(c, lazy=True)))
+        assert type(d) is dict
+        assert config_parser_to_dict(c) == d
+
 ##
 ## Tests for utilitu methods
 ##
@@ -306,6 +424,117 @@ class TestGetConfigValue(object):
         assert 'SDF' == get_config_value(config, 'b', 'cc', 'ccc')
         assert 'SDF' == get_config_value(config, 'b', 'cc', 'ccc', default=1)
 
+class TestCompilePath(object):
+
+    CONFIG = {
+        'a': {
+            'aa': 'sdf',
+            'ab': 343
+        },
+        'b': {
+            'ba': 123,
+            'bb': 'sdfs',
+            'cc': {
+                'ccc': "SDF"
+            }
+        },
+        'c': 12,
+        'd': None
+    }
+
+    KEYS = [
+        ('z',), ('z', 'b'), ('a', 'b'), ('b', 'cc', 'z'), ('a', 'aa', 'z'),
+        ('c',), ('a',), ('a', 'aa'), ('b', 'cc', 'ccc'), ('d',), ('d', 'e'),
+        ('a', 'ac', 'foo')
+    ]
+
+    KWARGS = [
+        {}, {'default': 1},
+        {'fail_on_missing_key': True},
+        {'fail_on_missing_key': True, 'default': 1},
+        {'fail_on_invalid_config': True},
+        {'fail_on_invalid_config': True, 'default': 1},
+        {'fail_on_missing_key': True, 'fail_on_invalid_config': True},
+    ]
+
+    def _outcome(self, f):
+        try:
+            return ('value', f())
+        except Exception as e:
+            return (type(e), e.args)
+
+    def test_no_keys(self):
+        with raises(ConfigurationError) as e_info:
+            compile_path()
+        assert e_info.value.args[0] == GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+
+    def test_matches_get_config_value(self):
+        for config in (None, 123, "SDF", {}, self.CONFIG, self.CONFIG['a']):
+            for keys in self.KEYS:
+                for kwargs in self.KWARGS:
+                    accessor = compile_path(*keys, **kwargs)
+                    expected = self._outcome(
+                        lambda: get_config_value(config, *keys, **kwargs))
+                    assert expected == self._outcome(lambda: accessor(config))
+
+    def test_reuse(self):
+        accessor = compile_path('b', 'cc', 'ccc', default=1)
+        assert accessor.keys == ('b', 'cc', 'ccc')
+        assert 'SDF' == accessor(self.CONFIG)
+        assert 1 == accessor({})
+        assert 'foo' == accessor({'b': {'cc': {'ccc': 'foo'}}})
+
+class TestGetConfigValues(object):
+
+    def _outcome(self, f):
+        try:
+            return ('value', f())
+        except Exception as e:
+            return (type(e), e.args)
+
+    def test_matches_get_config_value(self):
+        configs = (None, 123, "SDF", {}, TestCompilePath.CONFIG,
+            TestCompilePath.CONFIG['a'])
+        for config in configs:
+            for kwargs in TestCompilePath.KWARGS:
+                # each path individually
+                for keys in TestCompilePath.KEYS:
+                    expected = self._outcome(
+                        lambda: [get_config_value(config, *keys, **kwargs)])
+                    assert expected == self._outcome(
+                        lambda: get_config_values(config, [keys], **kwargs))
+
+                # all paths together; the first failing path's error
+                # is raised
+                expected = self._outcome(lambda: [
+                    get_config_value(config, *keys, **kwargs)
+                        for keys in TestCompilePath.KEYS])
+                assert expected == self._outcome(lambda: get_config_values(
+                    config, TestCompilePath.KEYS, **kwargs))
+
+    def test_no_keys(self):
+        with raises(ConfigurationError) as e_info:
+            get_config_values({}, [('a',), ()])
+        assert e_info.value.args[0] == GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+
+    def test_empty_paths(self):
+        assert [] == get_config_values({'a': 1}, [])
+        assert {} == get_config_values({'a': 1}, [], as_dict=True)
+
+    def test_shared_prefixes_and_duplicates(self):
+        config = TestCompilePath.CONFIG
+        paths = [('b', 'cc', 'ccc'), ('b',), ('b', 'ba'), ['b', 'cc', 'ccc'],
+            ('b', 'zz'), ('a', 'aa')]
+        assert ['SDF', config['b'], 123, 'SDF', 5, 'sdf'] == get_config_values(
+            config, paths, default=5)
+        assert {
+            ('b', 'cc', 'ccc'): 'SDF',
+            ('b',): config['b'],
+            ('b', 'ba'): 123,
+            ('b', 'zz'): None,
+            ('a', 'aa'): 'sdf'
+        } == get_config_values(config, paths, as_dict=True)
+
 class TestSetConfigValue(object):
 
     def test_invalid_config(self):
@@ -337,6 +566,18 @@ class TestSetConfigValue(object):
         set_config_value(config, 34, 'b', 'c')
         assert config == {'a': 123, 'b': {'c': 34}}
 
+    def test_mutable_mappings(self):
+        config = LayeredConfig({'a': {'x': 1, 'y': 2}}, {'a': {'y': 3}})
+        set_config_value(config, 5, 'a', 'z')
+        set_config_value(config, 6, 'b', 'c')
+        assert config.to_dict() == {'a': {'x': 1, 'y': 3, 'z': 5}, 'b': {'c': 6}}
+
+        parser = configparser.ConfigParser()
+        parser.read_dict({'a': {'x': '1'}})
+        config = LazyConfigParserDict(parser)
+        set_config_value(config, '5', 'a', 'z')
+        assert config == {'a': {'x': '1', 'z': '5'}}
+
 class TestMergeConfigs(object):
 
     def test_invalid_configs(self):
@@ -394,6 +635,41 @@ class TestMergeConfigs(object):
         b = merge_configs(a, {'a': {'c': 3}})
         assert a == b == {'a': {'c': 3}}
 
+    def test_conflict_message_key_prefix(self):
+        with raises(ConfigurationError) as e_info:
+            merge_configs({'a': {'b': 'c'}}, {'a': {'b': {}}}, 'x', 'y')
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('x > y > a > b')
+
+    def test_first_conflict_depth_first(self):
+        a = {'a': {'b': 1, 'c': {}}, 'd': 2}
+        with raises(ConfigurationError) as e_info:
+            merge_configs(a, {'a': {'b': 2, 'c': 3}, 'd': {}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > c')
+        # keys before the conflict were merged
+        assert a == {'a': {'b': 2, 'c': {}}, 'd': 2}
+
+    def test_deep(self):
+        depth = 5000
+        a, b = {}, {}
+        d_a, d_b = a, b
+        for i in range(depth):
+            d_a['k'], d_b['k'] = {'a': i}, {'b': i}
+            d_a, d_b = d_a['k'], d_b['k']
+        assert a is merge_configs(a, b)
+        d = a
+        for i in range(depth):
+            d = d['k']
+            assert d['a'] == d['b'] == i
+
+    def test_wide(self):
+        a = {'k{}'.format(i): {'a': i} for i in range(10000)}
+        b = {'k{}'.format(i): {'b': i} for i in range(0, 20000, 2)}
+        merge_configs(a, b)
+        assert len(a) == 15000
+        assert a['k2'] == {'a': 2, 'b': 2}
+        assert a['k3'] == {'a': 3}
+        assert a['k19998'] == {'b': 19998}
+
     def test_all(self):
         a = {'a': 123}
         b = merge_configs(a, {'b': {'c': 3}})
@@ -402,3 +678,263 @@ class TestMergeConfigs(object):
         assert a == b == {'a': 123, 'b': {'c': 3, 'd': 5}}
         b = merge_configs(a, {'b': {'d': 19, 'e': 10}, 'f': 321})
         assert a == b == {'a': 123, 'b': {'c': 3, 'd': 19, 'e': 10}, 'f': 321}
+
+    def test_mutable_mappings(self):
+        config = LayeredConfig({'a': {'x': 1}})
+        assert config is merge_configs(config, {'a': {'z': 1}, 'b': {'c': 2}})
+        assert config.to_dict() == {'a': {'x': 1, 'z': 1}, 'b': {'c': 2}}
+        with raises(ConfigurationError) as e_info:
+            merge_configs(config, {'b': 1})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('b')
+        with raises(ConfigurationError) as e_info:
+            merge_configs(config, {'a': {'x': {}}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > x')
+
+        parser = configparser.ConfigParser()
+        parser.read_dict({'a': {'x': '1'}})
+        config = LazyConfigParserDict(parser)
+        merge_configs(config, {'a': {'z': '1'}})
+        assert config == {'a': {'x': '1', 'z': '1'}}
+
+class TestMergeConfigsMany(object):
+
+    def _random_config(self, rand, depth=3):
+        config = {}
+        for i in range(rand.randint(0, 4)):
+            r = rand.random()
+            if depth > 0 and r < 0.4:
+                v = self._random_config(rand, depth - 1)
+            elif r < 0.5:
+                v = None
+            else:
+                v = rand.randint(0, 3)
+            config[rand.choice('abcdef')] = v
+        return config
+
+    def _outcome(self, merge, config, layers):
+        import copy
+        config, layers = copy.deepcopy((config, layers))
+        try:
+            merge(config, layers)
+            return ('value', config)
+        except ConfigurationError as e:
+            return ('error', e.args)
+
+    def _sequential(self, config, layers):
+        for layer in layers:
+            merge_configs(config, layer)
+
+    def _many(self, config, layers):
+        merge_configs_many(config, *layers)
+
+    def test_invalid_configs(self):
+        for args in [(12, {}), ({}, {}, 12), ({}, {}, None)]:
+            with raises(ConfigurationError) as e_info:
+                merge_configs_many(*args)
+            assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+    def test_no_layers(self):
+        a = {'a': 1}
+        assert a is merge_configs_many(a)
+        assert a == {'a': 1}
+
+    def test_basic(self):
+        a = {'a': 123, 'b': {'c': None}}
+        b = merge_configs_many(a, {'b': {'d': 5}}, {'b': {'c': {'x': 1}}},
+            {'f': 321, 'b': {'d': 19}}, {'f': None})
+        assert a is b
+        assert a == {'a': 123, 'b': {'c': {'x': 1}, 'd': 19}, 'f': None}
+        assert list(a['b']) == ['c', 'd']
+
+    def test_conflicts(self):
+        # the conflict in the earliest layer is raised, even though the
+        # key path of the one in the later layer is visited first
+        with raises(ConfigurationError) as e_info:
+            merge_configs_many({'a': {}, 'b': 1}, {'b': {}}, {'a': 1})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('b')
+
+        # within a layer, the first conflict depth first is raised
+        with raises(ConfigurationError) as e_info:
+            merge_configs_many({'a': {'x': {}}, 'b': 1},
+                {'b': {'y': 1}, 'a': {'x': 2}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('b')
+
+        with raises(ConfigurationError) as e_info:
+            merge_configs_many({'zzz': {'a': {'b': 'c'}}}, {}, {'zzz': {'a': None}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('zzz > a')
+
+    def test_mutable_mappings(self):
+        config = LayeredConfig({'a': {'x': 1}})
+        merge_configs_many(config, {'a': {'y': 1}}, {'a': {'z': 2, 'y': 3}})
+        assert config.to_dict() == {'a': {'x': 1, 'y': 3, 'z': 2}}
+        with raises(ConfigurationError) as e_info:
+            merge_configs_many(config, {'a': {'x': {}}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > x')
+
+        parser = configparser.ConfigParser()
+        parser.read_dict({'a': {'x': '1'}})
+        config = LazyConfigParserDict(parser)
+        merge_configs_many(config, {'a': {'y': '1'}}, {'a': {'z': '2'}})
+        assert config == {'a': {'x': '1', 'y': '1', 'z': '2'}}
+
+    def test_matches_sequential_merge_configs(self):
+        import random
+        rand = random.Random(1234)
+        for i in range(2000):
+            config = self._random_config(rand)
+            layers = [self._random_config(rand)
+                for j in range(rand.randint(0, 6))]
+            expected = self._outcome(self._sequential, config, layers)
+            actual = self._outcome(self._many, config, layers)
+            assert expected[0] == actual[0]
+            if expected[0] == 'value':
+                assert expected == actual
+                # key order too
+                assert repr(expected) == repr(actual)
+            else:
+                assert expected == actual
+
+class TestConfigDict(object):
+
+    def _config(self):
+        return ConfigDict({
+            'a': {
+                'aa': 'sdf',
+                'ab': 343
+            },
+            'b': {
+                'ba': 123,
+                'cc': {
+                    'ccc': "SDF"
+                }
+            },
+            'c': 12
+        })
+
+    def _assert_index_valid(self, config):
+        index = config._index
+        config.invalidate_index()
+        config.get_value('a')
+        assert index == config._index
+
+    def test_is_dict(self):
+        config = self._config()
+        assert isinstance(config, dict)
+        assert 'SDF' == get_config_value(config, 'b', 'cc', 'ccc')
+
+    def test_get_value(self):
+        for use_index in (True, False):
+            config = self._config()
+            assert config._index is None
+            config.use_index = use_index
+            assert 'SDF' == config.get_value('b', 'cc', 'ccc')
+            assert {'ccc': 'SDF'} == config.get_value('b', 'cc')
+            assert 12 == config.get_value('c', default=1)
+            assert None == config.get_value('b', 'zz')
+            assert 1 == config.get_value('b', 'cc', 'ccc', 'z', default=1)
+            with raises(KeyError) as e_info:
+                config.get_value('b', 'zz', fail_on_missing_key=True)
+            with raises(ConfigurationError) as e_info:
+                config.get_value('c', 'd', fail_on_invalid_config=True)
+            with raises(ConfigurationError) as e_info:
+                config.get_value()
+            assert e_info.value.args[0] == GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+            assert (config._index is not None) == use_index
+
+    def test_set_value(self):
+        config = self._config()
+        config.get_value('a')
+        config.set_value(1, 'b', 'cc', 'ccc')
+        assert 1 == config.get_value('b', 'cc', 'ccc')
+        config.set_value(2, 'c', 'd', 'e')
+        assert {'d': {'e': 2}} == config.get_value('c')
+        assert 2 == config.get_value('c', 'd', 'e')
+        config.set_value(3, 'b')
+        assert None == config.get_value('b', 'cc', 'ccc')
+        assert None == config.get_value('b', 'cc')
+        config.set_value({'x': {'y': 4}}, 'z')
+        assert 4 == config.get_value('z', 'x', 'y')
+        self._assert_index_valid(config)
+        with raises(ConfigurationError) as e_info:
+            config.set_value(3)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS
+
+    def test_merge(self):
+        config = self._config()
+        config.get_value('a')
+        assert config is config.merge({
+            'a': {'aa': 'foo', 'ad': {'x': 1}},
+            'b': {'cc': {'ccd': 2}},
+            'd': {'da': 3}
+        })
+        assert 'foo' == config.get_value('a', 'aa')
+        assert 1 == config.get_value('a', 'ad', 'x')
+        assert 'SDF' == config.get_value('b', 'cc', 'ccc')
+        assert 2 == config.get_value('b', 'cc', 'ccd')
+        assert 3 == config.get_value('d', 'da')
+        self._assert_index_valid(config)
+
+    def test_merge_conflict_invalidates_index(self):
+        config = self._config()
+        config.get_value('a')
+        with raises(ConfigurationError) as e_info:
+            config.merge({'a': {'aa': {'x': 1}}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > aa')
+        assert config._index is None
+
+    def test_dict_methods(self):
+        config = self._config()
+        config.get_value('a')
+        config['a'] = {'x': {'y': 1}}
+        assert 1 == config.get_value('a', 'x', 'y')
+        assert None == config.get_value('a', 'aa')
+        del config['b']
+        assert None == config.get_value('b', 'cc', 'ccc')
+        self._assert_index_valid(config)
+
+        config.update(b={'z': 2})
+        assert config._index is None
+        assert 2 == config.get_value('b', 'z')
+        config.pop('b')
+        assert None == config.get_value('b', 'z')
+
+    def test_ior(self):
+        config = ConfigDict({'a': {'b': 1}})
+        assert 1 == config.get_value('a', 'b')
+        try:
+            config |= {'a': {'b': 2}}
+        except TypeError:
+            # Python < 3.9
+            return
+        assert isinstance(config, ConfigDict)
+        assert 2 == config.get_value('a', 'b')
+
+    def test_copy(self):
+        import copy, pickle
+        config = self._config()
+        config.get_value('a')
+        for c in (copy.copy(config), copy.deepcopy(config),
+                pickle.loads(pickle.dumps(config))):
+            assert isinstance(c, ConfigDict)
+            assert c == config
+            assert c._index is None
+
+
+class TestImmutableConfigDict(object):
+
+    def test_immutable(self):
+        config = ImmutableConfigDict({'a': 1})
+        with raises(TypeError):
+            config['a'] = 2
+        with raises(TypeError):
+            config.update(b=2)
+        with raises(TypeError):
+            config |= {'b': 2}
+        assert {'a': 1} == config
+
+    def test_pickle(self):
+        import pickle
+        config = ImmutableConfigDict({'a': {'b': 1}, 'c': 2})
+        c = pickle.loads(pickle.dumps(config))
+        assert isinstance(c, ImmutableConfigDict)
+        assert c == config
@@ -0,0 +1,169 @@
+"""Unit tests for afconfig.aio"""
+
+__author__ = "Joel Dubowy"
+
+import asyncio
+import concurrent.futures
+import http.server
+import json
+import threading
+import time
+import urllib.error
+
+from py.test import raises
+
+from afconfig import (
+    merge_configs_many,
+    ConfigurationError,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+from afconfig.aio import (
+    load_configs,
+    load_layers,
+    LOAD_ERR_MSG_INVALID_CONFIG,
+    LOAD_ERR_MSG_INVALID_SOURCE
+)
+
+
+class StandInServer(object):
+    """Serves canned responses, each after a delay, on a local port,
+    recording (path, start time, end time) of each request handled
+    """
+
+    def __init__(self, responses):
+        # responses maps path -> (delay in seconds, body)
+        requests = self.requests = []
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in responses:
+                    self.send_error(404)
+                    return
+                delay, body = responses[self.path]
+                start = time.perf_counter()
+                time.sleep(delay)
+                requests.append((self.path, start, time.perf_counter()))
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}{}'.format(self.server.server_port, path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def load_json_from_kv_store():
+    return {'d': {'kv': True}}
+
+class TestLoadConfigs(object):
+
+    def setup_method(self):
+        self.server = StandInServer({
+            # the slowest layer is the one with lowest precedence
+            '/base.json': (0.2, json.dumps({'a': {'b': 1, 'c': 2}, 'd': {}})),
+            '/local.json': (0.0, json.dumps({'a': {'c': 3}})),
+            '/conflict.json': (0.0, json.dumps({'a': 1})),
+            '/list.json': (0.0, '[1, 2]'),
+            '/invalid.json': (0.0, '{')
+        })
+
+    def teardown_method(self):
+        self.server.close()
+
+    def write_files(self, tmp_path):
+        json_filename = str(tmp_path / 'a.json')
+        with open(json_filename, 'w') as f:
+            json.dump({'a': {'e': 5}}, f)
+        ini_filename = str(tmp_path / 'a.ini')
+        with open(ini_filename, 'w') as f:
+            f.write('[d]\nf = 6\n')
+        return json_filename, ini_filename
+
+    def test_precedence(self, tmp_path):
+        json_filename, ini_filename = self.write_files(tmp_path)
+        async def load_from_service():
+            await asyncio.sleep(0.1)
+            return {'a': {'b': 10}}
+        sources = [
+            self.server.url('/base.json'),
+            json_filename,
+            load_from_service,
+            self.server.url('/local.json'),
+            ini_filename,
+            load_json_from_kv_store,
+            {'a': {'g': 7}}
+        ]
+        layers = asyncio.run(load_layers(sources))
+        assert [
+            {'a': {'b': 1, 'c': 2}, 'd': {}},
+            {'a': {'e': 5}},
+            {'a': {'b': 10}},
+            {'a': {'c': 3}},
+            {'d': {'f': '6'}},
+            {'d': {'kv': True}},
+            {'a': {'g': 7}}
+        ] == layers
+        expected = {
+            'a': {'b': 10, 'c': 3, 'e': 5, 'g': 7},
+            'd': {'f': '6', 'kv': True}
+        }
+        assert expected == merge_configs_many({}, *layers)
+        assert expected == asyncio.run(load_configs(sources))
+
+    def test_concurrent(self):
+        sources = [self.server.url('/base.json')] * 5
+        asyncio.run(load_configs(sources))
+        # all were being handled at once, rather than one after another
+        assert 5 == len(self.server.requests)
+        starts = [start for path, start, end in self.server.requests]
+        ends = [end for path, start, end in self.server.requests]
+        assert max(starts) < min(ends)
+
+    def test_process_executor(self, tmp_path):
+        json_filename, ini_filename = self.write_files(tmp_path)
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            config = asyncio.run(load_configs([json_filename, ini_filename,
+                self.server.url('/local.json'), load_json_from_kv_store],
+                executor=executor))
+        assert {'a': {'c': 3, 'e': 5}, 'd': {'f': '6', 'kv': True}} == config
+
+    def test_conflict(self):
+        with raises(ConfigurationError) as e_info:
+            asyncio.run(load_configs([self.server.url('/base.json'),
+                self.server.url('/conflict.json')]))
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a')
+
+    def test_invalid_sources(self):
+        url = self.server.url('/list.json')
+        with raises(ConfigurationError) as e_info:
+            asyncio.run(load_configs([url]))
+        assert e_info.value.args[0] == LOAD_ERR_MSG_INVALID_CONFIG.format(url)
+
+        with raises(ConfigurationError) as e_info:
+            asyncio.run(load_configs([1]))
+        assert e_info.value.args[0] == LOAD_ERR_MSG_INVALID_SOURCE.format(1)
+
+    def test_first_error_raised(self):
+        # the first failing source, in order, not the first to fail
+        with raises(ValueError) as e_info:
+            asyncio.run(load_configs([self.server.url('/base.json'),
+                self.server.url('/invalid.json'),
+                self.server.url('/missing.json')]))
+        assert isinstance(e_info.value, json.JSONDecodeError)
+
+        with raises(urllib.error.HTTPError):
+            asyncio.run(load_configs([self.server.url('/missing.json'),
+                self.server.url('/invalid.json')]))
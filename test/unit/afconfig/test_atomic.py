@@ -0,0 +1,101 @@
+"""Unit tests for afconfig.atomic"""
+
+__author__ = "Joel Dubowy"
+
+import threading
+
+from py.test import raises
+
+from afconfig import ConfigurationError, MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+from afconfig.atomic import AtomicConfig
+from afconfig.persistent import FrozenConfigDict
+
+
+class TestAtomicConfig(object):
+
+    def test_basic(self):
+        atomic = AtomicConfig({'a': {'b': 1}, 'c': 2})
+        config = atomic.snapshot()
+        assert isinstance(config, FrozenConfigDict)
+        assert 0 == atomic.version
+        assert 1 == atomic.get_value('a', 'b')
+        assert None == atomic.get_value('a', 'z')
+
+        new_config = atomic.merge({'a': {'d': 3}})
+        assert new_config is atomic.snapshot()
+        assert {'a': {'b': 1, 'd': 3}, 'c': 2} == atomic.snapshot()
+        assert 1 == atomic.version
+        # the old snapshot is unchanged
+        assert {'a': {'b': 1}, 'c': 2} == config
+
+        atomic.set_value(4, 'a', 'b')
+        assert 4 == atomic.get_value('a', 'b')
+        assert 2 == atomic.version
+
+        atomic.publish({'e': 5})
+        assert {'e': 5} == atomic.snapshot()
+        assert 3 == atomic.version
+
+        # no version bump when nothing changes
+        atomic.merge({'e': 5})
+        assert 3 == atomic.version
+
+    def test_default(self):
+        assert {} == AtomicConfig().snapshot()
+
+    def test_errors(self):
+        atomic = AtomicConfig({'a': {'b': 1}})
+        config = atomic.snapshot()
+        with raises(ConfigurationError) as e_info:
+            atomic.merge({'a': 1})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a')
+        with raises(ConfigurationError):
+            atomic.publish(1)
+        with raises(ConfigurationError):
+            atomic.update(lambda c: None)
+        assert config is atomic.snapshot()
+        assert 0 == atomic.version
+
+    def test_compare_and_set(self):
+        atomic = AtomicConfig({'a': 1})
+        config = atomic.snapshot()
+        assert atomic.compare_and_set(config, {'a': 2})
+        assert not atomic.compare_and_set(config, {'a': 3})
+        assert {'a': 2} == atomic.snapshot()
+
+    def test_concurrent_readers_and_writers(self):
+        # Writers keep 'a' and 'b' in sync; readers must never see a
+        # config in which they differ, and no increments may be lost
+        atomic = AtomicConfig({'a': {'n': 0}, 'b': {'n': 0}})
+        num_writers, num_increments = 4, 200
+        done = threading.Event()
+        errors = []
+
+        def increment(config):
+            n = config['a']['n'] + 1
+            return config.merge({'a': {'n': n}, 'b': {'n': n}})
+
+        def write():
+            for i in range(num_increments):
+                atomic.update(increment)
+
+        def read():
+            while not done.is_set():
+                config = atomic.snapshot()
+                if config['a']['n'] != config['b']['n']:
+                    errors.append(dict(config))
+
+        readers = [threading.Thread(target=read) for i in range(4)]
+        writers = [threading.Thread(target=write) for i in range(num_writers)]
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        done.set()
+        for t in readers:
+            t.join()
+
+        assert [] == errors
+        expected = num_writers * num_increments
+        assert {'a': {'n': expected}, 'b': {'n': expected}} == atomic.snapshot()
+        assert expected == atomic.version
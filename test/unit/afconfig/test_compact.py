@@ -0,0 +1,114 @@
+"""Unit tests for afconfig.compact"""
+
+__author__ = "Joel Dubowy"
+
+import pickle
+
+from py.test import raises
+
+from afconfig import get_config_value, get_config_values, merge_configs_many
+from afconfig.compact import compact_config, CompactConfigDict
+from afconfig.persistent import FrozenConfigDict
+
+
+CONFIG = {
+    'fuelbeds': {
+        '1': {'ecoregion': 'western', 'factors': [1.5, 2], 'pm25': 1},
+        '2': {'ecoregion': 'western', 'factors': [1.5, 2], 'pm25': 1},
+        '3': {'ecoregion': 'southern', 'factors': [1.5, 2], 'pm25': 1.0},
+        '4': {'ecoregion': 'western', 'factors': [1.5, 2], 'pm25': True},
+        '5': {'pm25': 1, 'ecoregion': 'western', 'factors': [1.5, 2]}
+    },
+    'x': None,
+    'y': {'s': {1, 2}}
+}
+
+class TestCompactConfig(object):
+
+    def setup_method(self):
+        self.config = compact_config(CONFIG)
+
+    def test_read_access(self):
+        config = self.config
+        assert isinstance(config, CompactConfigDict)
+        assert CONFIG == config
+        assert config == CONFIG
+        assert 'western' == config['fuelbeds']['1']['ecoregion']
+        assert (1.5, 2) == config['fuelbeds']['1']['factors']
+        assert ['fuelbeds', 'x', 'y'] == list(config)
+        assert 3 == len(config)
+        assert 'x' in config and 'z' not in config and [] not in config
+        assert None is config.get('z')
+        with raises(KeyError):
+            config['z']
+        with raises(KeyError):
+            config[[]]
+
+        assert 'western' == get_config_value(config, 'fuelbeds', '1', 'ecoregion')
+        assert 'western' == config.get_value('fuelbeds', '1', 'ecoregion')
+        assert 3 == config.get_value('fuelbeds', '1', 'z', default=3)
+        assert ['southern', None] == get_config_values(config,
+            [('fuelbeds', '3', 'ecoregion'), ('x', 'z')])
+
+    def test_views(self):
+        config = self.config['fuelbeds']['1']
+        items = config.items()
+        assert list(items) == list(items)
+        assert len(CONFIG['fuelbeds']['1']) == len(items) == len(
+            config.keys()) == len(config.values())
+        assert config.keys() == set(CONFIG['fuelbeds']['1'])
+        assert ('ecoregion', 'western') in items
+        assert 'western' in config.values()
+
+    def test_thaw(self):
+        assert CONFIG == self.config.thaw()
+        assert isinstance(self.config.thaw()['fuelbeds']['1'], dict)
+        assert CONFIG == merge_configs_many({}, self.config.thaw())
+        assert FrozenConfigDict(CONFIG) == FrozenConfigDict(self.config)
+
+    def test_sharing(self):
+        fuelbeds = self.config['fuelbeds']
+        assert fuelbeds['1'] is fuelbeds['2']
+        # same shape, different values
+        assert fuelbeds['3'] is not fuelbeds['1']
+        assert fuelbeds['3']._shape is fuelbeds['1']._shape
+        assert fuelbeds['3']['factors'] is fuelbeds['1']['factors']
+        # values of different types aren't conflated
+        assert fuelbeds['4'] is not fuelbeds['1']
+        assert fuelbeds['4']['pm25'] is True
+        assert isinstance(fuelbeds['3']['pm25'], float)
+        # different key order, so different shape
+        assert fuelbeds['5']._shape is not fuelbeds['1']._shape
+        assert fuelbeds['5'] == fuelbeds['1']
+        assert hash(fuelbeds['5']) == hash(fuelbeds['1'])
+
+        # keys and values equal to ones of other types aren't conflated
+        a, b = compact_config([{1: 'a'}, {True: 'a'}])
+        assert [1] == list(a) and type(list(a)[0]) is int
+        assert [True] == list(b) and list(b)[0] is True
+        c = compact_config({'a': [0.0], 'b': [-0.0], 'c': {-0.0: 1}, 'd': {0.0: 1}})
+        assert '0.0' == repr(c['a'][0])
+        assert '-0.0' == repr(c['b'][0])
+        assert '-0.0' == repr(list(c['c'])[0])
+        assert '0.0' == repr(list(c['d'])[0])
+
+        not_shared = compact_config(CONFIG, share_subtrees=False)
+        assert not_shared['fuelbeds']['1'] is not not_shared['fuelbeds']['2']
+        assert CONFIG == not_shared
+
+    def test_immutable(self):
+        for f in (lambda c: c.__setitem__('x', 1), lambda c: c.__delitem__('x'),
+                lambda c: c.clear(), lambda c: c.update({}),
+                lambda c: c.setdefault('x', 1), lambda c: c.pop('x'),
+                lambda c: c.popitem()):
+            with raises(TypeError) as e_info:
+                f(self.config)
+            assert e_info.value.args[0] == 'object is immutable'
+        with raises(AttributeError):
+            self.config.foo = 1
+
+    def test_pickle(self):
+        config = pickle.loads(pickle.dumps(self.config))
+        assert isinstance(config, CompactConfigDict)
+        assert CONFIG == config
+        assert config['fuelbeds']['1'] is config['fuelbeds']['2']
@@ -0,0 +1,109 @@
+"""Unit tests for afconfig.diff"""
+
+__author__ = "Joel Dubowy"
+
+import copy
+
+from py.test import raises
+
+from afconfig import ConfigurationError, SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+from afconfig.diff import (
+    diff_configs,
+    apply_patch,
+    PatchOp,
+    PATCH_ERR_MSG_INVALID_OP
+)
+from afconfig.fingerprint import config_fingerprint
+from afconfig.persistent import FrozenConfigDict
+
+
+A = {
+    'a': {'b': 1, 'c': {'d': 2, 'e': [1, 2]}},
+    'f': 3,
+    'g': 1,
+    'h': {'i': 1},
+    'j': None,
+    'k': [{'l': 1}]
+}
+B = {
+    'a': {'b': 1, 'c': {'d': 5, 'e': [1, 2]}},
+    'f': {'x': 1},
+    'g': True,
+    'j': {'y': 2},
+    'k': [{'l': 2}],
+    'm': 6
+}
+EXPECTED = [
+    PatchOp('set', ('a', 'c', 'd'), 5),
+    PatchOp('set', ('f',), {'x': 1}),
+    PatchOp('set', ('g',), True),
+    PatchOp('remove', ('h',)),
+    PatchOp('set', ('j',), {'y': 2}),
+    PatchOp('set', ('k',), [{'l': 2}]),
+    PatchOp('set', ('m',), 6)
+]
+
+class TestDiffConfigs(object):
+
+    def test_diff(self):
+        assert sorted(EXPECTED) == sorted(diff_configs(A, B))
+        assert [] == diff_configs(A, copy.deepcopy(A))
+        assert [] == diff_configs(A, A)
+        # lists and tuples with the same items are equal
+        assert [] == diff_configs({'a': [1, [2]]}, {'a': (1, (2,))})
+        assert [PatchOp('remove', ('a',))] == diff_configs({'a': 1}, {})
+
+    def test_frozen(self):
+        a = FrozenConfigDict(A)
+        b = FrozenConfigDict(B)
+        # values are as in b, i.e. frozen
+        expected = sorted((o.op, o.keys) for o in EXPECTED)
+        assert expected == sorted((o.op, o.keys) for o in diff_configs(a, b))
+        assert expected == sorted((o.op, o.keys) for o in diff_configs(A, b))
+
+        # shared subtrees aren't traversed
+        c = a.assoc_in(('a', 'c', 'd'), 6)
+        assert [PatchOp('set', ('a', 'c', 'd'), 6)] == diff_configs(a, c)
+
+        # nor are equal ones with cached fingerprints
+        d = FrozenConfigDict(A)
+        config_fingerprint(a)
+        config_fingerprint(d)
+        assert d['a'] is not a['a']
+        assert [] == diff_configs(a, d)
+
+    def test_invalid(self):
+        with raises(ConfigurationError) as e_info:
+            diff_configs({}, 1)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+class TestApplyPatch(object):
+
+    def test_round_trip(self):
+        config = copy.deepcopy(A)
+        assert config is apply_patch(config, diff_configs(A, B))
+        assert B == config
+        # values are copied
+        config['k'][0]['l'] = 3
+        assert 2 == B['k'][0]['l']
+
+        frozen = FrozenConfigDict(A)
+        patched = apply_patch(frozen, diff_configs(A, B))
+        assert isinstance(patched, FrozenConfigDict)
+        assert FrozenConfigDict(B) == patched
+        assert FrozenConfigDict(A) == frozen
+
+    def test_set_config_value_semantics(self):
+        config = {'a': 1}
+        apply_patch(config, [('set', ('a', 'b'), 2), ('remove', ('x', 'y')),
+            ('remove', ('a', 'c'))])
+        assert {'a': {'b': 2}} == config
+
+    def test_invalid(self):
+        for op in [('add', ('a',), 1), ('set', ('a',)), ('remove', ())]:
+            with raises(ConfigurationError) as e_info:
+                apply_patch({}, [op])
+            assert e_info.value.args[0] == PATCH_ERR_MSG_INVALID_OP.format(op)
+        with raises(ConfigurationError) as e_info:
+            apply_patch([], [])
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
@@ -0,0 +1,117 @@
+"""Unit tests for afconfig.fingerprint"""
+
+__author__ = "Joel Dubowy"
+
+import copy
+
+from py.test import raises
+
+from afconfig.fingerprint import config_fingerprint, memoize_on_config
+from afconfig.persistent import FrozenConfigDict
+
+
+CONFIG = {
+    'a': {
+        'aa': 'sdf',
+        'ab': [1, 2.5, {'x': None}]
+    },
+    'b': {
+        'ba': 123,
+        'bb': True,
+        'cc': {
+            'ccc': b"SDF",
+            'ccd': {'x', 'y'}
+        }
+    },
+    'c': 12
+}
+
+class TestConfigFingerprint(object):
+
+    def test_equal_configs(self):
+        fp = config_fingerprint(CONFIG)
+        assert isinstance(fp, str)
+        assert 32 == len(fp)
+        assert fp == config_fingerprint(copy.deepcopy(CONFIG))
+        assert fp == config_fingerprint(FrozenConfigDict(CONFIG))
+        # key order doesn't matter
+        reordered = dict(reversed(list(CONFIG.items())))
+        assert fp == config_fingerprint(reordered)
+
+    def test_stable(self):
+        # must not change across processes or versions
+        assert 'bde63241ae8a1ee9444ef965739fa725' == config_fingerprint(
+            {'a': {'b': [1, 'c', None, 1.5]}})
+
+    def test_distinct_configs(self):
+        configs = [
+            {}, {'a': None}, {'a': 1}, {'a': '1'}, {'a': 1.0}, {'a': True},
+            {'a': b'1'}, {'a': [1]}, {'a': {1}}, {'a': {'b': 1}},
+            {1: 1}, {'a': ['1', '2']}, {'a': ['12']}, {'a': 1, 'b': 2}
+        ]
+        fingerprints = set(config_fingerprint(c) for c in configs)
+        assert len(configs) == len(fingerprints)
+
+    def test_caching_on_frozen_config(self):
+        config = FrozenConfigDict(CONFIG)
+        fp = config_fingerprint(config)
+        assert config._fingerprint is not None
+        assert config['b']['cc']._fingerprint is not None
+
+        changed = config.assoc_in(('a', 'aa'), 'foo')
+        assert changed['b'] is config['b']
+        assert changed._fingerprint is None
+        assert fp != config_fingerprint(changed)
+        expected = copy.deepcopy(CONFIG)
+        expected['a']['aa'] = 'foo'
+        assert config_fingerprint(expected) == config_fingerprint(changed)
+
+    def test_unsupported_value(self):
+        with raises(TypeError) as e_info:
+            config_fingerprint({'a': object()})
+
+
+class TestMemoizeOnConfig(object):
+
+    def test_memoize(self):
+        calls = []
+
+        @memoize_on_config(maxsize=2)
+        def f(config, a, b=1):
+            calls.append((config, a, b))
+            return config['c'] + a + b
+
+        assert 14 == f(CONFIG, 1)
+        assert 14 == f(copy.deepcopy(CONFIG), 1)
+        assert 14 == f(FrozenConfigDict(CONFIG), 1)
+        assert 1 == len(calls)
+        assert 15 == f(CONFIG, 1, b=2)
+        assert 2 == len(calls)
+        assert (2, 2, 2, 2) == f.cache_info()
+
+        # evicts least recently used
+        assert 14 == f(CONFIG, 1)
+        assert 20 == f({'c': 18}, 1)
+        assert 3 == len(calls)
+        assert 14 == f(CONFIG, 1)
+        assert 3 == len(calls)
+        assert 15 == f(CONFIG, 1, b=2)
+        assert 4 == len(calls)
+        assert (4, 4, 2, 2) == f.cache_info()
+
+        f.cache_clear()
+        assert (0, 0, 2, 0) == f.cache_info()
+        assert f.__name__ == 'f'
+
+    def test_no_args(self):
+        calls = []
+
+        @memoize_on_config
+        def f(config):
+            calls.append(config)
+            return len(config)
+
+        assert 3 == f(CONFIG)
+        assert 3 == f(copy.deepcopy(CONFIG))
+        assert 1 == len(calls)
+        assert 128 == f.cache_info().maxsize
@@ -0,0 +1,74 @@
+"""Import-time regression tests for afconfig
+
+These run `python -X importtime -c "import afconfig"` in a subprocess,
+and check which modules importing afconfig pulls in, and how long it
+takes.
+"""
+
+__author__ = "Joel Dubowy"
+
+import os
+import subprocess
+import sys
+
+import afconfig
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+
+# Modules that only the lazily loaded parts of afconfig need
+LAZY_MODULES = {'argparse', 'configparser', 'json', 're', 'afconfig.parsers',
+    'afconfig.overrides'}
+
+# Generous, to avoid spurious failures on slow machines; it takes
+# a few ms
+MAX_IMPORT_TIME_US = 50000
+
+def import_times(statement):
+    """Returns dict mapping each module imported by statement, in a
+    fresh interpreter, to its cumulative import time, in microseconds
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+        statement], env=env, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True).stderr
+
+    # Each line is "import time: <self> | <cumulative> | <indented name>",
+    # with modules listed after the modules they import; so the modules
+    # imported by statement are the ones after the last one imported
+    # at startup
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line.split('|')
+        name = fields[2].strip()
+        if name == 'site':
+            times = {}
+            continue
+        try:
+            times[name] = int(fields[1])
+        except ValueError:
+            # header line
+            pass
+    return times
+
+class TestImportTime(object):
+
+    def test_import_afconfig(self):
+        times = import_times('import afconfig')
+        assert 'afconfig' in times
+        assert not LAZY_MODULES & set(times)
+        assert times['afconfig'] < MAX_IMPORT_TIME_US
+
+    def test_lazy_exports(self):
+        times = import_times('import afconfig; afconfig.config_parser_to_dict')
+        assert 'afconfig.parsers' in times
+        assert 'afconfig.overrides' not in times
+
+        assert afconfig.config_parser_to_dict is \
+            afconfig.parsers.config_parser_to_dict
+        assert 'ConfigOverrides' in dir(afconfig)
+        from afconfig import ConfigOverrides
+        assert ConfigOverrides is afconfig.overrides.ConfigOverrides
@@ -0,0 +1,203 @@
+"""Unit tests for afconfig.layered"""
+
+__author__ = "Joel Dubowy"
+
+import copy
+import random
+
+from py.test import raises
+
+from afconfig import (
+    get_config_value,
+    merge_configs,
+    ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
+    SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+from afconfig.layered import LayeredConfig
+
+
+DEFAULTS = {
+    'a': {
+        'aa': 'sdf',
+        'ab': 343
+    },
+    'b': {
+        'ba': 123,
+        'cc': {
+            'ccc': "SDF"
+        }
+    },
+    'c': 12,
+    'd': None
+}
+
+OVERRIDES = {
+    'a': {
+        'ab': 1,
+        'ac': {'x': 2}
+    },
+    'd': {'da': 3},
+    'e': 'e'
+}
+
+MERGED = {
+    'a': {
+        'aa': 'sdf',
+        'ab': 1,
+        'ac': {'x': 2}
+    },
+    'b': {
+        'ba': 123,
+        'cc': {
+            'ccc': "SDF"
+        }
+    },
+    'c': 12,
+    'd': {'da': 3},
+    'e': 'e'
+}
+
+class TestLayeredConfig(object):
+
+    def setup_method(self):
+        self.defaults = copy.deepcopy(DEFAULTS)
+        self.overrides = copy.deepcopy(OVERRIDES)
+        self.config = LayeredConfig(self.defaults, self.overrides)
+
+    def _assert_layers_unchanged(self):
+        assert self.defaults == DEFAULTS
+        assert self.overrides == OVERRIDES
+
+    def test_invalid_layers(self):
+        with raises(ConfigurationError) as e_info:
+            LayeredConfig({}, 12)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+    def test_read(self):
+        assert MERGED == self.config.to_dict()
+        assert MERGED == self.config
+        assert list(MERGED) == list(self.config)
+        assert list(MERGED['a']) == list(self.config['a'])
+        assert 5 == len(self.config)
+        assert 1 == self.config['a']['ab']
+        assert isinstance(self.config['a'], LayeredConfig)
+        assert self.config['a'] is self.config['a']
+        assert 'e' in self.config
+        assert 'z' not in self.config
+        with raises(KeyError) as e_info:
+            self.config['z']
+        assert None == self.config.get('z')
+
+    def test_get_config_value(self):
+        assert 'SDF' == get_config_value(self.config, 'b', 'cc', 'ccc')
+        assert 3 == get_config_value(self.config, 'd', 'da')
+        assert 1 == get_config_value(self.config, 'a', 'zz', default=1)
+        assert 1 == self.config.get_value('a', 'ab')
+        with raises(KeyError) as e_info:
+            self.config.get_value('a', 'zz', fail_on_missing_key=True)
+        with raises(ConfigurationError) as e_info:
+            self.config.get_value('c', 'z', fail_on_invalid_config=True)
+
+    def test_conflicts(self):
+        config = LayeredConfig({'a': {'b': {'c': 1}}, 'x': 1},
+            {'a': {'b': 2}})
+        assert 1 == config['x']
+        with raises(ConfigurationError) as e_info:
+            config['a']['b']
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > b')
+
+        # Can't replace dict with None, but can replace None with dict
+        config = LayeredConfig({'a': {'b': 1}}, {'a': None})
+        with raises(ConfigurationError) as e_info:
+            config['a']
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a')
+        assert {'a': {'b': 1}} == LayeredConfig({'a': None}, {'a': {'b': 1}})
+
+    def test_write(self):
+        self.config['a']['ab'] = 5
+        self.config['b']['cc'] = 6
+        self.config['f'] = {'g': 7}
+        self.config['f']['h'] = 8
+        del self.config['c']
+        del self.config['a']['aa']
+        with raises(KeyError) as e_info:
+            del self.config['z']
+        expected = copy.deepcopy(MERGED)
+        expected['a']['ab'] = 5
+        expected['b']['cc'] = 6
+        expected['f'] = {'g': 7, 'h': 8}
+        del expected['c']
+        del expected['a']['aa']
+        assert expected == self.config.to_dict()
+        self._assert_layers_unchanged()
+
+        # re-set deleted key
+        self.config['c'] = 13
+        assert 13 == self.config['c']
+
+    def test_set_value(self):
+        self.config.set_value(1, 'b', 'cc', 'ccc')
+        self.config.set_value(2, 'c', 'd', 'e')
+        self.config.set_value(3, 'x', 'y')
+        assert 1 == self.config.get_value('b', 'cc', 'ccc')
+        assert {'d': {'e': 2}} == self.config['c']
+        assert {'y': 3} == self.config['x']
+        self._assert_layers_unchanged()
+        with raises(ConfigurationError) as e_info:
+            self.config.set_value(3)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS
+
+    def test_merge(self):
+        assert self.config is self.config.merge(
+            {'a': {'ac': {'y': 1}}, 'f': {'g': 1}})
+        assert self.config is self.config.merge({'f': {'h': 2}, 'c': 5})
+        expected = copy.deepcopy(MERGED)
+        expected['a']['ac']['y'] = 1
+        expected['f'] = {'g': 1, 'h': 2}
+        expected['c'] = 5
+        assert expected == self.config.to_dict()
+        self._assert_layers_unchanged()
+
+        with raises(ConfigurationError) as e_info:
+            self.config.merge({'a': {'ac': 1}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('a > ac')
+        with raises(ConfigurationError) as e_info:
+            self.config.merge({'f': {'g': {}}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('f > g')
+        with raises(ConfigurationError) as e_info:
+            self.config.merge(1)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+    def _random_config(self, rand, depth=3):
+        config = {}
+        for i in range(rand.randint(0, 4)):
+            r = rand.random()
+            if depth > 0 and r < 0.4:
+                v = self._random_config(rand, depth - 1)
+            elif r < 0.5:
+                v = None
+            else:
+                v = rand.randint(0, 3)
+            config[rand.choice('abcdef')] = v
+        return config
+
+    def test_matches_merge_configs(self):
+        rand = random.Random(4321)
+        for i in range(1000):
+            layers = [self._random_config(rand)
+                for j in range(rand.randint(1, 5))]
+            try:
+                expected = copy.deepcopy(layers[0])
+                for layer in layers[1:]:
+                    merge_configs(expected, copy.deepcopy(layer))
+            except ConfigurationError:
+                expected = ConfigurationError
+
+            try:
+                actual = LayeredConfig(*layers).to_dict()
+                # key order too
+                assert repr(expected) == repr(actual)
+            except ConfigurationError:
+                assert expected is ConfigurationError
@@ -0,0 +1,160 @@
+"""Unit tests for afconfig.loaders"""
+
+__author__ = "Joel Dubowy"
+
+import json
+
+from py.test import raises
+
+from afconfig import ConfigurationError
+from afconfig.loaders import load_json, load_ini
+
+
+CONFIG = {
+    "fuelbeds": {
+        "1": {"consumption": {"ecoregion": "western", "f": [1.5, -2e3]},
+            "emissions": {"pm25": 1}},
+        "2": {"consumption": {"ecoregion": "southern", "s": "a \"}\" b"},
+            "emissions": {"pm25": 2}}
+    },
+    "other": [{"a": 1}, "]", None, True, False],
+    "x": {"y": {"z": 1}, "w": 2},
+    "é": {"k": "é"}
+}
+
+class TestLoadJson(object):
+
+    def _write(self, tmp_path, content):
+        filename = str(tmp_path / 'config.json')
+        with open(filename, 'w') as f:
+            f.write(content)
+        return filename
+
+    def test_no_prefixes(self, tmp_path):
+        filename = self._write(tmp_path, json.dumps(CONFIG, indent=2))
+        assert CONFIG == load_json(filename)
+        assert CONFIG == load_json(filename, [()])
+
+    def test_prefixes(self, tmp_path):
+        for indent in (None, 2):
+            filename = self._write(tmp_path, json.dumps(CONFIG, indent=indent))
+            assert {} == load_json(filename, [])
+            assert {
+                "fuelbeds": {
+                    "1": {"consumption": CONFIG["fuelbeds"]["1"]["consumption"]},
+                    "2": {"consumption": {"s": "a \"}\" b"}}
+                },
+                "x": {"y": {"z": 1}},
+                "é": {"k": "é"}
+            } == load_json(filename, [
+                ("fuelbeds", "1", "consumption"),
+                ("fuelbeds", "2", "consumption", "s"),
+                ("x", "y"),
+                ("x", "y", "z"),
+                ("é",),
+                # missing and non-object key paths are ignored
+                ("fuelbeds", "3"),
+                ("other", "a"),
+                ("x", "w", "v")
+            ])
+
+    def test_invalid(self, tmp_path):
+        for content in ('', '[1]', '{"a": 1', '{"a": [1}', '{"a": 1} 1',
+                '{"a" 1}', '{"a": tru}', '{a: 1}'):
+            filename = self._write(tmp_path, content)
+            with raises(ConfigurationError) as e_info:
+                load_json(filename, [('b',)])
+
+    def test_truncated_fails_fast(self, tmp_path):
+        import time
+        # Skipping an unterminated array used to backtrack exponentially
+        # (47 bytes took ~35s)
+        for n in (1, 10, 10000):
+            filename = self._write(tmp_path,
+                '{"a": 1, "skip": [' + '1, 2, 3, "x[", {"b": 4}, ' * n)
+            t = time.perf_counter()
+            with raises(ConfigurationError) as e_info:
+                load_json(filename, [('a',)])
+            assert time.perf_counter() - t < 1
+
+    def test_duplicate_keys(self, tmp_path):
+        # Later duplicates replace earlier ones, as with json.load
+        for content in (
+                '{"a": {"b": 1}, "a": {"c": 2}}',
+                '{"a": {"b": 1}, "a": 2}',
+                '{"a": {"b": 1}, "a": {"b": 3, "c": 2}}',
+                '{"a": 2, "a": {"b": 1}}'):
+            filename = self._write(tmp_path, content)
+            expected = json.loads(content)
+            for prefixes in ([('a',)], [('a', 'b')], [('a', 'c')]):
+                assert load_json_expected(expected, prefixes) == load_json(
+                    filename, prefixes)
+
+
+def load_json_expected(config, prefixes):
+    # What loading the whole file and keeping the values under prefixes
+    # (and the dicts enclosing them) gives
+    result = {}
+    for keys in prefixes:
+        value = config
+        for k in keys:
+            if not isinstance(value, dict) or k not in value:
+                break
+            value = value[k]
+        else:
+            d = result
+            for k in keys[:-1]:
+                d = d.setdefault(k, {})
+            d[keys[-1]] = value
+    return result
+
+
+INI = """
+[DEFAULT]
+root = /data
+
+[a]
+aa = sdf
+ab = %(root)s/a
+ac = multi
+  line
+
+[b]
+ba = 123
+
+[c]
+ca = 1
+"""
+
+class TestLoadIni(object):
+
+    def _write(self, tmp_path):
+        filename = str(tmp_path / 'config.ini')
+        with open(filename, 'w') as f:
+            f.write(INI)
+        return filename
+
+    def test_no_prefixes(self, tmp_path):
+        filename = self._write(tmp_path)
+        expected = {
+            'a': {'root': '/data', 'aa': 'sdf', 'ab': '/data/a',
+                'ac': 'multi\nline'},
+            'b': {'root': '/data', 'ba': '123'},
+            'c': {'root': '/data', 'ca': '1'}
+        }
+        assert expected == load_ini(filename)
+        assert expected == load_ini(filename, [()])
+
+    def test_prefixes(self, tmp_path):
+        filename = self._write(tmp_path)
+        assert {} == load_ini(filename, [])
+        assert {
+            'a': {'ab': '/data/a', 'ac': 'multi\nline'},
+            'b': {'root': '/data', 'ba': '123'}
+        } == load_ini(filename, [('a', 'ab'), ('a', 'ac'), ('b',), ('z',),
+            ('c', 'zz')])
+
+    def test_raw(self, tmp_path):
+        filename = self._write(tmp_path)
+        assert {'a': {'ab': '%(root)s/a'}} == load_ini(filename,
+            [('a', 'ab')], raw=True)
@@ -0,0 +1,101 @@
+"""Unit tests for afconfig.overrides"""
+
+__author__ = "Joel Dubowy"
+
+import argparse
+
+from py.test import raises
+
+from afconfig import ConfigurationError, MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+from afconfig.overrides import (
+    ConfigOverrides,
+    OVERRIDES_ERR_MSG_NO_ENV_PREFIX,
+    OVERRIDES_ERR_MSG_INVALID_OPTION,
+    OVERRIDES_ERR_MSG_UNKNOWN_OPTION
+)
+
+
+ENVIRON = {
+    'PATH': '/usr/bin',
+    'BLUESKY__EMISSIONS__SPECIES': '["PM2.5", "CO"]',
+    'BLUESKY__CONSUMPTION__ECOREGION': 'western',
+    'BLUESKY__CONSUMPTION__FACTOR': '1.5',
+    'BLUESKY__CONSUMPTION__ENABLED': 'true',
+    'BLUESKYX__A': '1'
+}
+
+class TestConfigOverrides(object):
+
+    def setup_method(self):
+        self.config = {
+            'emissions': {'species': ['PM2.5'], 'model': 'feps'},
+            'consumption': {'ecoregion': 'southern'}
+        }
+        self.expected = {
+            'emissions': {'species': ['PM2.5', 'CO'], 'model': 'feps'},
+            'consumption': {'ecoregion': 'western', 'factor': 1.5,
+                'enabled': True}
+        }
+
+    def test_env(self):
+        overrides = ConfigOverrides('BLUESKY__')
+        assert self.expected == overrides.apply(self.config, environ=ENVIRON)
+        # cached key paths and values are reused
+        assert self.expected == overrides.apply(self.config, environ=ENVIRON)
+
+    def test_env_with_paths(self):
+        overrides = ConfigOverrides('BLUESKY__', paths=[
+            ('emissions', 'species'), ('consumption', 'ecoregion'),
+            ('consumption', 'factor'), ('consumption', 'enabled'),
+            ('emissions', 'model')])
+        assert self.expected == overrides.apply(self.config, environ=ENVIRON)
+        # fewer environment variables than paths
+        assert {'consumption': {'factor': 2}} == overrides.collect(
+            environ={'BLUESKY__CONSUMPTION__FACTOR': '2'})
+
+    def test_options(self):
+        overrides = ConfigOverrides('BLUESKY__')
+        config = overrides.apply(self.config, environ=ENVIRON, options=[
+            'consumption.factor=2', 'emissions.model = fepsv2',
+            'a.b={"c": 1}', 'a.d=x=y', ' a.e =  z '])
+        # options take precedence over env vars
+        assert 2 == config['consumption']['factor']
+        assert 'fepsv2' == config['emissions']['model']
+        assert {'b': {'c': 1}, 'd': 'x=y', 'e': 'z'} == config['a']
+
+    def test_unparsed_values(self):
+        overrides = ConfigOverrides('BLUESKY__', parse_values=False)
+        assert {'consumption': {'factor': '1'}} == overrides.collect(
+            environ={}, options=['consumption.factor=1'])
+
+    def test_argparse(self):
+        overrides = ConfigOverrides('BLUESKY__')
+        parser = argparse.ArgumentParser()
+        overrides.add_argument(parser)
+        args = parser.parse_args(['-C', 'a.b=1', '--config-option', 'a.c=2'])
+        assert {'a': {'b': 1, 'c': 2}} == overrides.collect(environ={},
+            options=args.config_options)
+        assert [] == parser.parse_args([]).config_options
+
+    def test_errors(self):
+        with raises(ConfigurationError) as e_info:
+            ConfigOverrides('')
+        assert e_info.value.args[0] == OVERRIDES_ERR_MSG_NO_ENV_PREFIX
+
+        overrides = ConfigOverrides('BLUESKY__')
+        for option in ('a.b', '=1', 'a..b=1'):
+            with raises(ConfigurationError) as e_info:
+                overrides.collect(environ={}, options=[option])
+            assert e_info.value.args[0] == \
+                OVERRIDES_ERR_MSG_INVALID_OPTION.format(option)
+
+        with raises(ConfigurationError) as e_info:
+            ConfigOverrides('BLUESKY__', paths=[('a', 'b')]).collect(
+                environ={}, options=['a.c=1'])
+        assert e_info.value.args[0] == \
+            OVERRIDES_ERR_MSG_UNKNOWN_OPTION.format('a.c')
+
+        with raises(ConfigurationError) as e_info:
+            overrides.apply(self.config, environ={}, options=['emissions=1'])
+        assert e_info.value.args[0] == \
+            MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('emissions')
@@ -0,0 +1,142 @@
+"""Unit tests for afconfig.persistent"""
+
+__author__ = "Joel Dubowy"
+
+import copy
+import pickle
+
+from py.test import raises
+
+from afconfig import (
+    get_config_value,
+    ImmutableConfigDict,
+    ConfigurationError,
+    SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG,
+    SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+from afconfig.persistent import FrozenConfigDict
+
+
+CONFIG = {
+    'a': {
+        'aa': 'sdf',
+        'ab': [1, 2, {'x': 1}]
+    },
+    'b': {
+        'ba': 123,
+        'cc': {
+            'ccc': "SDF"
+        }
+    },
+    'c': 12,
+    'd': None
+}
+
+class TestFrozenConfigDict(object):
+
+    def setup_method(self):
+        self.config = FrozenConfigDict(CONFIG)
+
+    def test_deeply_frozen(self):
+        assert isinstance(self.config, ImmutableConfigDict)
+        assert isinstance(self.config['b']['cc'], FrozenConfigDict)
+        assert (1, 2, {'x': 1}) == self.config['a']['ab']
+        assert isinstance(self.config['a']['ab'][2], FrozenConfigDict)
+        for d in (self.config, self.config['b'], self.config['b']['cc']):
+            with raises(TypeError) as e_info:
+                d['z'] = 1
+            with raises(TypeError) as e_info:
+                d.update(z=1)
+            with raises(TypeError) as e_info:
+                d |= {'z': [1]}
+
+    def test_ior_keeps_hash_and_contents(self):
+        d = FrozenConfigDict({'a': 1})
+        h = hash(d)
+        with raises(TypeError):
+            d |= {'b': [1]}
+        assert {'a': 1} == d
+        assert h == hash(d)
+
+    def test_construction_shares_frozen(self):
+        config = FrozenConfigDict(b=self.config['b'], e={'f': 1})
+        assert config['b'] is self.config['b']
+        assert {'f': 1} == config['e']
+
+    def test_get_value(self):
+        assert 'SDF' == get_config_value(self.config, 'b', 'cc', 'ccc')
+        assert 'SDF' == self.config.get_value('b', 'cc', 'ccc')
+        assert 1 == self.config.get_value('b', 'zz', default=1)
+
+    def test_hash_and_equality(self):
+        other = FrozenConfigDict(copy.deepcopy(CONFIG))
+        assert other is not self.config
+        assert other == self.config
+        assert hash(other) == hash(self.config)
+        assert 1 == len({self.config, other})
+        changed = self.config.assoc_in(('b', 'cc', 'ccc'), 'x')
+        assert changed != self.config
+        assert not (changed == self.config)
+        assert 2 == len({self.config, changed})
+
+    def test_assoc_in(self):
+        config = self.config.assoc_in(('b', 'cc', 'ccc'), 'x')
+        assert 'x' == config['b']['cc']['ccc']
+        assert 'SDF' == self.config['b']['cc']['ccc']
+        # untouched subtrees are shared
+        assert config['a'] is self.config['a']
+        assert config['b'] is not self.config['b']
+
+        config = self.config.assoc_in(('c', 'd', 'e'), {'f': [1]})
+        assert {'d': {'e': {'f': (1,)}}} == config['c']
+        assert isinstance(config['c']['d']['e'], FrozenConfigDict)
+        assert 12 == self.config['c']
+
+        assert self.config is self.config.assoc_in(('a', 'ab'),
+            self.config['a']['ab'])
+
+        with raises(ConfigurationError) as e_info:
+            self.config.assoc_in((), 1)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_MISSING_KEYS
+
+    def test_dissoc_in(self):
+        config = self.config.dissoc_in(('b', 'cc', 'ccc'))
+        assert {} == config['b']['cc']
+        assert 'SDF' == self.config['b']['cc']['ccc']
+        assert config['a'] is self.config['a']
+        assert self.config is self.config.dissoc_in(('b', 'zz'))
+        assert self.config is self.config.dissoc_in(('c', 'zz'))
+
+    def test_merge(self):
+        config = self.config.merge({'a': {'aa': 'foo'}, 'd': {'da': [1]},
+            'e': 1})
+        assert 'foo' == config['a']['aa']
+        assert {'da': (1,)} == config['d']
+        assert 1 == config['e']
+        assert 'sdf' == self.config['a']['aa']
+        assert config['b'] is self.config['b']
+        assert config['a']['ab'] is self.config['a']['ab']
+        assert self.config is self.config.merge({'b': {'cc': {}}})
+
+        with raises(ConfigurationError) as e_info:
+            self.config.merge({'b': {'cc': 1}})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('b > cc')
+        with raises(ConfigurationError) as e_info:
+            self.config.merge(1)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+    def test_thaw(self):
+        d = self.config.thaw()
+        assert type(d) is dict
+        assert type(d['b']['cc']) is dict
+        assert d == self.config
+        d['b']['cc']['ccc'] = 1
+        assert 'SDF' == self.config['b']['cc']['ccc']
+
+    def test_copy_and_pickle(self):
+        assert self.config is copy.copy(self.config)
+        assert self.config is copy.deepcopy(self.config)
+        config = pickle.loads(pickle.dumps(self.config))
+        assert config == self.config
+        assert isinstance(config['b']['cc'], FrozenConfigDict)
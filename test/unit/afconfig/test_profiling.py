@@ -0,0 +1,118 @@
+"""Unit tests for afconfig.profiling"""
+
+__author__ = "Joel Dubowy"
+
+import json
+
+from py.test import raises
+
+import afconfig
+from afconfig import (
+    get_config_value,
+    ConfigDict,
+    ConfigurationError,
+    GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+)
+from afconfig.persistent import FrozenConfigDict
+from afconfig.profiling import ConfigAccessProfile
+
+
+CONFIG = {'a': {'b': 1, 'c': None}, 'd': 2}
+
+def stats_by_keys(profile):
+    return {tuple(s['keys']): s for s in profile.to_list()}
+
+class TestConfigAccessProfile(object):
+
+    def test_disabled(self):
+        profile = ConfigAccessProfile()
+        assert 1 == get_config_value(CONFIG, 'a', 'b')
+        assert [] == profile.to_list()
+        assert afconfig._access_profile is None
+
+    def test_get_config_value(self):
+        with ConfigAccessProfile() as profile:
+            assert profile.enabled
+            assert 1 == get_config_value(CONFIG, 'a', 'b')
+            assert 1 == get_config_value(CONFIG, 'a', 'b')
+            assert 3 == get_config_value(CONFIG, 'a', 'x', default=3)
+            assert None is get_config_value(CONFIG, 'a', 'c', 'e')
+            with raises(KeyError):
+                get_config_value(CONFIG, 'x', fail_on_missing_key=True)
+            with raises(ConfigurationError) as e_info:
+                get_config_value(CONFIG, 'd', 'e', fail_on_invalid_config=True)
+            assert e_info.value.args[0] == afconfig.GET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+            with raises(ConfigurationError) as e_info:
+                get_config_value(CONFIG)
+            assert e_info.value.args[0] == GET_CONFIG_VALUE_ERR_MSG_NO_KEYS
+        assert not profile.enabled
+
+        stats = stats_by_keys(profile)
+        assert [('a', 'b'), ('a', 'c', 'e'), ('a', 'x'), ('d', 'e'), ('x',)] == \
+            sorted(stats)
+        assert (2, 0) == (stats[('a', 'b')]['hits'], stats[('a', 'b')]['misses'])
+        for keys in [('a', 'x'), ('a', 'c', 'e'), ('x',), ('d', 'e')]:
+            assert (0, 1) == (stats[keys]['hits'], stats[keys]['misses'])
+        assert stats[('a', 'b')]['seconds'] > 0
+        assert 'callers' not in stats[('a', 'b')]
+
+        # not recording once disabled
+        get_config_value(CONFIG, 'a', 'b')
+        assert 2 == stats_by_keys(profile)[('a', 'b')]['hits']
+
+        profile.reset()
+        assert [] == profile.to_list()
+
+    def test_config_dicts(self):
+        config_dict = ConfigDict(CONFIG)
+        frozen = FrozenConfigDict(CONFIG)
+        with ConfigAccessProfile() as profile:
+            assert 1 == config_dict.get_value('a', 'b')
+            assert 4 == config_dict.get_value('a', 'y', default=4)
+            assert 1 == frozen.get_value('a', 'b')
+        stats = stats_by_keys(profile)
+        assert 2 == stats[('a', 'b')]['hits']
+        assert 1 == stats[('a', 'y')]['misses']
+
+    def test_callers_and_callback(self):
+        calls = []
+        profile = ConfigAccessProfile(callers=True,
+            callback=lambda *args: calls.append(args[:2]))
+        with profile:
+            get_config_value(CONFIG, 'd')
+            ConfigDict(CONFIG).get_value('d')
+        assert [(('d',), True), (('d',), True)] == calls
+
+        callers = stats_by_keys(profile)[('d',)]['callers']
+        assert 2 == len(callers)
+        assert all(c.startswith(__file__ + ':') for c in callers)
+
+        exported = json.loads(profile.to_json())
+        assert [{'keys': ['d'], 'hits': 2, 'misses': 0, 'callers': callers,
+            'seconds': exported[0]['seconds']}] == exported
+
+    def test_callers_outside_afconfig(self):
+        # Lookups made through afconfig's own classes are attributed to
+        # the code calling them, not to afconfig's internals
+        from afconfig.atomic import AtomicConfig
+        from afconfig.layered import LayeredConfig
+        profile = ConfigAccessProfile(callers=True)
+        frozen = FrozenConfigDict(CONFIG)
+        with profile:
+            frozen.get_value('d')
+            AtomicConfig(CONFIG).get_value('d')
+            LayeredConfig(CONFIG).get_value('d')
+            ConfigDict(CONFIG).get_value('d')
+        callers = stats_by_keys(profile)[('d',)]['callers']
+        assert 4 == len(callers)
+        assert all(c.startswith(__file__ + ':') for c in callers)
+
+    def test_one_enabled_at_a_time(self):
+        a = ConfigAccessProfile().enable()
+        b = ConfigAccessProfile().enable()
+        try:
+            assert b.enabled and not a.enabled
+            a.disable()
+            assert b.enabled
+        finally:
+            b.disable()
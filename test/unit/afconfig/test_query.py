@@ -0,0 +1,118 @@
+"""Unit tests for afconfig.query"""
+
+__author__ = "Joel Dubowy"
+
+import itertools
+import types
+
+from py.test import raises
+
+from afconfig import ConfigurationError, SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+from afconfig.compact import compact_config
+from afconfig.query import query_config, ConfigIndex, _path_matches
+
+
+CONFIG = {
+    'fuelbeds': {
+        '1': {'emission_factors': {'pm25': 1}, 'ecoregion': 'western'},
+        '2': {'emission_factors': {'pm25': 2}, 'ecoregion': 'southern'},
+        '3': {'ecoregion': 'boreal'}
+    },
+    'defaults': {'emission_factors': {'pm25': 0}},
+    'a': {'a': {'a': 1}},
+    'x': 1
+}
+
+PATTERNS = [
+    (),
+    ('x',),
+    ('fuelbeds', '*', 'emission_factors'),
+    ('fuelbeds', '*', 'ecoregion'),
+    ('**', 'emission_factors'),
+    ('**', 'emission_factors', '*'),
+    ('**', 'pm25'),
+    ('fuelbeds', '**'),
+    ('**',),
+    ('*',),
+    ('*', '*', '*'),
+    ('**', 'a', '**'),
+    ('**', 'a', '**', 'a'),
+    ('**', '**', 'a'),
+    ('a', '**', 'a', 'a'),
+    ('x', '*'),
+    ('x', '**'),
+    ('missing', '**'),
+    ('**', 'missing'),
+    ('**', [])
+]
+
+class TestQueryConfig(object):
+
+    def test_query(self):
+        matches = query_config(CONFIG, 'fuelbeds', '*', 'emission_factors')
+        assert isinstance(matches, types.GeneratorType)
+        assert [
+            (('fuelbeds', '1', 'emission_factors'), {'pm25': 1}),
+            (('fuelbeds', '2', 'emission_factors'), {'pm25': 2})
+        ] == list(matches)
+
+        assert [
+            (('fuelbeds', '1', 'emission_factors', 'pm25'), 1),
+            (('fuelbeds', '2', 'emission_factors', 'pm25'), 2),
+            (('defaults', 'emission_factors', 'pm25'), 0)
+        ] == list(query_config(CONFIG, '**', 'pm25'))
+
+        assert [((), CONFIG)] == list(query_config(CONFIG))
+        assert [(('x',), 1)] == list(query_config(CONFIG, 'x', '**'))
+        assert [] == list(query_config(CONFIG, 'x', '*'))
+
+    def test_double_wildcards(self):
+        assert [
+            (('a', 'a'), {'a': 1}),
+            (('a', 'a', 'a'), 1)
+        ] == list(query_config(CONFIG, '**', 'a', '**', 'a', '**'))
+        assert [(('a', 'a', 'a'), 1)] == list(query_config(CONFIG,
+            'a', '**', 'a', 'a'))
+
+    def test_matches_walk(self):
+        # Check against brute force matching of every key path
+        all_paths = list(query_config(CONFIG, '**'))
+        assert len(all_paths) == len(set(p for p, v in all_paths))
+        for pattern in PATTERNS:
+            expected = [(p, v) for p, v in all_paths if _path_matches(p, pattern)]
+            assert sorted(expected, key=repr) == sorted(
+                query_config(CONFIG, *pattern), key=repr), pattern
+
+    def test_mappings(self):
+        assert [(('fuelbeds', '3', 'ecoregion'), 'boreal')] == [
+            m for m in query_config(compact_config(CONFIG), '**', 'ecoregion')
+            if m[1] == 'boreal']
+
+    def test_invalid(self):
+        with raises(ConfigurationError) as e_info:
+            query_config([], '*')
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
+
+class TestConfigIndex(object):
+
+    def test_matches_query_config(self):
+        index = ConfigIndex(CONFIG)
+        for pattern in PATTERNS:
+            assert sorted(query_config(CONFIG, *pattern), key=repr) == sorted(
+                index.query(*pattern), key=repr), pattern
+
+    def test_count(self):
+        index = ConfigIndex(CONFIG)
+        assert 3 == index.count('emission_factors')
+        assert 0 == index.count('missing')
+
+    def test_lazy(self):
+        index = ConfigIndex(CONFIG)
+        matches = index.query('**', 'ecoregion')
+        assert [(('fuelbeds', '1', 'ecoregion'), 'western')] == list(
+            itertools.islice(matches, 1))
+
+    def test_invalid(self):
+        with raises(ConfigurationError) as e_info:
+            ConfigIndex(None)
+        assert e_info.value.args[0] == SET_CONFIG_VALUE_ERR_MSG_INVALID_CONFIG
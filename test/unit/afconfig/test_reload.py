@@ -0,0 +1,200 @@
+"""Unit tests for afconfig.reload"""
+
+__author__ = "Joel Dubowy"
+
+import json
+import os
+import threading
+
+from py.test import raises
+
+from afconfig import (
+    merge_configs_many,
+    ConfigurationError,
+    MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT
+)
+from afconfig.reload import (
+    ConfigReloader,
+    RELOAD_ERR_MSG_INVALID_CONFIG,
+    _diff_paths
+)
+
+
+def write_json(filename, config):
+    # bump mtime explicitly, in case the filesystem's resolution is coarse
+    st = os.stat(filename) if os.path.exists(filename) else None
+    with open(filename, 'w') as f:
+        json.dump(config, f)
+    if st:
+        os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+
+class TestDiffPaths(object):
+
+    def test_diff_paths(self):
+        old = {'a': {'b': 1, 'c': {'d': 2}}, 'e': 3, 'f': 4, 'g': 1}
+        new = {'a': {'b': 1, 'c': {'d': 5}}, 'e': {'x': 1}, 'h': 6, 'g': True}
+        assert sorted([('a', 'c', 'd'), ('e',), ('f',), ('g',), ('h',)]) == \
+            sorted(_diff_paths(old, new))
+        assert [] == _diff_paths(old, old)
+
+    def test_type_only_changes(self):
+        # == would consider these equal
+        assert [('x', 'y')] == _diff_paths({'x': {'y': 1}}, {'x': {'y': True}})
+        assert [('x', 'y')] == _diff_paths({'x': {'y': [1, 2.0]}},
+            {'x': {'y': [1, 2]}})
+        assert [] == _diff_paths({'x': {'y': [1, {'z': 2.0}]}},
+            {'x': {'y': [1, {'z': 2.0}]}})
+        # equal but in a different order
+        assert [] == _diff_paths({'x': {'a': 1, 'b': [2]}},
+            {'x': {'b': [2], 'a': 1}})
+        # types that can't be compared at C speed (e.g. from a custom loader)
+        from decimal import Decimal
+        assert [('x', 'y')] == _diff_paths({'x': {'y': 1, 'z': Decimal(2)}},
+            {'x': {'y': Decimal(1), 'z': Decimal(2)}})
+        assert [] == _diff_paths({'x': {'y': [Decimal(1)]}},
+            {'x': {'y': [Decimal(1)]}})
+
+class TestConfigReloader(object):
+
+    def setup_method(self):
+        self.layers = [
+            {'a': {'b': 1, 'c': 2}, 'd': {'e': 3}, 'x': None},
+            {'a': {'c': 20}, 'f': 4},
+            {'d': {'g': 5}}
+        ]
+
+    def make_reloader(self, tmp_path, **kwargs):
+        filenames = []
+        for i, layer in enumerate(self.layers):
+            filenames.append(str(tmp_path / '{}.json'.format(i)))
+            write_json(filenames[-1], layer)
+        return ConfigReloader(filenames, **kwargs)
+
+    def reload(self, reloader, idx, layer):
+        self.layers[idx] = layer
+        write_json(reloader.filenames[idx], layer)
+        return reloader.check()
+
+    def test_initial_merge(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        assert merge_configs_many({}, *self.layers) == reloader.config
+        assert 20 == reloader.get_value('a', 'c')
+        assert [] == reloader.check()
+
+    def test_reload(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        config = reloader.config
+
+        # changed value
+        assert [('a', 'b')] == self.reload(reloader, 0, {
+            'a': {'b': 10, 'c': 2}, 'd': {'e': 3}, 'x': None})
+        # changed value that's overridden
+        assert [] == self.reload(reloader, 0, {
+            'a': {'b': 10, 'c': 200}, 'd': {'e': 3}, 'x': None})
+        # removed override
+        assert [('a', 'c')] == self.reload(reloader, 1, {'a': {}, 'f': 4})
+        assert 200 == reloader.get_value('a', 'c')
+        # None replaced by dict, and removed value
+        assert sorted([('x',), ('f',)]) == sorted(
+            self.reload(reloader, 1, {'a': {}, 'x': {'y': 1}}))
+        assert merge_configs_many({}, *self.layers) == reloader.config
+
+        # unchanged subtrees are shared
+        assert reloader.config['d'] is config['d']
+
+    def test_reload_type_only_change(self, tmp_path):
+        self.layers = [{'x': {'y': 1}}]
+        reloader = self.make_reloader(tmp_path)
+        assert [('x', 'y')] == self.reload(reloader, 0, {'x': {'y': True}})
+        assert True is reloader.get_value('x', 'y')
+        assert [('x', 'y')] == self.reload(reloader, 0, {'x': {'y': [True]}})
+        assert [('x', 'y')] == self.reload(reloader, 0, {'x': {'y': [1]}})
+        assert (1,) == reloader.get_value('x', 'y')
+        assert type(reloader.get_value('x', 'y')[0]) is int
+
+    def test_conflict(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        config = reloader.config
+        with raises(ConfigurationError) as e_info:
+            self.reload(reloader, 2, {'d': 1})
+        assert e_info.value.args[0] == MERGE_CONFIGS_ERR_MSG_CONFIG_CONFLICT.format('d')
+        assert config is reloader.config
+        # retried, and fixed
+        with raises(ConfigurationError):
+            reloader.check()
+        assert [('d', 'h')] == self.reload(reloader, 2, {'d': {'g': 5, 'h': 6}})
+
+    def test_invalid_file(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        with open(reloader.filenames[1], 'w') as f:
+            f.write('[1, 2]')
+        with raises(ConfigurationError) as e_info:
+            reloader.check()
+        assert e_info.value.args[0] == RELOAD_ERR_MSG_INVALID_CONFIG.format(
+            reloader.filenames[1])
+
+    def test_missing_file(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        os.remove(reloader.filenames[2])
+        assert [] == reloader.check()
+        assert 5 == reloader.get_value('d', 'g')
+
+    def test_subscribers(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        calls = []
+        def callback(keys, old_value, new_value):
+            calls.append((keys, old_value, new_value))
+        reloader.subscribe(('a',), callback)
+        reloader.subscribe(('a', 'c'), callback)
+        reloader.subscribe(('d',), callback)
+        reloader.subscribe(('x', 'y'), callback)
+
+        # overridden change; no notifications
+        self.reload(reloader, 0, {'a': {'b': 1, 'c': 2}, 'd': {'e': 3},
+            'x': None, 'z': 1})
+        assert [] == calls
+
+        self.reload(reloader, 1, {'a': {'c': 21}, 'f': 4})
+        assert sorted([
+            (('a',), {'b': 1, 'c': 20}, {'b': 1, 'c': 21}),
+            (('a', 'c'), 20, 21)
+        ]) == sorted(calls)
+
+        calls[:] = []
+        self.reload(reloader, 1, {'a': {'c': 21}, 'f': 4, 'x': {'y': 1}})
+        assert [(('x', 'y'), None, 1)] == calls
+
+        # type-only change, of a subscribed value and below one
+        calls[:] = []
+        self.reload(reloader, 1, {'a': {'c': 21.0}, 'f': 4, 'x': {'y': True}})
+        assert sorted([
+            (('a',), {'b': 1, 'c': 21}, {'b': 1, 'c': 21.0}),
+            (('a', 'c'), 21, 21.0),
+            (('x', 'y'), 1, True)
+        ]) == sorted(calls)
+        assert type(calls[[c[0] for c in calls].index(('a', 'c'))][2]) is float
+
+        self.reload(reloader, 1, {'a': {'c': 21}, 'f': 4, 'x': {'y': 1}})
+        calls[:] = []
+        reloader.unsubscribe(('x', 'y'), callback)
+        self.reload(reloader, 1, {'a': {'c': 21}, 'f': 4, 'x': {'y': 2}})
+        assert [] == calls
+
+    def test_ini(self, tmp_path):
+        filename = str(tmp_path / 'a.ini')
+        with open(filename, 'w') as f:
+            f.write('[a]\nb = 1\n')
+        reloader = ConfigReloader([filename])
+        assert {'a': {'b': '1'}} == reloader.config
+
+    def test_thread(self, tmp_path):
+        reloader = self.make_reloader(tmp_path)
+        changed = threading.Event()
+        reloader.subscribe(('f',), lambda *args: changed.set())
+        reloader.start(interval=0.01)
+        try:
+            write_json(reloader.filenames[1], {'a': {'c': 20}, 'f': 5})
+            assert changed.wait(5)
+            assert 5 == reloader.get_value('f')
+        finally:
+            reloader.stop()
@@ -0,0 +1,142 @@
+"""Unit tests for afconfig.schema"""
+
+__author__ = "Joel Dubowy"
+
+import configparser
+
+from py.test import raises
+
+from afconfig import config_parser_to_dict, ConfigurationError
+from afconfig.schema import (
+    Schema,
+    Field,
+    MapOf,
+    SCHEMA_ERR_MSG_INVALID_SPEC,
+    SCHEMA_ERR_MSG_INVALID_NAME,
+    SCHEMA_ERR_MSG_MISSING_KEY,
+    SCHEMA_ERR_MSG_NOT_A_DICT,
+    SCHEMA_ERR_MSG_INVALID_VALUE
+)
+
+
+SPEC = {
+    'consumption': {
+        'ecoregion': str,
+        'factor': float,
+        'iterations': int,
+        'enabled': Field(bool, False)
+    },
+    'emissions': {
+        'species': [str],
+        'levels': Field([int], ())
+    },
+    'fuelbeds': Field(MapOf({'pm25': float}), {})
+}
+
+class TestSchema(object):
+
+    def test_ini_strings(self):
+        config_parser = configparser.ConfigParser()
+        config_parser.read_string(
+            "[consumption]\n"
+            "ecoregion = western\n"
+            "factor = 1.5\n"
+            "iterations = 3\n"
+            "enabled = yes\n"
+            "unused = 1\n"
+            "[emissions]\n"
+            "species = PM2.5, CO ,CO2\n"
+            "levels =\n")
+        config = Schema(SPEC).load(config_parser_to_dict(config_parser))
+        assert 'western' == config.consumption.ecoregion
+        assert 1.5 == config.consumption.factor
+        assert 3 == config.consumption.iterations
+        assert config.consumption.enabled is True
+        assert ('PM2.5', 'CO', 'CO2') == config.emissions.species
+        assert () == config.emissions.levels
+        assert {} == config.fuelbeds
+        assert not hasattr(config.consumption, 'unused')
+
+    def test_json_values(self):
+        schema = Schema(SPEC)
+        config = schema.load({
+            'consumption': {'ecoregion': 'western', 'factor': 2,
+                'iterations': 3.0, 'enabled': None},
+            'emissions': {'species': ['PM2.5'], 'levels': [1, '2']},
+            'fuelbeds': {'1': {'pm25': '0.5'}, '2': {'pm25': 1}}
+        })
+        assert isinstance(config, schema.type)
+        assert 2.0 == config.consumption.factor
+        assert isinstance(config.consumption.factor, float)
+        assert isinstance(config.consumption.iterations, int)
+        assert config.consumption.enabled is False
+        assert (1, 2) == config.emissions.levels
+        assert 0.5 == config.fuelbeds['1'].pm25
+        assert 1.0 == config.fuelbeds['2'].pm25
+
+        # typed objects are immutable
+        with raises(AttributeError):
+            config.consumption.factor = 3
+
+    def test_custom_callable(self):
+        schema = Schema({'a': {'b': lambda v: int(v, 16)}})
+        assert 255 == schema.load({'a': {'b': 'ff'}}).a.b
+        with raises(ConfigurationError) as e_info:
+            schema.load({'a': {'b': 'x'}})
+        assert e_info.value.args[0] == SCHEMA_ERR_MSG_INVALID_VALUE.format(
+            'a > b', 'x')
+
+    def test_errors(self):
+        schema = Schema(SPEC)
+        base = {
+            'consumption': {'ecoregion': 'western', 'factor': '1.5',
+                'iterations': '3'},
+            'emissions': {'species': 'PM2.5'}
+        }
+        def check(path, *value):
+            config = {k: dict(v) for k, v in base.items()}
+            if value:
+                config[path[0]][path[1]] = value[0]
+            else:
+                config[path[0]].pop(path[1])
+            with raises(ConfigurationError) as e_info:
+                schema.load(config)
+            return e_info.value.args[0]
+
+        assert check(('consumption', 'factor'), 'x') == \
+            SCHEMA_ERR_MSG_INVALID_VALUE.format('consumption > factor', 'x')
+        assert check(('consumption', 'iterations'), '1.5') == \
+            SCHEMA_ERR_MSG_INVALID_VALUE.format('consumption > iterations', '1.5')
+        assert check(('consumption', 'iterations'), True) == \
+            SCHEMA_ERR_MSG_INVALID_VALUE.format('consumption > iterations', True)
+        assert check(('consumption', 'enabled'), 'maybe') == \
+            SCHEMA_ERR_MSG_INVALID_VALUE.format('consumption > enabled', 'maybe')
+        assert check(('emissions', 'levels'), [1, 'x']) == \
+            SCHEMA_ERR_MSG_INVALID_VALUE.format('emissions > levels > 1', 'x')
+        assert check(('consumption', 'ecoregion')) == \
+            SCHEMA_ERR_MSG_MISSING_KEY.format('consumption > ecoregion')
+
+        with raises(ConfigurationError) as e_info:
+            schema.load(dict(base, fuelbeds={'1': {'pm25': 'x'}}))
+        assert e_info.value.args[0] == SCHEMA_ERR_MSG_INVALID_VALUE.format(
+            'fuelbeds > 1 > pm25', 'x')
+
+        with raises(ConfigurationError) as e_info:
+            schema.load(dict(base, consumption='x'))
+        assert e_info.value.args[0] == SCHEMA_ERR_MSG_NOT_A_DICT.format(
+            'consumption')
+
+    def test_invalid_specs(self):
+        with raises(ConfigurationError) as e_info:
+            Schema({'a': {'b': [int, str]}})
+        assert e_info.value.args[0] == SCHEMA_ERR_MSG_INVALID_SPEC.format('a > b')
+
+        with raises(ConfigurationError) as e_info:
+            Schema({'a': {'b-c': int}})
+        assert e_info.value.args[0] == SCHEMA_ERR_MSG_INVALID_NAME.format('a > b-c')
+
+        for key in ('class', 'from', 'None'):
+            with raises(ConfigurationError) as e_info:
+                Schema({'a': {key: int}})
+            assert e_info.value.args[0] == SCHEMA_ERR_MSG_INVALID_NAME.format(
+                'a > ' + key)
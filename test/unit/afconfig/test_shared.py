@@ -0,0 +1,91 @@
+"""Unit tests for afconfig.shared"""
+
+__author__ = "Joel Dubowy"
+
+import concurrent.futures
+import os
+import pickle
+
+from py.test import raises
+
+from afconfig import ImmutableConfigDict, ConfigurationError
+from afconfig import shared as shared_module
+from afconfig.shared import SharedConfig, MAX_OPEN_SNAPSHOTS
+from afconfig.snapshot import SnapshotConfig, SNAPSHOT_ERR_MSG_UNSUPPORTED_VALUE
+
+
+CONFIG = ImmutableConfigDict({
+    'fuelbeds': {
+        str(i): {'consumption': {'ecoregion': 'western'}, 'pm25': i}
+            for i in range(1000)
+    },
+    'c': 12
+})
+
+def _publish_and_count(handle):
+    # Run in a worker: resolves handle and returns the number of
+    # snapshots the worker has open
+    handle.resolve()
+    return len(shared_module._open_snapshots)
+
+class TestSharedConfig(object):
+
+    def test_handle(self, tmp_path):
+        with SharedConfig(CONFIG, directory=str(tmp_path)) as shared:
+            handle = shared.handle
+            assert os.path.exists(handle.filename)
+            assert isinstance(handle.resolve(), SnapshotConfig)
+            assert handle.resolve() is handle.resolve()
+            assert 12 == handle.get_value('c')
+            assert 5 == handle.get_value('fuelbeds', '5', 'pm25')
+            assert 1 == handle.get_value('fuelbeds', 'z', default=1)
+
+            pickled = pickle.dumps(handle)
+            assert len(pickled) < len(pickle.dumps(CONFIG)) / 100
+            assert handle == pickle.loads(pickled)
+
+        assert not os.path.exists(handle.filename)
+
+    def test_default_directory(self):
+        with SharedConfig(CONFIG) as shared:
+            assert os.path.exists(shared.handle.filename)
+        assert not os.path.exists(shared.handle.filename)
+
+    def test_unsupported_config(self, tmp_path):
+        with raises(ConfigurationError) as e_info:
+            SharedConfig({'a': object()}, directory=str(tmp_path))
+        assert e_info.value.args[0] == SNAPSHOT_ERR_MSG_UNSUPPORTED_VALUE.format(
+            'object')
+        assert not os.listdir(str(tmp_path))
+
+    def test_process_pool(self, tmp_path):
+        with SharedConfig(CONFIG, directory=str(tmp_path)) as shared:
+            with concurrent.futures.ProcessPoolExecutor(2) as executor:
+                futures = [executor.submit(shared.handle.get_value,
+                    'fuelbeds', str(i), 'pm25') for i in range(20)]
+                assert list(range(20)) == [f.result() for f in futures]
+
+
+    def test_closed_snapshots_dropped(self, tmp_path):
+        # Published and closed one after the other, as a long running
+        # parent would, without ever resolving the handles itself
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            for i in range(3 * MAX_OPEN_SNAPSHOTS):
+                with SharedConfig({'i': i}, directory=str(tmp_path)) as shared:
+                    assert executor.submit(_publish_and_count,
+                        shared.handle).result() == 1
+
+    def test_open_snapshots_bounded(self, tmp_path):
+        shareds = [SharedConfig({'i': i}, directory=str(tmp_path))
+            for i in range(MAX_OPEN_SNAPSHOTS + 2)]
+        try:
+            configs = [s.handle.resolve() for s in shareds]
+            assert MAX_OPEN_SNAPSHOTS == len(shared_module._open_snapshots)
+            assert shareds[0].handle.filename not in shared_module._open_snapshots
+            assert shareds[-1].handle.resolve() is configs[-1]
+            # dropped snapshots remain usable, and are reopened as needed
+            assert 0 == configs[0]['i']
+            assert 0 == shareds[0].handle.get_value('i')
+        finally:
+            for s in shareds:
+                s.close()
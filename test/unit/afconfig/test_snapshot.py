@@ -0,0 +1,124 @@
+"""Unit tests for afconfig.snapshot"""
+
+__author__ = "Joel Dubowy"
+
+import os
+
+from py.test import raises
+
+from afconfig import get_config_value, ConfigurationError
+from afconfig.persistent import FrozenConfigDict
+from afconfig.snapshot import save_snapshot, open_snapshot, SnapshotConfig
+
+
+CONFIG = {
+    'a': {
+        'aa': 'sdf',
+        'ab': [1, 2.5, {'x': None}, -0.0]
+    },
+    'b': {
+        'ba': 123,
+        'bb': True,
+        'bc': False,
+        'cc': {
+            'ccc': b"SDF",
+            'ccd': 'é'
+        }
+    },
+    'c': -2**70,
+    1: 'int key',
+    'e': {}
+}
+
+class TestSnapshot(object):
+
+    def _save_and_open(self, tmp_path, config):
+        filename = str(tmp_path / 'config.snap')
+        save_snapshot(config, filename)
+        return open_snapshot(filename)
+
+    def test_round_trip(self, tmp_path):
+        snapshot = self._save_and_open(tmp_path, CONFIG)
+        assert isinstance(snapshot, SnapshotConfig)
+        assert CONFIG == snapshot.to_dict()
+        assert list(CONFIG) == list(snapshot)
+        assert CONFIG['a']['ab'][2] == snapshot['a']['ab'][2]
+        assert isinstance(snapshot['a']['ab'], tuple)
+        assert isinstance(snapshot['b']['cc'], SnapshotConfig)
+        assert '-0.0' == repr(snapshot['a']['ab'][3])
+        assert True is snapshot['b']['bb']
+
+    def test_frozen_config(self, tmp_path):
+        snapshot = self._save_and_open(tmp_path, FrozenConfigDict(CONFIG))
+        assert CONFIG == snapshot.to_dict()
+
+    def test_lazy(self, tmp_path):
+        snapshot = self._save_and_open(tmp_path, CONFIG)
+        assert snapshot._offsets is None
+        assert 'sdf' == snapshot['a']['aa']
+        assert snapshot['b']._offsets is None
+        assert snapshot['a'] is snapshot['a']
+
+    def test_wide_dict_lookups(self, tmp_path):
+        config = {'k{}'.format(i): i for i in range(1000)}
+        config.update({i: -i for i in range(10)})
+        config[(1, 2)] = 'tuple key'
+        config['é'] = 'é'
+        self._save_and_open(tmp_path, config)
+        for key in list(config) + ['z', 'k1000', 'é2', 11, (1, 3)]:
+            snapshot = open_snapshot(str(tmp_path / 'config.snap'))
+            assert (key in config) == (key in snapshot)
+            assert config.get(key) == snapshot.get(key)
+            # the key index is only decoded for non-str keys
+            assert (snapshot._offsets is None) == isinstance(key, str)
+        assert 1012 == len(snapshot)
+        assert list(config) == list(snapshot)
+
+    def test_get_config_value(self, tmp_path):
+        snapshot = self._save_and_open(tmp_path, CONFIG)
+        assert 'é' == get_config_value(snapshot, 'b', 'cc', 'ccd')
+        assert 'int key' == snapshot.get_value(1)
+        assert 5 == snapshot.get_value('b', 'zz', default=5)
+        with raises(KeyError) as e_info:
+            snapshot.get_value('b', 'zz', fail_on_missing_key=True)
+        with raises(ConfigurationError) as e_info:
+            snapshot.get_value('b', 'ba', 'x', fail_on_invalid_config=True)
+
+    def test_shared_values_written_once(self, tmp_path):
+        section = {'option_{}'.format(i): 'value' for i in range(100)}
+        shared = self._save_and_open(tmp_path,
+            {'s{}'.format(i): section for i in range(10)})
+        size_shared = os.path.getsize(str(tmp_path / 'config.snap'))
+        unshared = self._save_and_open(tmp_path,
+            {'s{}'.format(i): dict(section) for i in range(10)})
+        size_unshared = os.path.getsize(str(tmp_path / 'config.snap'))
+        assert size_shared < size_unshared
+        assert shared.to_dict() == unshared.to_dict()
+
+    def test_file_mode(self, tmp_path):
+        # Same as a file created with open(), rather than mkstemp's 0600
+        filename = str(tmp_path / 'config.snap')
+        umask = os.umask(0o022)
+        try:
+            save_snapshot(CONFIG, filename)
+            assert 0o644 == os.stat(filename).st_mode & 0o777
+            os.umask(0o077)
+            save_snapshot(CONFIG, filename)
+            assert 0o600 == os.stat(filename).st_mode & 0o777
+        finally:
+            os.umask(umask)
+
+    def test_unsupported_value(self, tmp_path):
+        with raises(ConfigurationError) as e_info:
+            save_snapshot({'a': object()}, str(tmp_path / 'config.snap'))
+        with raises(ConfigurationError) as e_info:
+            save_snapshot([1], str(tmp_path / 'config.snap'))
+        assert not os.listdir(str(tmp_path))
+
+    def test_invalid_file(self, tmp_path):
+        filename = str(tmp_path / 'config.snap')
+        for content in (b'', b'AFCSNAP', b'{"a": 1}' * 4):
+            with open(filename, 'wb') as f:
+                f.write(content)
+            with raises(ConfigurationError) as e_info:
+                open_snapshot(filename)